@@ -0,0 +1,112 @@
+import struct
+import numpy as np
+import pytest
+
+from wsdp.bench import make_bfee_file
+from wsdp.readers.bfee_reader import BfeeReader, decode_csi
+
+LAYOUTS = [(1, 1), (3, 1), (2, 3), (3, 3)]
+
+
+def reference_decode(csi_bytes, n_rx, n_tx):
+    # the bit loop of the original reader, kept as the reference for the vectorized decoder
+    csi_array = np.zeros((30, n_rx, n_tx), dtype=np.complex64)
+
+    def get_bit(pos):
+        byte_i = pos // 8
+        if byte_i >= len(csi_bytes):
+            return 0
+        return (csi_bytes[byte_i] >> (pos % 8)) & 0x1
+
+    def get_bits_u8(pos):
+        val = 0
+        for b in range(8):
+            val |= (get_bit(pos + b) << b)
+        return val
+
+    bit_index = 0
+    for sc_idx in range(30):
+        bit_index += 3
+        for j in range(n_rx * n_tx):
+            real8 = get_bits_u8(bit_index)
+            imag8 = get_bits_u8(bit_index + 8)
+            bit_index += 16
+            if real8 & 0x80: real8 -= 256
+            if imag8 & 0x80: imag8 -= 256
+            csi_array[sc_idx, j % n_rx, j // n_rx] = np.complex64(real8 + 1j * imag8)
+    return csi_array
+
+
+def csi_len(n_rx, n_tx):
+    return (30 * (n_rx * n_tx * 8 * 2 + 3) + 7) // 8
+
+
+@pytest.mark.parametrize("n_rx, n_tx", LAYOUTS)
+def test_decode_csi_matches_bit_loop(n_rx, n_tx):
+    rng = np.random.default_rng(n_rx * 10 + n_tx)
+    raw = rng.integers(0, 256, (8, csi_len(n_rx, n_tx)), dtype=np.uint8)
+
+    batched = decode_csi(raw, n_rx, n_tx)
+    assert batched.shape == (8, 30, n_rx, n_tx)
+    assert batched.dtype == np.complex64
+    for i in range(len(raw)):
+        expected = reference_decode(raw[i].tobytes(), n_rx, n_tx)
+        np.testing.assert_array_equal(decode_csi(raw[i], n_rx, n_tx), expected)
+        np.testing.assert_array_equal(batched[i], expected)
+
+
+@pytest.mark.parametrize("n_rx, n_tx", LAYOUTS)
+def test_parse_bfee_record_header(n_rx, n_tx):
+    rng = np.random.default_rng(0)
+    csi = rng.integers(0, 256, csi_len(n_rx, n_tx), dtype=np.uint8).tobytes()
+    header = struct.pack('<IHHBBBBBbBBHH', 0xdeadbeef, 0xabcd, 0, n_rx, n_tx, 31, 32, 33, -92, 40, 0x24,
+                         len(csi), 0x113)
+
+    frame = BfeeReader().parse_bfee_record(header + csi)
+    assert (frame.timestamp, frame.bfee_count, frame.n_rx, frame.n_tx) == (0xdeadbeef, 0xabcd, n_rx, n_tx)
+    assert (frame.rssi_a, frame.rssi_b, frame.rssi_c) == (31, 32, 33)
+    assert (frame.noise, frame.agc, frame.antenna_sel, frame.fake_rate) == (-92, 40, 0x24, 0x113)
+    np.testing.assert_array_equal(frame.csi_array, reference_decode(csi, n_rx, n_tx))
+
+
+def test_parse_bfee_record_rejects_bad_length():
+    header = struct.pack('<IHHBBBBBbBBHH', 0, 0, 0, 3, 1, 0, 0, 0, 0, 0, 0, csi_len(3, 1) - 1, 0)
+    assert BfeeReader().parse_bfee_record(header + bytes(csi_len(3, 1))) is None
+
+
+@pytest.mark.parametrize("n_rx, n_tx", LAYOUTS)
+def test_read_records_matches_bit_loop(tmp_path, n_rx, n_tx):
+    path = tmp_path / "user1-1-1-1-1-r1.dat"
+    make_bfee_file(path, num_packets=40, n_rx=n_rx, n_tx=n_tx, seed=n_rx * n_tx)
+    data = path.read_bytes()
+
+    expected_csi = []
+    expected_header = []
+    cur = 0
+    while cur + 3 < len(data):
+        field_len = (data[cur] << 8) | data[cur + 1]
+        payload = data[cur + 3:cur + 2 + field_len]
+        if data[cur + 2] == 0xBB:
+            expected_header.append(struct.unpack('<IHHBBBBBbBBHH', payload[:20]))
+            expected_csi.append(reference_decode(payload[20:], n_rx, n_tx))
+        cur += 2 + field_len
+
+    records = BfeeReader().read_records(str(path))
+    rows, csi = records['csi'][(n_rx, n_tx)]
+    assert len(rows) == len(expected_csi) == 40
+    np.testing.assert_array_equal(csi, np.stack(expected_csi))
+
+    columns = ['timestamp', 'bfee_count', None, 'n_rx', 'n_tx', 'rssi_a', 'rssi_b', 'rssi_c', 'noise', 'agc',
+               'antenna_sel', None, 'fake_rate']
+    for k, name in enumerate(columns):
+        if name is not None:
+            np.testing.assert_array_equal(records[name], [h[k] for h in expected_header], err_msg=name)
+
+
+def test_batched_and_streaming_reader_agree(tmp_path):
+    path = tmp_path / "user1-1-1-1-1-r1.dat"
+    make_bfee_file(path, num_packets=50, n_rx=3, n_tx=2)
+    batched = BfeeReader(batched=True).read_file(str(path))
+    streaming = BfeeReader(batched=False).read_file(str(path))
+    assert len(batched) == len(streaming) == 50
+    np.testing.assert_array_equal(batched.sorted_csi(), streaming.sorted_csi())
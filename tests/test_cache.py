@@ -0,0 +1,17 @@
+import numpy as np
+
+from wsdp.utils import PreprocessCache
+
+
+def test_put_get_roundtrip_with_unlabeled_samples(tmp_path):
+    cache = PreprocessCache(tmp_path)
+    samples = [(np.ones((3, 30, 3), dtype=np.complex64), None, None),
+               (np.zeros((2, 30, 3), dtype=np.complex64), 4, 2)]
+    cache.put("entry", samples)
+
+    restored = cache.get("entry")
+    assert [(label, group) for _, label, group in restored] == [(None, None), (4, 2)]
+    for (csi, _, _), (expected, _, _) in zip(restored, samples):
+        np.testing.assert_array_equal(csi, expected)
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
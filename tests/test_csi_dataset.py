@@ -0,0 +1,22 @@
+import numpy as np
+
+from wsdp.datasets import CSIDataset
+
+
+def test_real_input_is_turned_into_magnitude():
+    data = np.array([[[[-1.5, 2.0]]], [[[3.0, -4.0]]]], dtype=np.float64)
+    dataset = CSIDataset(data, np.array([0, 1]))
+    np.testing.assert_array_equal(dataset.data_list.numpy(), np.abs(data).astype(np.float32))
+
+
+def test_complex_input_is_turned_into_amplitude():
+    data = np.array([[[[3 + 4j]]]], dtype=np.complex64)
+    dataset = CSIDataset(data, np.array([0]))
+    np.testing.assert_array_equal(dataset.data_list.numpy(), [[[[5.0]]]])
+
+
+def test_non_negative_float32_input_is_shared():
+    data = np.random.default_rng(0).random((4, 5, 3, 2), dtype=np.float32)
+    dataset = CSIDataset(data, np.zeros(4), indices=[1, 3])
+    assert np.shares_memory(dataset.data_list.numpy(), data)
+    assert len(dataset) == 2
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from wsdp.algorithms import wavelet_denoise_csi, StreamingWaveletDenoiser
+
+LENGTH = 1500
+
+
+@pytest.fixture(scope="module")
+def stationary_csi():
+    rng = np.random.default_rng(0)
+    amplitude = 10 + rng.normal(size=(LENGTH, 30, 3))
+    phase = rng.uniform(0, 2 * np.pi, (LENGTH, 30, 3))
+    return (amplitude * np.exp(1j * phase)).astype(np.complex64)
+
+
+def stream_through(denoiser, csi, chunk):
+    out = [denoiser.update(csi[i:i + chunk]) for i in range(0, len(csi), chunk)]
+    return np.concatenate(out + [denoiser.flush()])
+
+
+@pytest.mark.parametrize("chunk, tolerance", [(1, 2e-3), (7, 2e-3), (64, 2e-3), (333, 2e-3), (LENGTH, 1e-4)])
+def test_matches_batch_denoising(stationary_csi, chunk, tolerance):
+    expected = np.abs(wavelet_denoise_csi(stationary_csi))
+    actual = stream_through(StreamingWaveletDenoiser(length=LENGTH), stationary_csi, chunk)
+
+    assert actual.shape == expected.shape
+    # only the running noise sigma differs from the batch threshold
+    assert np.linalg.norm(actual - expected) / np.linalg.norm(expected) < tolerance
+
+
+def test_emits_every_frame_after_delay(stationary_csi):
+    denoiser = StreamingWaveletDenoiser(length=LENGTH)
+    first = denoiser.update(stationary_csi[:200])
+    assert len(first) == 200 - denoiser.delay
+    assert len(denoiser.flush()) == denoiser.delay
+
+
+def test_flush_without_pending_frames(stationary_csi):
+    denoiser = StreamingWaveletDenoiser(frame_shape=(30, 3))
+    assert denoiser.flush().shape == (0, 30, 3)
+
+    stream_through(denoiser, stationary_csi[:100], 100)
+    assert denoiser.flush().shape == (0, 30, 3)
+
+    assert StreamingWaveletDenoiser().flush().shape == (0, 0, 0)
+    with pytest.raises(ValueError):
+        StreamingWaveletDenoiser(frame_shape=(30, 3)).update(stationary_csi[:10, :, :2])
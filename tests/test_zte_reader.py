@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from wsdp.readers.zte_reader import NUM_SUBCARRIERS, ZTEReader
+
+
+def write_zte_csv(path, timestamps):
+    header = ['timestamp', 'rx_chain_num'] + [f'csi_i_{k}' for k in range(NUM_SUBCARRIERS)] \
+        + [f'csi_q_{k}' for k in range(NUM_SUBCARRIERS)]
+    rows = [','.join(header)]
+    for n, ts in enumerate(timestamps):
+        rows.append(','.join([ts, 'rx0-tx0'] + [str(n + 1)] * NUM_SUBCARRIERS + ['0'] * NUM_SUBCARRIERS))
+    path.write_text('\n'.join(rows) + '\n', encoding='utf-8')
+
+
+@pytest.mark.parametrize('timestamps, expected', [
+    (['17e8', '16e8'], [16e8, 17e8]),
+    (['2024-01-01 10:00:01', '2024-01-01 10:00:00'], ['2024-01-01 10:00:00', '2024-01-01 10:00:01']),
+])
+def test_read_file_sorts_numeric_and_string_timestamps(tmp_path, timestamps, expected):
+    path = tmp_path / 'sample.csv'
+    write_zte_csv(path, timestamps)
+
+    data = ZTEReader().read_file(str(path))
+
+    assert list(data.timestamps) == expected
+    # rows come back in timestamp order: the second csv row holds the earlier timestamp
+    np.testing.assert_array_equal(data.csi[:, 0, 0].real, [2, 1])
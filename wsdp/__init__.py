@@ -1 +1,3 @@
-from .core import pipeline
\ No newline at end of file
+from .core import pipeline, profile_preprocessing
+from .predict import predict, export_model, Predictor
+from .utils import configure_resources
@@ -1,2 +1,2 @@
-from .denoising import wavelet_denoise_csi
-from .phase_calibration import phase_calibration
\ No newline at end of file
+from .denoising import wavelet_denoise_csi, StreamingWaveletDenoiser
+from .phase_calibration import phase_calibration
@@ -5,56 +5,214 @@ import numpy as np
 def wavelet_denoise_csi(csi_tensor):
     """
     param:
-        csi_tensor (np.ndarray): CSI data
+        csi_tensor (np.ndarray): CSI data with shape of [Timestamp, Subcarrier, Rx]
     """
     # split amplitude and phase
     amplitude = np.abs(csi_tensor)
     phase = np.angle(csi_tensor)
-    
-    denoised_amplitude = np.copy(amplitude)
 
     T, S, R = csi_tensor.shape
 
-    def _denoise_channel(channel):
-        try:
-            # in case of dividing zero
-            if np.std(channel) < 1e-6:
-                return channel
-            L = len(channel)
-
-            w_name = 'db4'
-            wavelet = pywt.Wavelet(w_name)
-            max_level = pywt.dwt_max_level(L, wavelet.dec_len)
-            
-            if max_level < 1:
-                w_name = 'db1'
-                wavelet = pywt.Wavelet(w_name)
-                max_level = pywt.dwt_max_level(L, wavelet.dec_len)
-            
-            if max_level < 1:
-                return channel
-            
-            level = min(2, max_level)
-            coeffs = pywt.wavedec(channel, wavelet, level=level)
-
-            # calculate threshold of noise (VisuShrink)
-            sigma = np.median(np.abs(coeffs[-1])) / 0.6745
-            threshold = sigma * np.sqrt(2 * np.log(L))
+    # every (subcarrier, rx) series becomes one row, all of them are denoised together
+    channels = np.ascontiguousarray(amplitude.reshape(T, S * R).T)
+    denoised_amplitude = _denoise_channels(channels).T.reshape(T, S, R)
 
-            denoised_coeffs = [coeffs[0]] + [np.sign(c) * np.maximum(np.abs(c) - threshold, 0) for c in coeffs[1:]]
-            
-            # refactor
-            denoised_signal = pywt.waverec(denoised_coeffs, wavelet)
-            
-            return denoised_signal[:L]
-        except Exception as e:
-            print(f"wavalet denoising fail: {e}. original signal will be returned.")
-            return channel
-
-    for rx in range(R):
-        for sc in range(S):
-            denoised_amplitude[:, sc, rx] = _denoise_channel(amplitude[:, sc, rx])
-            
     denoised_csi_tensor = denoised_amplitude * np.exp(1j * phase)
-    
-    return denoised_csi_tensor
\ No newline at end of file
+
+    return denoised_csi_tensor
+
+
+def _denoise_channels(channels):
+    """
+    VisuShrink soft-threshold denoising of every row of a (C, L) matrix
+
+    param:
+        channels (np.ndarray): real signals, one channel per row
+    return:
+        denoised copy of channels, constant channels are returned unchanged
+    """
+    denoised = np.copy(channels)
+    # in case of dividing zero
+    active = np.std(channels, axis=1) >= 1e-6
+    if not np.any(active):
+        return denoised
+    try:
+        denoised[active] = _visushrink(channels[active])
+    except (ValueError, TypeError) as e:
+        # denoise one channel at a time, so a bad channel only leaves itself undenoised
+        print(f"[Warning] batched wavelet denoising fail: {e}. denoising channel by channel.")
+        for i in np.flatnonzero(active):
+            try:
+                denoised[i] = _visushrink(channels[i:i + 1])[0]
+            except (ValueError, TypeError) as e:
+                print(f"wavelet denoising fail: {e}. original signal will be returned.")
+    return denoised
+
+
+def _visushrink(channels):
+    L = channels.shape[1]
+    w_name = 'db4'
+    wavelet = pywt.Wavelet(w_name)
+    max_level = pywt.dwt_max_level(L, wavelet.dec_len)
+
+    if max_level < 1:
+        w_name = 'db1'
+        wavelet = pywt.Wavelet(w_name)
+        max_level = pywt.dwt_max_level(L, wavelet.dec_len)
+
+    if max_level < 1:
+        return channels
+
+    level = min(2, max_level)
+    coeffs = pywt.wavedec(channels, wavelet, level=level, axis=-1)
+
+    # calculate threshold of noise (VisuShrink) per channel
+    sigma = np.median(np.abs(coeffs[-1]), axis=-1, keepdims=True) / 0.6745
+    threshold = sigma * np.sqrt(2 * np.log(L))
+
+    denoised_coeffs = [coeffs[0]] + [np.sign(c) * np.maximum(np.abs(c) - threshold, 0) for c in coeffs[1:]]
+
+    # refactor
+    denoised_signal = pywt.waverec(denoised_coeffs, wavelet, axis=-1)
+    return denoised_signal[:, :L]
+
+
+class StreamingWaveletDenoiser:
+    """
+    causal counterpart of wavelet_denoise_csi for frames that arrive in chunks.
+
+    only the last raw frames inside the support of the db4 filters are carried between
+    calls, so every output frame costs the same no matter how long the stream runs.
+    a frame is emitted once the frames it depends on have arrived, `delay` frames later.
+    the VisuShrink threshold uses a running noise sigma: the median absolute finest
+    detail coefficient over the last sigma_window coefficients of every channel.
+    """
+
+    def __init__(self, length: int = 1500, wavelet: str = 'db4', level: int = 2, sigma_window: int = 1024,
+                 sigma=None, frame_shape=None):
+        """
+        param:
+            length: series length the threshold sigma * sqrt(2 log length) is computed for,
+                    the length of the windows the model was trained on
+            sigma_window: finest detail coefficients per channel the noise sigma is estimated from
+            sigma: fixed noise sigma (scalar or one per channel) instead of the running estimate
+            frame_shape: (Subcarrier, Rx) of one frame, taken from the first update() if None
+        """
+        self.wavelet = pywt.Wavelet(wavelet)
+        self.level = level
+        self.length = length
+        self.sigma_window = sigma_window
+        self.fixed_sigma = sigma
+        # frames one output frame depends on at either side, through analysis and synthesis of every level
+        self.support = (self.wavelet.dec_len - 1) * (2 ** level - 1)
+        # segments start on a multiple of 2 ** level, so they decimate in phase with the whole stream
+        self._block = 2 ** level
+        self.frame_shape = tuple(frame_shape) if frame_shape is not None else None
+        self.reset()
+
+    @property
+    def delay(self) -> int:
+        """
+        frames held back until their right-hand filter support has arrived
+        """
+        return self.support
+
+    def reset(self):
+        self._shape = self.frame_shape
+        self._buf = None
+        self._buf_start = 0
+        self._total = 0
+        self._emitted = 0
+        self._detail = None
+        self._detail_pos = 0
+        self._detail_count = 0
+        self._since_sigma = 0
+        self.sigma = None
+
+    def update(self, frames) -> np.ndarray:
+        """
+        param:
+            frames: next (T, Subcarrier, Rx) frames, complex CSI or amplitude
+        return:
+            denoised amplitude of the frames that became final, (T', Subcarrier, Rx)
+        """
+        frames = np.asarray(frames)
+        if np.iscomplexobj(frames):
+            frames = np.abs(frames)
+        if self._shape is not None and frames.shape[1:] != self._shape:
+            raise ValueError(f"frame shape changed from {self._shape} to {frames.shape[1:]}")
+        if self._buf is None:
+            self._start(frames)
+        new = frames.reshape(len(frames), self._buf.shape[0]).T
+        self._buf = np.concatenate([self._buf, new.astype(self._buf.dtype, copy=False)], axis=1)
+        self._total += len(frames)
+        return self._emit(self._total - self.support, final=False)
+
+    def flush(self) -> np.ndarray:
+        """
+        emit the held back frames, treating the stream as ended. without any frame and without
+        frame_shape, the empty result is (0, 0, 0)
+        """
+        if self._buf is None:
+            return np.empty((0,) + (self._shape or (0, 0)), dtype=np.float32)
+        return self._emit(self._total, final=True)
+
+    def _start(self, frames):
+        self._shape = frames.shape[1:]
+        channels = int(np.prod(self._shape))
+        dtype = np.result_type(frames.dtype, np.float32)
+        self._buf = np.empty((channels, 0), dtype=dtype)
+        self._detail = np.zeros((channels, self.sigma_window), dtype=dtype)
+        if self.fixed_sigma is not None:
+            self.sigma = np.broadcast_to(np.asarray(self.fixed_sigma, dtype=np.float64).reshape(-1, 1),
+                                         (channels, 1))
+
+    def _emit(self, hi: int, final: bool) -> np.ndarray:
+        lo = self._emitted
+        if hi <= lo:
+            return np.empty((0,) + self._shape, dtype=self._buf.dtype)
+
+        seg_start = max(0, (lo - self.support) // self._block * self._block)
+        seg = self._buf[:, seg_start - self._buf_start:]
+        if pywt.dwt_max_level(seg.shape[1], self.wavelet.dec_len) < self.level:
+            if not final:
+                # the start of the stream waits until it spans every level
+                return np.empty((0,) + self._shape, dtype=self._buf.dtype)
+            # a whole stream shorter than the filters
+            out = _denoise_channels(seg)[:, lo - seg_start:hi - seg_start]
+        else:
+            coeffs = pywt.wavedec(seg, self.wavelet, level=self.level, axis=-1)
+            # finest detail coefficients of the emitted frames, each one is counted once
+            first = 0 if lo == 0 else self._coeff_index(lo)
+            last = self._coeff_index(hi)
+            self._add_details(coeffs[-1][:, first - seg_start // 2:last - seg_start // 2], final)
+
+            threshold = self.sigma * np.sqrt(2 * np.log(self.length))
+            denoised_coeffs = [coeffs[0]] + [np.sign(c) * np.maximum(np.abs(c) - threshold, 0) for c in coeffs[1:]]
+            out = pywt.waverec(denoised_coeffs, self.wavelet, axis=-1)[:, lo - seg_start:hi - seg_start]
+
+        self._emitted = hi
+        keep_from = max(0, (hi - self.support) // self._block * self._block)
+        self._buf = self._buf[:, keep_from - self._buf_start:]
+        self._buf_start = keep_from
+        return np.ascontiguousarray(out.T).reshape((hi - lo,) + self._shape)
+
+    def _coeff_index(self, frame: int) -> int:
+        # finest detail coefficients of frames [0, frame) in the decomposition of the whole stream
+        return (frame + self.wavelet.dec_len - 1) // 2
+
+    def _add_details(self, details, final: bool):
+        if self.fixed_sigma is not None:
+            return
+        details = np.abs(details[:, -self.sigma_window:])
+        n = details.shape[1]
+        idx = (self._detail_pos + np.arange(n)) % self.sigma_window
+        self._detail[:, idx] = details
+        self._detail_pos = (self._detail_pos + n) % self.sigma_window
+        self._detail_count = min(self._detail_count + n, self.sigma_window)
+        self._since_sigma += n
+        # re-estimate after a fixed fraction of the window is new, the median stays O(1) per frame
+        if self.sigma is None or final or self._since_sigma * 8 >= self._detail_count:
+            filled = self._detail[:, :self._detail_count]
+            self.sigma = np.median(filled, axis=-1, keepdims=True).astype(np.float64) / 0.6745
+            self._since_sigma = 0
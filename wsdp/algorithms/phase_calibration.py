@@ -5,22 +5,30 @@ def phase_calibration(csi_data):
     """
     param:
         csi_data: 3D CSI data with shape of [Timestamp, Frequency, Antenna]
+    return:
+        CSI with the linear phase trend over subcarriers removed, in the
+        precision of the input (complex64 stays complex64)
     """
     T, F, A = csi_data.shape
-    csi_phase_corrected = np.zeros_like(csi_data, dtype=complex)
-    sub_carrier_indices = np.arange(F)
+    out_dtype = np.result_type(csi_data.dtype, np.complex64)
+    sub_carrier_indices = np.arange(F, dtype=np.float64)
 
-    # tackle data of every single timestamp and antenna
-    for t in range(T):
-        for a in range(A):
-            csi_packet = csi_data[t, :, a]
-            raw_phase = np.angle(csi_packet)
-            unwrapped_phase = np.unwrap(raw_phase)
-            p = np.polyfit(sub_carrier_indices, unwrapped_phase, 1)
+    # unwrap every (timestamp, antenna) packet along the subcarrier axis at once
+    unwrapped_phase = np.unwrap(np.angle(csi_data), axis=1)
 
-            phase_error = np.polyval(p, sub_carrier_indices)
-            correction_term = np.exp(-1j * phase_error)
-            csi_phase_corrected[t, :, a] = csi_packet * correction_term
+    # closed-form least squares of phase = slope * index + intercept for the whole (T, A) grid
+    x_mean = sub_carrier_indices.mean()
+    x_centered = sub_carrier_indices - x_mean
+    denom = np.dot(x_centered, x_centered)
+    y_mean = unwrapped_phase.mean(axis=1, dtype=np.float64)
+    if denom > 0:
+        slope = np.einsum('f,tfa->ta', x_centered, unwrapped_phase, dtype=np.float64) / denom
+    else:
+        slope = np.zeros_like(y_mean)
+    intercept = y_mean - slope * x_mean
 
-    return csi_phase_corrected
+    phase_error = slope[:, None, :] * sub_carrier_indices[None, :, None] + intercept[:, None, :]
+    correction_term = np.exp(-1j * phase_error)
+    csi_phase_corrected = (csi_data * correction_term).astype(out_dtype, copy=False)
 
+    return csi_phase_corrected
@@ -0,0 +1,2 @@
+from .synthetic import make_bfee_file, make_xrf_file, make_elder_file, make_zte_file, make_dataset
+from .suite import run_benchmarks, compare, append_history, load_history, save_baseline, default_history_path
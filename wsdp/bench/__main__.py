@@ -0,0 +1,7 @@
+import sys
+
+from wsdp.cli import main_cli
+
+if __name__ == '__main__':
+    sys.argv = [sys.argv[0], 'bench'] + sys.argv[1:]
+    main_cli()
@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import tempfile
+import platform
+import numpy as np
+
+from pathlib import Path
+from contextlib import redirect_stdout
+from wsdp.algorithms import phase_calibration, wavelet_denoise_csi
+from wsdp.readers import get_reader_class
+from wsdp.readers.bfee_reader import decode_csi
+from wsdp.processors import BaseProcessor
+from wsdp.utils import resize_csi_to_fixed_length, build_fixed_length_batch, time_call
+from .synthetic import make_dataset
+
+# (dataset, generator arguments) of every reader benchmark, in full size and quick size
+_READER_CASES = {
+    'bfee': ('widar', dict(num_packets=4000), dict(num_packets=500)),
+    'xrf': ('xrf55', dict(), dict()),
+    'elder': ('elderAL', dict(num_rows=200), dict(num_rows=40)),
+    'zte': ('zte', dict(num_timestamps=200), dict(num_timestamps=40)),
+}
+
+
+def default_history_path() -> str:
+    """
+    benchmark history: $WSDP_BENCH_HISTORY, otherwise ~/.cache/wsdp/bench/history.json
+    """
+    env = os.environ.get("WSDP_BENCH_HISTORY")
+    if env:
+        return env
+    return str(Path.home() / ".cache" / "wsdp" / "bench" / "history.json")
+
+
+def run_benchmarks(work_dir=None, quick: bool = False, repeat: int = 5, only=None) -> dict:
+    """
+    generate synthetic data in work_dir and time readers, algorithms, resizing and the processor
+
+    param:
+        work_dir: folder for synthetic files, a temporary folder if None
+        quick: smaller inputs, for a fast sanity check
+        only: optional list of benchmark names (or name prefixes) to run
+    return:
+        {benchmark name: timing dict with an 'items' count and 'items_per_s'}
+    """
+    if work_dir is None:
+        with tempfile.TemporaryDirectory(prefix="wsdp_bench_") as tmp:
+            return run_benchmarks(tmp, quick, repeat, only)
+
+    work_dir = Path(work_dir)
+    cases = []
+
+    def selected(name):
+        return not only or any(name.startswith(prefix) for prefix in only)
+
+    # --- readers: one file of every format ---
+    for name, (dataset, full, small) in _READER_CASES.items():
+        if not selected(f"reader_{name}"):
+            continue
+        path = make_dataset(work_dir / name, dataset, num_files=1, **(small if quick else full))[0]
+        reader = get_reader_class(dataset)()
+        frames = sum(len(d) for d in _as_list(_quiet(_read_call(reader, path))))
+        cases.append((f"reader_{name}", _read_call(reader, path), frames))
+
+    # --- the packed CSI field of Bfee records alone, without file access and framing ---
+    rng = np.random.default_rng(0)
+    if selected("bfee_decode"):
+        num_records = 500 if quick else 4000
+        # 3 rx x 1 tx, the layout of widar
+        raw = rng.integers(0, 256, (num_records, (30 * (3 * 1 * 8 * 2 + 3) + 7) // 8), dtype=np.uint8)
+        cases.append(("bfee_decode", lambda: decode_csi(raw, 3, 1), num_records))
+
+    # --- algorithms on one widar-like sample ---
+    num_frames = 300 if quick else 2000
+    csi = (rng.normal(size=(num_frames, 30, 3)) + 1j * rng.normal(size=(num_frames, 30, 3))).astype(np.complex64)
+    if selected("phase_calibration"):
+        cases.append(("phase_calibration", lambda: phase_calibration(csi), num_frames))
+    if selected("wavelet_denoise"):
+        cases.append(("wavelet_denoise", lambda: wavelet_denoise_csi(csi), num_frames))
+
+    # --- fixed length batches ---
+    samples = [csi[:length] for length in rng.integers(num_frames // 2, num_frames, 32 if quick else 128)]
+    if selected("resize_list"):
+        cases.append(("resize_list", lambda: np.array(resize_csi_to_fixed_length(samples, num_frames)), len(samples)))
+    if selected("resize_batch"):
+        cases.append(("resize_batch", lambda: build_fixed_length_batch(samples, num_frames), len(samples)))
+
+    # --- the processor on a folder of widar files ---
+    if selected("processor_process") or selected("processor_files"):
+        folder = work_dir / "processor"
+        make_dataset(folder, 'widar', num_files=4 if quick else 12, num_packets=300 if quick else 1500)
+        reader = get_reader_class('widar')()
+        data_list = [_quiet(_read_call(reader, path)) for path in sorted(folder.iterdir())]
+        processor = BaseProcessor()
+        if selected("processor_process"):
+            cases.append(("processor_process", lambda: processor.process(data_list, dataset='widar'),
+                          len(data_list)))
+        if selected("processor_files"):
+            cases.append(("processor_files", lambda: processor.process_files(str(folder), dataset='widar'),
+                          len(data_list)))
+
+    results = {}
+    for name, func, items in cases:
+        timing = _quiet(lambda: time_call(func, repeat=repeat))
+        timing['items'] = int(items)
+        timing['items_per_s'] = items / timing['best'] if timing['best'] > 0 else None
+        results[name] = timing
+        print(f"{name:<20} best {timing['best'] * 1e3:10.2f} ms | median {timing['median'] * 1e3:10.2f} ms | "
+              f"{timing['items_per_s'] or 0:12.0f} items/s")
+    return results
+
+
+def environment() -> dict:
+    import pywt
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pywt': pywt.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def load_history(path) -> list:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def append_history(path, results: dict, label: str = None) -> dict:
+    """
+    append one run to the json history at path
+    return:
+        the stored run
+    """
+    run = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'label': label, 'environment': environment(),
+           'results': results}
+    history = load_history(path)
+    history.append(run)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+    return run
+
+
+def save_baseline(path, results: dict):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+
+def compare(results: dict, baseline: dict, threshold: float = 0.10) -> list:
+    """
+    param:
+        baseline: results of an earlier run_benchmarks(), or a saved baseline / history run
+        threshold: relative slowdown of the best time counted as regression
+    return:
+        names of the benchmarks that regressed
+    """
+    baseline = baseline.get('results', baseline)
+    regressions = []
+    print(f"{'benchmark':<20}{'baseline ms':>13}{'current ms':>13}{'ratio':>8}")
+    for name, timing in results.items():
+        if name not in baseline:
+            print(f"{name:<20}{'-':>13}{timing['best'] * 1e3:>13.2f}{'-':>8}  new")
+            continue
+        ratio = timing['best'] / baseline[name]['best']
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            status = "faster"
+        else:
+            status = ""
+        print(f"{name:<20}{baseline[name]['best'] * 1e3:>13.2f}{timing['best'] * 1e3:>13.2f}{ratio:>8.2f}  {status}")
+    return regressions
+
+
+def _read_call(reader, path):
+    return lambda: reader.read_file(str(path))
+
+
+def _quiet(func):
+    # readers and workers print per file, keep the benchmark output readable
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        return func()
+
+
+def _as_list(data):
+    return data if isinstance(data, list) else [data]
@@ -0,0 +1,122 @@
+import os
+import struct
+import numpy as np
+
+from pathlib import Path
+
+NUM_SUBCARRIERS = 30
+
+
+def make_bfee_file(path, num_packets: int = 1000, n_rx: int = 3, n_tx: int = 1, seed: int = 0,
+                   other_records: bool = True):
+    """
+    write an Intel 5300 log of num_packets valid 0xBB (beamforming feedback) records
+
+    param:
+        n_rx, n_tx: antenna layout of every record
+        other_records: interleave records of other codes, which readers have to skip
+    """
+    rng = np.random.default_rng(seed)
+    csi_len = (NUM_SUBCARRIERS * (n_rx * n_tx * 8 * 2 + 3) + 7) // 8
+    # 50 us between packets, plus jitter
+    timestamps = (np.arange(num_packets) * 50 + rng.integers(0, 10, num_packets)).astype(np.uint32)
+    rssi = rng.integers(20, 50, (num_packets, 3))
+    csi = rng.integers(0, 256, (num_packets, csi_len), dtype=np.uint8)
+
+    out = bytearray()
+    for i in range(num_packets):
+        header = struct.pack('<IHHBBBBBbBBHH', int(timestamps[i]), i & 0xffff, 0, n_rx, n_tx,
+                             *(int(r) for r in rssi[i]), -92, 40, 0x24, csi_len, 0x113)
+        payload = header + csi[i].tobytes()
+        out += struct.pack('>H', len(payload) + 1) + b'\xbb' + payload
+        if other_records and i % 10 == 0:
+            other = rng.integers(0, 256, 16, dtype=np.uint8).tobytes()
+            out += struct.pack('>H', len(other) + 1) + b'\xc1' + other
+
+    with open(path, 'wb') as f:
+        f.write(bytes(out))
+
+
+def make_xrf_file(path, num_time_steps: int = 1000, seed: int = 0):
+    """
+    write an XRF55 WiFi sample: float32 (3 receivers * 30 subcarriers * 3 antennas, time)
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_time_steps, dtype=np.float32)
+    base = 20 + 5 * np.sin(2 * np.pi * t / 200)
+    data = base + rng.normal(0, 1, (3 * NUM_SUBCARRIERS * 3, num_time_steps))
+    np.save(path, data.astype(np.float32))
+
+
+def make_elder_file(path, num_rows: int = 100, n_tx: int = 3, n_rx: int = 3, n_sub: int = 512, seed: int = 0):
+    """
+    write an elderAL amplitude CSV: timestamp + amp_tx{t}_rx{r}_sub{s} columns
+    """
+    rng = np.random.default_rng(seed)
+    columns = [f"amp_tx{tx}_rx{rx}_sub{sub}" for tx in range(n_tx) for rx in range(n_rx) for sub in range(n_sub)]
+    timestamps = 1700000000000000000 + np.cumsum(rng.integers(900, 1100, num_rows))
+    values = np.abs(rng.normal(20, 10, (num_rows, len(columns))))
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(','.join(['timestamp'] + columns) + '\n')
+        for ts, row in zip(timestamps, values):
+            f.write(f"{ts}," + ','.join(f"{v:.4f}" for v in row) + '\n')
+
+
+def make_zte_file(path, num_timestamps: int = 100, n_rx: int = 3, n_tx: int = 2, n_sub: int = 512, seed: int = 0):
+    """
+    write a ZTE I/Q CSV: one row per (timestamp, rx{r}-tx{t} chain) with csi_i_* / csi_q_* columns
+    """
+    rng = np.random.default_rng(seed)
+    header = ['timestamp', 'rx_chain_num', 'other'] + \
+             [f"csi_i_{k}" for k in range(n_sub)] + [f"csi_q_{k}" for k in range(n_sub)]
+    timestamps = np.cumsum(rng.integers(20, 40, num_timestamps))
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(','.join(header) + '\n')
+        for ts in timestamps:
+            values = rng.normal(0, 1, (n_rx * n_tx, 2 * n_sub))
+            for chain, row in enumerate(values):
+                name = f"rx{chain // n_tx}-tx{chain % n_tx}"
+                f.write(f"{ts},{name},1," + ','.join(f"{v:.3f}" for v in row) + '\n')
+
+
+def make_dataset(folder, dataset: str, num_files: int = 24, seed: int = 0, **kwargs) -> list:
+    """
+    fill folder with num_files synthetic raw files of dataset, named so that
+    BaseProcessor can parse labels and groups from them. Every 4 consecutive files hold
+    labels 1-4 of one group, up to 6 groups: the default 24 files fill all of them
+
+    param:
+        kwargs: passed to the file generator of the format, e.g. num_packets=500
+    return:
+        paths of the written files
+    """
+    os.makedirs(folder, exist_ok=True)
+    folder = Path(folder)
+    paths = []
+    for i in range(num_files):
+        # a group per run of 4 files, each run holding every label, so group-wise train / test / val
+        # splits find enough of both once there are a few groups
+        user, label, group = i % 3 + 1, i % 4 + 1, i // 4 % 6 + 1
+        file_seed = seed * 1000 + i
+        if dataset in ('widar', 'gait'):
+            if dataset == 'widar':
+                name = f"user{user}-{label}-{group}-1-{i}-r1.dat"
+            else:
+                name = f"user{label}-{group}-{i}-r1.dat"
+            path = folder / name
+            make_bfee_file(path, seed=file_seed, **kwargs)
+        elif dataset == 'xrf55':
+            path = folder / f"{group}_{label}_{i}.npy"
+            make_xrf_file(path, seed=file_seed, **kwargs)
+        elif dataset == 'elderAL':
+            path = folder / f"user{user}_position{group}_activity{label}_{i}.csv"
+            make_elder_file(path, seed=file_seed, **kwargs)
+        elif dataset == 'zte':
+            path = folder / f"user{user}_position{group}_activity{label}_{i}.csv"
+            make_zte_file(path, seed=file_seed, **kwargs)
+        else:
+            raise ValueError(f"no synthetic generator for dataset: {dataset}")
+        paths.append(path)
+    return paths
@@ -1,17 +1,179 @@
+import sys
+import json
 import argparse
 
-from .core import pipeline
+from .core import pipeline, profile_preprocessing
 from .download import download
+from .predict import predict, export_model, EXPORT_FORMATS
+from .quantize import quantize, QUANT_MODES
+from .serve import serve, load_test
+from .stream import stream, replay_server
+from .bench import run_benchmarks, compare, append_history, save_baseline, default_history_path
+from .utils import configure_resources
+from .utils.train_func import AMP_DTYPES, COMPILE_MODES, STOP_METRICS
+
+
+def _configure_resources(args):
+    configure_resources(cpus=args.cpus, preprocess_workers=args.workers,
+                        loader_workers=args.loader_workers, torch_threads=args.torch_threads)
+
+
+def _add_resource_arguments(parser):
+    parser.add_argument("--cpus", type=int, default=None,
+                        help="total core budget (default: $WSDP_CPUS or the cpu affinity of the process)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="preprocessing processes (default: $WSDP_PREPROCESS_WORKERS or --cpus)")
+    parser.add_argument("--loader-workers", type=int, default=None,
+                        help="worker processes per DataLoader (default: $WSDP_LOADER_WORKERS or cpus / 4, at most 8)")
+    parser.add_argument("--torch-threads", type=int, default=None,
+                        help="torch intra-op threads (default: $WSDP_TORCH_THREADS or the remaining cores)")
 
 
 def _run_pipeline(args):
+    _configure_resources(args)
     pipeline(input_path=args.input_path,
              output_folder=args.output_folder,
              dataset=args.dataset,
-             model_path=args.model_path
+             model_path=args.model_path,
+             cache_dir=args.cache_dir,
+             use_cache=not args.no_cache,
+             shared_memory=args.shared_memory,
+             store_path=args.store,
+             amp_dtype=args.amp_dtype,
+             compile_mode=_compile_mode(args),
+             channels_last=args.channels_last,
+             parallel_seeds=args.parallel_seeds,
+             early_stopping=_early_stopping(args),
+             resume=args.resume,
+             profile=args.profile
              )
 
 
+def _compile_mode(args):
+    if args.compile_mode is not None:
+        return args.compile_mode
+    return 'default' if args.compile else None
+
+
+def _early_stopping(args):
+    if args.patience is None:
+        return None
+    return {'patience': args.patience, 'min_delta': args.min_delta, 'metric': args.stop_metric}
+
+
+def _run_profile(args):
+    _configure_resources(args)
+    profile_preprocessing(input_path=args.input_path,
+                          dataset=args.dataset,
+                          max_files=args.files,
+                          output_path=args.output,
+                          shared_memory=args.shared_memory,
+                          trace_memory=args.trace_memory)
+
+
+def _run_bench(args):
+    _configure_resources(args)
+    results = run_benchmarks(work_dir=args.work_dir, quick=args.quick, repeat=args.repeat, only=args.only)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        # a history file compares against its latest run
+        if isinstance(baseline, list):
+            baseline = baseline[-1]
+        regressions = compare(results, baseline, threshold=args.threshold)
+    if not args.no_history:
+        append_history(args.history, results, label=args.label)
+        print(f"results appended to {args.history}")
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results)
+        print(f"baseline saved to {args.save_baseline}")
+    if regressions:
+        print(f"regressions: {regressions}")
+        sys.exit(1)
+
+
+def _run_stream(args):
+    _configure_resources(args)
+    stream(source=args.source,
+           model_file=args.model,
+           dataset=args.dataset,
+           window=args.window,
+           hop=args.hop,
+           model_path=args.model_path,
+           follow=not args.no_follow,
+           denoise=not args.no_denoise,
+           max_windows=args.max_windows,
+           budget_ms=args.budget_ms,
+           output_path=args.output,
+           verbose=not args.quiet)
+
+
+def _run_predict(args):
+    _configure_resources(args)
+    predict(model_file=args.model,
+            input_path=args.input_path,
+            dataset=args.dataset,
+            output_path=args.output,
+            model_path=args.model_path,
+            batch_size=args.batch_size,
+            amp_dtype=args.amp_dtype)
+
+
+def _run_export(args):
+    export_model(model_file=args.checkpoint,
+                 output_path=args.output,
+                 format=args.format,
+                 model_path=args.model_path,
+                 input_shape=args.input_shape,
+                 opset=args.opset,
+                 check=not args.no_check)
+
+
+def _run_quantize(args):
+    _configure_resources(args)
+    quantize(model_file=args.checkpoint,
+             input_path=args.input_path,
+             dataset=args.dataset,
+             output_path=args.output,
+             mode=args.mode,
+             calibration_samples=args.calibration_samples,
+             batch_size=args.batch_size,
+             model_path=args.model_path,
+             cache_dir=args.cache_dir,
+             use_cache=not args.no_cache,
+             repeat=args.repeat)
+
+
+def _run_serve(args):
+    _configure_resources(args)
+    serve(model_file=args.model,
+          host=args.host,
+          port=args.port,
+          unix_socket=args.unix_socket,
+          dataset=args.dataset,
+          model_path=args.model_path,
+          max_batch_size=args.max_batch_size,
+          max_wait_ms=args.max_wait_ms,
+          max_queue=args.max_queue,
+          input_shape=args.input_shape,
+          denoise=not args.no_denoise)
+
+
+def _run_loadgen(args):
+    load_test(target=args.target,
+              requests=args.requests,
+              concurrency=args.concurrency,
+              dat_file=args.dat_file,
+              complex_input=args.complex,
+              rate=args.rate,
+              output_path=args.output)
+
+
+def _run_replay(args):
+    replay_server(args.dat_file, host=args.host, port=args.port, speed=args.speed, loop=args.loop)
+
+
 def _download_pipeline(args):
     download(args.dataset_name, args.dest)
 
@@ -21,12 +183,188 @@ def main_cli():
     subparser = parser.add_subparsers(dest="command", required=True, help="available commands")
 
     parser_run = subparser.add_parser("run", help="run pipeline")
-    parser_run.add_argument("input_path", required=True, type=str, help="input data path")
-    parser_run.add_argument("output_folder", required=True, type=str, help="output path")
-    parser_run.add_argument("dataset", required=True, type=str, help="dataset name")
-    parser_run.add_argument("model_path", "-m", type=str, help="path of custom model")
+    parser_run.add_argument("input_path", type=str, help="input data path")
+    parser_run.add_argument("output_folder", type=str, help="output path")
+    parser_run.add_argument("dataset", type=str, help="dataset name")
+    parser_run.add_argument("model_path", nargs="?", default=None, type=str, help="path of custom model")
+    parser_run.add_argument("--cache-dir", type=str, default=None,
+                            help="folder of the preprocessing cache (default: $WSDP_CACHE_DIR or ~/.cache/wsdp)")
+    parser_run.add_argument("--no-cache", action="store_true", help="always preprocess raw files from scratch")
+    parser_run.add_argument("--shared-memory", action="store_true",
+                            help="collect preprocessed samples through shared memory instead of pickling")
+    parser_run.add_argument("--store", type=str, default=None,
+                            help="folder of a memory-mapped store of preprocessed samples, "
+                                 "built once and read lazily during training")
+    parser_run.add_argument("--amp-dtype", choices=AMP_DTYPES, default=None,
+                            help="autocast training and eval to this dtype (default: model_params.json, fp32)")
+    parser_run.add_argument("--compile", action="store_true", help="train through torch.compile")
+    parser_run.add_argument("--compile-mode", choices=COMPILE_MODES, default=None,
+                            help="torch.compile mode, implies --compile (default: model_params.json, off)")
+    parser_run.add_argument("--channels-last", action="store_true", default=None,
+                            help="keep conv weights in channels_last memory format")
+    parser_run.add_argument("--parallel-seeds", type=int, default=1,
+                            help="train this many seeds at once in separate processes sharing the cpu budget")
+    parser_run.add_argument("--patience", type=int, default=None,
+                            help="stop a seed after this many epochs without improvement (default: model_params.json)")
+    parser_run.add_argument("--min-delta", type=float, default=0.0,
+                            help="smallest change of the stop metric counted as improvement")
+    parser_run.add_argument("--stop-metric", choices=STOP_METRICS, default="val_loss",
+                            help="metric watched by early stopping")
+    parser_run.add_argument("--resume", action="store_true",
+                            help="continue from seeds.json and the last checkpoints in the output folder")
+    parser_run.add_argument("--profile", action="store_true",
+                            help="time every stage and save the breakdown to <output_folder>/profile.json")
+    _add_resource_arguments(parser_run)
     parser_run.set_defaults(func=_run_pipeline)
 
+    parser_profile = subparser.add_parser("profile", help="profile preprocessing on a sample of raw files")
+    parser_profile.add_argument("input_path", type=str, help="input data path")
+    parser_profile.add_argument("dataset", type=str, help="dataset name")
+    parser_profile.add_argument("--files", type=int, default=50, help="number of raw files to preprocess")
+    parser_profile.add_argument("--output", type=str, default=None, help="save the report as json")
+    parser_profile.add_argument("--shared-memory", action="store_true",
+                                help="profile collection through shared memory")
+    parser_profile.add_argument("--trace-memory", action="store_true",
+                                help="also trace the peak of python allocations (slower)")
+    _add_resource_arguments(parser_profile)
+    parser_profile.set_defaults(func=_run_profile)
+
+    parser_bench = subparser.add_parser("bench", help="benchmark readers, algorithms and preprocessing "
+                                                      "on synthetic data")
+    parser_bench.add_argument("--quick", action="store_true", help="small inputs, for a fast sanity check")
+    parser_bench.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser_bench.add_argument("--only", nargs="+", default=None, metavar="NAME",
+                              help="run only benchmarks whose name starts with one of these")
+    parser_bench.add_argument("--work-dir", type=str, default=None,
+                              help="folder for the synthetic files (default: a temporary folder)")
+    parser_bench.add_argument("--history", type=str, default=default_history_path(),
+                              help="json history the results are appended to")
+    parser_bench.add_argument("--no-history", action="store_true", help="do not record the results")
+    parser_bench.add_argument("--label", type=str, default=None, help="label of this run in the history")
+    parser_bench.add_argument("--baseline", type=str, default=None,
+                              help="baseline (or history) json to compare against, exit 1 on regressions")
+    parser_bench.add_argument("--save-baseline", type=str, default=None, help="save the results as baseline json")
+    parser_bench.add_argument("--threshold", type=float, default=0.10,
+                              help="relative slowdown counted as regression")
+    _add_resource_arguments(parser_bench)
+    parser_bench.set_defaults(func=_run_bench)
+
+    parser_predict = subparser.add_parser("predict", help="classify raw files with a trained model")
+    parser_predict.add_argument("model", type=str,
+                                help="checkpoint written by `wsdp run`, or a model written by `wsdp export`")
+    parser_predict.add_argument("input_path", type=str, help="input data path")
+    parser_predict.add_argument("dataset", type=str, help="dataset name")
+    parser_predict.add_argument("--output", type=str, default="predictions.csv",
+                                help="predictions as .csv or .parquet (default: predictions.csv)")
+    parser_predict.add_argument("--model-path", type=str, default=None,
+                                help="path of the custom model (default: the one recorded in the checkpoint)")
+    parser_predict.add_argument("--batch-size", type=int, default=256, help="samples per forward pass")
+    parser_predict.add_argument("--amp-dtype", choices=AMP_DTYPES, default=None,
+                                help="autocast inference to this dtype")
+    _add_resource_arguments(parser_predict)
+    parser_predict.set_defaults(func=_run_predict)
+
+    parser_export = subparser.add_parser("export", help="export a checkpoint to TorchScript or ONNX")
+    parser_export.add_argument("checkpoint", type=str, help="checkpoint written by `wsdp run`")
+    parser_export.add_argument("output", type=str, help="exported file, .pt / .ts for TorchScript, .onnx for ONNX")
+    parser_export.add_argument("--format", choices=EXPORT_FORMATS, default=None,
+                               help="export format (default: from the suffix of output)")
+    parser_export.add_argument("--model-path", type=str, default=None,
+                               help="path of the custom model (default: the one recorded in the checkpoint)")
+    parser_export.add_argument("--input-shape", type=int, nargs=3, default=None, metavar=("T", "F", "A"),
+                               help="shape of one sample (default: recorded in the checkpoint)")
+    parser_export.add_argument("--opset", type=int, default=18, help="ONNX opset version")
+    parser_export.add_argument("--no-check", action="store_true",
+                               help="do not compare the export with the checkpoint model")
+    parser_export.set_defaults(func=_run_export)
+
+    parser_quantize = subparser.add_parser("quantize", help="quantize a checkpoint to int8 for cpu inference")
+    parser_quantize.add_argument("checkpoint", type=str, help="checkpoint written by `wsdp run`")
+    parser_quantize.add_argument("input_path", type=str, help="input data path the checkpoint was trained on")
+    parser_quantize.add_argument("dataset", type=str, help="dataset name")
+    parser_quantize.add_argument("--output", type=str, default=None,
+                                 help="TorchScript file of the int8 model (default: <checkpoint>.int8.pt)")
+    parser_quantize.add_argument("--mode", choices=QUANT_MODES, default="static",
+                                 help="static: int8 convolutions calibrated on train samples plus dynamic int8 "
+                                      "Linear layers; dynamic: Linear layers only")
+    parser_quantize.add_argument("--calibration-samples", type=int, default=64,
+                                 help="train samples the activation ranges are observed on")
+    parser_quantize.add_argument("--batch-size", type=int, default=32,
+                                 help="batch of the evaluation and the throughput measurement")
+    parser_quantize.add_argument("--model-path", type=str, default=None,
+                                 help="path of the custom model (default: the one recorded in the checkpoint)")
+    parser_quantize.add_argument("--cache-dir", type=str, default=None,
+                                 help="folder of the preprocessing cache (default: $WSDP_CACHE_DIR or ~/.cache/wsdp)")
+    parser_quantize.add_argument("--no-cache", action="store_true", help="always preprocess raw files from scratch")
+    parser_quantize.add_argument("--repeat", type=int, default=20, help="timed runs of the latency measurement")
+    _add_resource_arguments(parser_quantize)
+    parser_quantize.set_defaults(func=_run_quantize)
+
+    parser_stream = subparser.add_parser("stream", help="classify a live Bfee stream with a trained checkpoint")
+    parser_stream.add_argument("source", type=str,
+                               help="'-' for stdin, tcp://host:port, a named pipe or a file being appended")
+    parser_stream.add_argument("model", type=str,
+                               help="checkpoint written by `wsdp run`, or a model written by `wsdp export`")
+    parser_stream.add_argument("--dataset", type=str, default="widar",
+                               help="preset the model was trained with, for models without metadata")
+    parser_stream.add_argument("--window", type=int, default=None,
+                               help="frames per decision (default: padding_length the model was trained with)")
+    parser_stream.add_argument("--hop", type=int, default=100, help="new frames between two decisions")
+    parser_stream.add_argument("--model-path", type=str, default=None, help="path of the custom model")
+    parser_stream.add_argument("--no-follow", action="store_true", help="stop at the end of a regular file")
+    parser_stream.add_argument("--no-denoise", action="store_true", help="skip wavelet denoising of the frames")
+    parser_stream.add_argument("--max-windows", type=int, default=None, help="stop after this many decisions")
+    parser_stream.add_argument("--budget-ms", type=float, default=100.0,
+                               help="latency target, decisions above it are counted in the report")
+    parser_stream.add_argument("--output", type=str, default=None, help="save the latency report as json")
+    parser_stream.add_argument("--quiet", action="store_true", help="only print the final report")
+    _add_resource_arguments(parser_stream)
+    parser_stream.set_defaults(func=_run_stream)
+
+    parser_replay = subparser.add_parser("replay", help="serve a recorded .dat over tcp at capture rate")
+    parser_replay.add_argument("dat_file", type=str, help="Bfee .dat file")
+    parser_replay.add_argument("--host", type=str, default="127.0.0.1", help="address to listen on")
+    parser_replay.add_argument("--port", type=int, default=5555, help="port to listen on")
+    parser_replay.add_argument("--speed", type=float, default=1.0, help="replay speed relative to capture")
+    parser_replay.add_argument("--loop", action="store_true", help="start over at the end of the file")
+    parser_replay.set_defaults(func=_run_replay)
+
+    parser_serve = subparser.add_parser("serve", help="serve a trained model on localhost with dynamic batching")
+    parser_serve.add_argument("model", type=str,
+                              help="checkpoint written by `wsdp run`, or a model written by `wsdp export` / `wsdp quantize`")
+    parser_serve.add_argument("--host", type=str, default="127.0.0.1", help="address to listen on")
+    parser_serve.add_argument("--port", type=int, default=8000, help="port to listen on")
+    parser_serve.add_argument("--unix-socket", type=str, default=None, help="listen on this unix socket instead")
+    parser_serve.add_argument("--dataset", type=str, default="widar",
+                              help="preset the model was trained with, for models without metadata")
+    parser_serve.add_argument("--model-path", type=str, default=None, help="path of the custom model")
+    parser_serve.add_argument("--max-batch-size", type=int, default=32, help="windows per forward pass at most")
+    parser_serve.add_argument("--max-wait-ms", type=float, default=5.0,
+                              help="time the first window of a batch waits for others to join")
+    parser_serve.add_argument("--max-queue", type=int, default=1024,
+                              help="windows waiting at most, further requests are answered with 503")
+    parser_serve.add_argument("--input-shape", type=int, nargs=3, default=None, metavar=("T", "F", "A"),
+                              help="shape of one window, for models without metadata")
+    parser_serve.add_argument("--no-denoise", action="store_true",
+                              help="skip wavelet denoising of complex windows and Bfee records")
+    _add_resource_arguments(parser_serve)
+    parser_serve.set_defaults(func=_run_serve)
+
+    parser_loadgen = subparser.add_parser("loadgen", help="send concurrent requests to `wsdp serve` and "
+                                                          "report latency and throughput")
+    parser_loadgen.add_argument("target", type=str, nargs="?", default="http://127.0.0.1:8000",
+                                help="http://host:port or unix:///path/to/socket of the server")
+    parser_loadgen.add_argument("--requests", type=int, default=1000, help="requests to send")
+    parser_loadgen.add_argument("--concurrency", type=int, default=16, help="parallel connections")
+    parser_loadgen.add_argument("--dat-file", type=str, default=None,
+                                help="send windows of raw Bfee records of this recording")
+    parser_loadgen.add_argument("--complex", action="store_true",
+                                help="send random complex windows, preprocessed by the server")
+    parser_loadgen.add_argument("--rate", type=float, default=None,
+                                help="total requests per second (default: as fast as the server answers)")
+    parser_loadgen.add_argument("--output", type=str, default=None, help="save the report as json")
+    parser_loadgen.set_defaults(func=_run_loadgen)
+
     parser_download = subparser.add_parser("download", help="download datasets")
     parser_download.add_argument("dataset_name", type=str, help="dataset name")
     parser_download.add_argument("dest", type=str, help="destination path for storing dataset")
@@ -1,5 +1,7 @@
 import os
+import json
 import random
+import multiprocessing
 import torch
 import pandas as pd
 import numpy as np
@@ -8,18 +10,49 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 
 from pathlib import Path
-from . import readers
-from .datasets import CSIDataset
-from .utils import load_params, train_model, resize_csi_to_fixed_length, load_custom_model
+from functools import partial
+from dataclasses import asdict
+from concurrent.futures import ProcessPoolExecutor
+from .datasets import CSIDataset, MemmapCSIDataset, make_loader
+from .utils import load_params, train_model, build_fixed_length_batch, load_custom_model, PreprocessCache, \
+    get_resources, configure_resources, autocast_context, SharedArray, open_store, EarlyStopping, \
+    enable_profiling, disable_profiling, stage, split_indices
+from .utils.train_func import COMPILE_MODES
 from .processors.base_processor import BaseProcessor
 from .models import CSIModel
 from sklearn.metrics import confusion_matrix, classification_report, accuracy_score
-from torch.utils.data import DataLoader
-from sklearn.model_selection import GroupShuffleSplit
 from torch.optim.lr_scheduler import ReduceLROnPlateau
 
 
-def pipeline(input_path: str, output_folder: str, dataset: str, model_path=None):
+def pipeline(input_path: str, output_folder: str, dataset: str, model_path=None,
+             cache_dir=None, use_cache=True, shared_memory=False, store_path=None,
+             amp_dtype=None, compile_mode=None, channels_last=None, parallel_seeds=1,
+             early_stopping=None, resume=False, profile=False):
+    """
+    param:
+        input_path: folder of raw data
+        output_folder: folder for checkpoints, histories and figures
+        dataset: dataset name
+        model_path: optional file defining a custom model
+        cache_dir: folder of the preprocessing cache, default_cache_dir() if None
+        use_cache: reuse sanitized tensors of unchanged raw files across runs
+        shared_memory: preprocessing workers write padded amplitudes into one shared memory block
+        store_path: folder of an on-disk store, preprocessing writes padded amplitudes into a
+                    memory-mapped file there once and training reads samples from it lazily,
+                    for datasets larger than RAM
+        amp_dtype: autocast training and eval to 'bfloat16' or 'float16', model_params.json if None
+        compile_mode: torch.compile mode for training, model_params.json if None
+        channels_last: channels_last memory format for the model, model_params.json if None
+        parallel_seeds: number of seeds trained at once, in separate processes that split the cpu budget
+                        and all read the same shared memory block (or store). the caller's script
+                        must be guarded by if __name__ == '__main__' as the processes are spawned
+        early_stopping: dict of EarlyStopping fields (patience, min_delta, metric) or an EarlyStopping,
+                        model_params.json if None
+        resume: reuse the seeds in output_folder/seeds.json and continue every seed from its last
+                checkpoint instead of starting over. checkpoints of another dataset, label set, input
+                shape or model are refused
+        profile: time every stage and save the breakdown to output_folder/profile.json
+    """
     # params
     ipath = input_path
     os.makedirs(output_folder, exist_ok=True)
@@ -38,106 +71,266 @@ def pipeline(input_path: str, output_folder: str, dataset: str, model_path=None)
         wd = params["wd"]
         num_epochs = params["num_epochs"]
         padding_length = params["padding_length"]
-    except ValueError | FileNotFoundError as e:
+        # explicit arguments win over the preset, which defaults to fp32 eager mode
+        amp_dtype = amp_dtype or params.get("amp_dtype")
+        compile_mode = compile_mode or params.get("compile_mode")
+        if compile_mode and compile_mode not in COMPILE_MODES:
+            raise ValueError(f"unsupported compile mode: {compile_mode}, available: {list(COMPILE_MODES)}")
+        channels_last = params.get("channels_last", False) if channels_last is None else channels_last
+        early_stopping = early_stopping or params.get("early_stopping")
+        if isinstance(early_stopping, dict):
+            try:
+                early_stopping = EarlyStopping(**early_stopping)
+            except TypeError as e:
+                raise ValueError(f"invalid early stopping settings {early_stopping}: {e}") from e
+    except (ValueError, FileNotFoundError) as e:
         print(f"error: {e}")
         return
 
     test_split = 0.4
     val_split = 0.3
-    random_seeds = [random.randint(0, 999) for _ in range(5)]
+    # seeds are kept with the checkpoints, a resumed run trains the very same splits
+    seeds_path = opath / "seeds.json"
+    if resume and seeds_path.is_file():
+        with open(seeds_path, 'r', encoding='utf-8') as f:
+            random_seeds = json.load(f)
+        print(f"resume with the seeds of {seeds_path}")
+    else:
+        random_seeds = [random.randint(0, 999) for _ in range(5)]
+        with open(seeds_path, 'w', encoding='utf-8') as f:
+            json.dump(random_seeds, f)
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    resources = get_resources()
+    resources.report()
+    print(f"training mode: autocast {amp_dtype or 'off'} | compile {compile_mode or 'off'} | "
+          f"channels_last {'on' if channels_last else 'off'}")
 
-    # begin to preprocess, training and eval
-    csi_data_list = readers.load_data(ipath, dataset_name)
+    profiler = enable_profiling() if profile else None
 
+    try:
+        # parallel seed runs read the data from shared memory unless it lives in a store already
+        if parallel_seeds > 1 and store_path is None:
+            shared_memory = True
+
+        # begin to preprocess, training and eval
+        cache = PreprocessCache(cache_dir) if use_cache else None
+        processor = BaseProcessor()
+        processed_data, labels, groups = processor.process_files(ipath, dataset=dataset_name, cache=cache,
+                                                                 shared_memory=shared_memory,
+                                                                 padding_length=padding_length,
+                                                                 amplitude=True, store_path=store_path)
+        if len(labels) == 0:
+            # no shared block or store exists then, the seed runs would have nothing to open
+            del processed_data
+            processor.release()
+            raise ValueError(f"no samples were processed from {ipath}, check the files and the dataset name")
+
+        if not shared_memory and store_path is None:
+            # one (N, padding_length, F, A) float32 amplitude array, shared by every split below
+            with stage('resize', samples=len(processed_data)):
+                processed_data = build_fixed_length_batch(processed_data, target_length=padding_length)
+        print(f"processed_data's shape: {processed_data[0].shape}")
+
+        unique_labels = sorted(list(set(labels)))
+        label_map = {label: i for i, label in enumerate(unique_labels)}
+        zero_indexed_labels = [label_map[label] for label in labels]
+
+        unique_groups = sorted(list(set(groups)))
+        group_map = {group: i for i, group in enumerate(unique_groups)}
+        zero_indexed_groups = [group_map[group] for group in groups]
+
+        print(f"all unique labels idx: {list(set(zero_indexed_labels))}")
+        print(f"all unique groups idx: {list(set(zero_indexed_groups))}")
+        print(f"total sample: {len(processed_data)}, \
+                total labels: {len(zero_indexed_labels)}, total groups: {len(zero_indexed_groups)}")
+        print(f"the following 5 seeds will be used: {random_seeds}")
+
+
+        """
+        ===============================
+            Training and Evaluation
+        ===============================
+        """
+
+        zero_indexed_labels = np.array(zero_indexed_labels)
+        zero_indexed_groups = np.array(zero_indexed_groups)
+        # saved in every checkpoint, so predict / stream can map class indices back to labels
+        metadata = {
+            'dataset': dataset_name,
+            'labels': unique_labels,
+            'num_classes': len(unique_labels),
+            'padding_length': padding_length,
+            'input_shape': [int(d) for d in processed_data[0].shape],
+            'model_path': os.path.abspath(model_path) if model_path is not None else None,
+            'test_split': test_split,
+            'val_split': val_split,
+        }
+        run_seed = partial(_run_seed, labels=zero_indexed_labels, groups=zero_indexed_groups,
+                           num_classes=len(unique_labels), opath=opath, model_path=model_path, device=device,
+                           store_path=store_path, batch=batch, lr=lr, wd=wd, num_epochs=num_epochs,
+                           test_split=test_split, val_split=val_split, amp_dtype=amp_dtype,
+                           compile_mode=compile_mode, channels_last=channels_last,
+                           early_stopping=early_stopping, resume=resume, metadata=metadata)
+
+        try:
+            if parallel_seeds > 1:
+                # stages inside the spawned runs are not profiled, only their total
+                with stage('seed_runs'):
+                    top1_accuracies = _run_seeds_in_parallel(run_seed, random_seeds, processor.shared_block,
+                                                             parallel_seeds, resources)
+            else:
+                top1_accuracies = [run_seed(current_seed, data=processed_data, run_idx=i, num_runs=len(random_seeds),
+                                            num_workers=resources.loader_workers)
+                                   for i, current_seed in enumerate(random_seeds)]
+        finally:
+            # the shared memory block must not outlive a failed run either
+            del processed_data
+            processor.release()
+
+        accuracies_np = np.array(top1_accuracies)
+        mean_accuracy = np.mean(accuracies_np)
+        variance_accuracy = np.var(accuracies_np)
+
+        print(f"All {len(random_seeds)} Top-1 acc: {[f'{acc:.4f}' for acc in top1_accuracies]}")
+        print(f"Avg Top-1 acc: {mean_accuracy:.4f}")
+        print(f"Variance of Top-1 acc: {variance_accuracy:.6f}")
+        print("=" * 72)
+
+        if profiler is not None:
+            report = profiler.save(opath / "profile.json")
+            profiler.print_summary(report)
+
+        print(f"\n All pipeline complete")
+    finally:
+        # a failed run must not leave the global profiler collecting stages
+        if profiler is not None:
+            disable_profiling()
+
+
+def profile_preprocessing(input_path: str, dataset: str, max_files: int = 50, output_path=None,
+                          shared_memory=False, trace_memory=False) -> dict:
+    """
+    run only the preprocessing of pipeline() on a sample of raw files, without the cache,
+    and print where the time goes
+
+    param:
+        max_files: number of raw files, spread evenly over the sorted file list
+        output_path: optional json file for the report
+        shared_memory: profile the shared memory collection path
+        trace_memory: also report the peak of python allocations (slower)
+    return:
+        the report dict
+    """
+    padding_length = load_params(dataset)["padding_length"]
+    get_resources().report()
+    profiler = enable_profiling(trace_memory=trace_memory)
     processor = BaseProcessor()
-    res = processor.process(csi_data_list, dataset=dataset_name)
-
-    unadjusted_data = res[0]
-    processed_data = resize_csi_to_fixed_length(unadjusted_data, target_length=padding_length)
-    print(f"processed_data's shape: {processed_data[0].shape}")
-
-    labels = res[1]
-    groups = res[2]
-
-    unique_labels = sorted(list(set(labels)))
-    label_map = {label: i for i, label in enumerate(unique_labels)}
-    zero_indexed_labels = [label_map[label] for label in labels]
+    try:
+        processed_data, labels, _ = processor.process_files(input_path, dataset=dataset,
+                                                            shared_memory=shared_memory,
+                                                            padding_length=padding_length,
+                                                            amplitude=True, max_files=max_files)
+        if not shared_memory:
+            with stage('resize', samples=len(processed_data)):
+                processed_data = build_fixed_length_batch(processed_data, target_length=padding_length)
+        print(f"{len(labels)} samples of shape {processed_data.shape[1:] if len(labels) else None}")
+        del processed_data
+        report = profiler.report()
+    finally:
+        processor.release()
+        disable_profiling()
+
+    if output_path is not None:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"report saved to {output_path}")
+    profiler.print_summary(report)
+    return report
+
+
+def _run_seeds_in_parallel(run_seed, seeds, shared_block, parallel_seeds, resources):
+    """
+    run the seeds in up to parallel_seeds spawned processes, each with an equal share of
+    the cpu budget. every run reads the same array: the shared memory block filled by the
+    preprocessing workers, or the memmap store that each run opens by path.
+    """
+    parallel_seeds = min(parallel_seeds, len(seeds))
+    cpus = max(1, resources.cpus // parallel_seeds)
+    loader_workers = resources.loader_workers // parallel_seeds
+    # in-memory data needs no DataLoader workers, the store does
+    torch_threads = cpus if shared_block is not None else max(1, cpus - loader_workers)
+    print(f"running {len(seeds)} seeds in {parallel_seeds} processes, {cpus} cpus each")
+
+    # spawn: forking a parent that already started torch / OpenMP thread pools can deadlock
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=parallel_seeds, mp_context=ctx, initializer=_init_seed_worker,
+                             initargs=(cpus, loader_workers, torch_threads)) as executor:
+        futures = [executor.submit(run_seed, current_seed, data=shared_block, run_idx=i, num_runs=len(seeds),
+                                   num_workers=loader_workers)
+                   for i, current_seed in enumerate(seeds)]
+        return [future.result() for future in futures]
+
+
+def _init_seed_worker(cpus, loader_workers, torch_threads):
+    configure_resources(cpus=cpus, preprocess_workers=1, loader_workers=loader_workers,
+                        torch_threads=torch_threads)
+
+
+def _run_seed(current_seed, data, labels, groups, num_classes, opath, model_path, device, store_path,
+              batch, lr, wd, num_epochs, test_split, val_split, amp_dtype, compile_mode, channels_last,
+              early_stopping, resume, metadata=None, run_idx=0, num_runs=1, num_workers=0):
+    """
+    split, train and evaluate one random seed, save its history, checkpoint and confusion matrix
 
-    unique_groups = sorted(list(set(groups)))
-    group_map = {group: i for i, group in enumerate(unique_groups)}
-    zero_indexed_groups = [group_map[group] for group in groups]
+    param:
+        data: (N, T, F, A) amplitudes, the SharedArray holding them, or None to open the store
+    return:
+        top-1 accuracy on the test split
+    """
+    if isinstance(data, SharedArray):
+        data = data.array[:len(labels)]
+    elif data is None:
+        data = open_store(store_path)[0]
 
-    print(f"all unique labels idx: {list(set(zero_indexed_labels))}")
-    print(f"all unique groups idx: {list(set(zero_indexed_groups))}")
-    print(f"total sample: {len(processed_data)}, \
-            total labels: {len(zero_indexed_labels)}, total groups: {len(zero_indexed_groups)}")
-    print(f"the following 5 seeds will be used: {random_seeds}")
+    print(f"\n{'=' * 25} epoch {run_idx + 1}/{num_runs} \
+            begin (Random State: {current_seed}) {'=' * 25}\n")
 
+    with stage('splits'):
+        train_idx, test_idx, val_idx = split_indices(labels, groups, current_seed, test_split, val_split)
 
-    """
-    ===============================
-        Training and Evaluation
-    ===============================
-    """
+    print(f"num of samples in train_data: {len(train_idx)}, \
+            num of samples in test_data: {len(test_idx)}, num of samples in val_data: {len(val_idx)}")
+    print(f"shape of first sample of train_data: {data[train_idx[0]].shape}, \
+            shape of last sample of train_data: {data[train_idx[-1]].shape}")
 
-    processed_data = np.array(processed_data)
-    zero_indexed_labels = np.array(zero_indexed_labels)
-    zero_indexed_groups = np.array(zero_indexed_groups)
-    top1_accuracies = []
-
-    for i, current_seed in enumerate(random_seeds):
-        print(f"\n{'=' * 25} epoch {i + 1}/{len(random_seeds)} \
-                begin (Random State: {current_seed}) {'=' * 25}\n")
-
-        splitter_1 = GroupShuffleSplit(n_splits=1, test_size=test_split, random_state=current_seed)
-        train_idx, temp_idx = \
-            next(splitter_1.split(processed_data, zero_indexed_labels, groups=zero_indexed_groups))
-
-        train_data = processed_data[train_idx]
-        train_labels = zero_indexed_labels[train_idx]
-
-        temp_data = processed_data[temp_idx]
-        temp_labels = zero_indexed_labels[temp_idx]
-        temp_groups = zero_indexed_groups[temp_idx]
-
-        splitter_2 = GroupShuffleSplit(n_splits=1, test_size=val_split, random_state=current_seed)
-        test_idx, val_idx = next(splitter_2.split(temp_data, temp_labels, groups=temp_groups))
-
-        test_data = temp_data[test_idx]
-        test_labels = temp_labels[test_idx]
-
-        val_data = temp_data[val_idx]
-        val_labels = temp_labels[val_idx]
-
-        train_data = np.stack(train_data, axis=0)
-        val_data = np.stack(val_data, axis=0)
-        test_data = np.stack(test_data, axis=0)
-        print(f"num of samples in train_data: {len(train_data)}, \
-                num of samples in test_data: {len(test_data)}, num of samples in val_data: {len(val_data)}")
-        print(f"shape of first sample of train_data: {train_data[0].shape}, \
-                shape of last sample of train_data: {train_data[-1].shape}")
-
-        train_dataset = CSIDataset(train_data, train_labels)
-        test_dataset = CSIDataset(test_data, test_labels)
-        val_dataset = CSIDataset(val_data, val_labels)
-        train_loader = DataLoader(train_dataset, batch_size=batch, num_workers=16, shuffle=True)
-        test_loader = DataLoader(test_dataset, batch_size=batch, num_workers=16, shuffle=False)
-        val_loader = DataLoader(val_dataset, batch_size=batch, num_workers=16, shuffle=False)
-
-        num_classes = len(unique_labels)
-        if model_path is None:
-            model = CSIModel(num_classes=num_classes)
-        else:
-            model = load_custom_model(model_path, num_classes)
-        model = model.to(device)
-        criterion = nn.CrossEntropyLoss()
-        optimizer = torch.optim.AdamW(model.parameters(), lr=lr, weight_decay=wd)
-        scheduler = ReduceLROnPlateau(optimizer, mode='min', factor=0.1, patience=5)
-
-        checkpoint_path = opath / f"best_checkpoint_{current_seed}.pth"
-
-        print("\n--- begin training ---")
+    if store_path is not None:
+        make_dataset = partial(MemmapCSIDataset, store_path, labels)
+    else:
+        make_dataset = partial(CSIDataset, data, labels)
+    train_dataset = make_dataset(train_idx)
+    test_dataset = make_dataset(test_idx)
+    val_dataset = make_dataset(val_idx)
+    # in-memory data is batched by indexing its tensor, workers only serve the memmap store
+    train_loader = make_loader(train_dataset, batch_size=batch, num_workers=num_workers, shuffle=True)
+    test_loader = make_loader(test_dataset, batch_size=batch, num_workers=num_workers, shuffle=False)
+    val_loader = make_loader(val_dataset, batch_size=batch, num_workers=num_workers, shuffle=False)
+
+    if model_path is None:
+        model = CSIModel(num_classes=num_classes)
+    else:
+        model = load_custom_model(model_path, num_classes)
+    model = model.to(device)
+    criterion = nn.CrossEntropyLoss()
+    optimizer = torch.optim.AdamW(model.parameters(), lr=lr, weight_decay=wd)
+    scheduler = ReduceLROnPlateau(optimizer, mode='min', factor=0.1, patience=5)
+
+    checkpoint_path = opath / f"best_checkpoint_{current_seed}.pth"
+    last_checkpoint_path = opath / f"last_checkpoint_{current_seed}.pth"
+    # every seed counts its own plateau
+    early_stopping = EarlyStopping(**asdict(early_stopping)) if early_stopping is not None else None
+
+    print("\n--- begin training ---")
+    with stage('train', runs=1):
         training_history = train_model(
             model=model,
             criterion=criterion,
@@ -147,70 +340,68 @@ def pipeline(input_path: str, output_folder: str, dataset: str, model_path=None)
             val_loader=val_loader,
             num_epochs=num_epochs,
             device=device,
-            checkpoint_path=checkpoint_path
+            checkpoint_path=checkpoint_path,
+            amp_dtype=amp_dtype,
+            compile_mode=compile_mode,
+            channels_last=channels_last,
+            early_stopping=early_stopping,
+            last_checkpoint_path=last_checkpoint_path,
+            resume=resume,
+            metadata=dict(metadata or {}, seed=current_seed)
         )
 
-        print(f"\n--- training complete, save training_history to: \
-               {opath / ('training_history_' + str(current_seed) + '.csv')} ---")
+    print(f"\n--- training complete, save training_history to: \
+           {opath / ('training_history_' + str(current_seed) + '.csv')} ---")
 
-        df = pd.DataFrame(training_history)
-        df.to_csv(opath / f"training_history_{current_seed}.csv", index_label='epoch')
+    df = pd.DataFrame(training_history)
+    df.to_csv(opath / f"training_history_{current_seed}.csv", index_label='epoch')
 
-        print("\n--- save successfully, begin to evaluate model ---")
-        cp = checkpoint_path
-        if not os.path.isfile(cp):
-            raise FileNotFoundError(f" no model in file path: {cp}")
+    print("\n--- save successfully, begin to evaluate model ---")
+    cp = checkpoint_path
+    if not os.path.isfile(cp):
+        raise FileNotFoundError(f" no model in file path: {cp}")
 
-        print(f"loading model from {cp} ...")
-        checkpoint = torch.load(cp, map_location=device)
-        model.load_state_dict(checkpoint['model_state_dict'])
-        model.eval()
-        print("loading success, and switch to eval mode")
+    print(f"loading model from {cp} ...")
+    checkpoint = torch.load(cp, map_location=device)
+    model.load_state_dict(checkpoint['model_state_dict'])
+    model.eval()
+    print("loading success, and switch to eval mode")
 
-        all_labels = []
-        all_predictions = []
+    all_labels = []
+    all_predictions = []
 
-        with torch.no_grad():
-            for batch_idx, (csi_data, test_labels) in enumerate(test_loader):
-                csi_data = csi_data.to(device)
-                test_labels = test_labels.to(device)
+    with stage('evaluate', samples=len(test_idx)), torch.inference_mode():
+        for batch_idx, (csi_data, test_labels) in enumerate(test_loader):
+            csi_data = csi_data.to(device)
+            test_labels = test_labels.to(device)
 
+            with autocast_context(device, amp_dtype):
                 outputs = model(csi_data)
 
-                _, predicted_classes = torch.max(outputs.data, 1)
-                all_predictions.extend(predicted_classes.cpu().numpy())
-                all_labels.extend(test_labels.cpu().numpy())
-
-        print("eval complete")
-
-        current_top1_acc = accuracy_score(all_labels, all_predictions)
-        top1_accuracies.append(current_top1_acc)
-        print(f"\n Top-1 acc of current epoch: {current_top1_acc:.4f}")
+            _, predicted_classes = torch.max(outputs.data, 1)
+            all_predictions.extend(predicted_classes.cpu().numpy())
+            all_labels.extend(test_labels.cpu().numpy())
 
-        print("\n" + "=" * 50)
-        print("classification report:")
-        print(classification_report(all_labels, all_predictions))
-        print("=" * 50 + "\n")
+    print("eval complete")
 
-        cm = confusion_matrix(all_labels, all_predictions)
-        plt.figure(figsize=(10, 8))
-        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
-        plt.title(f"Confusion Matrix (Random State: {current_seed})", fontsize=16)
-        plt.ylabel("Actual Label", fontsize=12)
-        plt.xlabel("Predicted Label", fontsize=12)
-        plt.tight_layout()
+    current_top1_acc = accuracy_score(all_labels, all_predictions)
+    print(f"\n Top-1 acc of current epoch: {current_top1_acc:.4f}")
 
-        figure_path = opath / f"cm_rs_{current_seed}.png"
-        plt.savefig(figure_path)
-        plt.close()
+    print("\n" + "=" * 50)
+    print("classification report:")
+    print(classification_report(all_labels, all_predictions))
+    print("=" * 50 + "\n")
 
-    accuracies_np = np.array(top1_accuracies)
-    mean_accuracy = np.mean(accuracies_np)
-    variance_accuracy = np.var(accuracies_np)
+    cm = confusion_matrix(all_labels, all_predictions)
+    plt.figure(figsize=(10, 8))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
+    plt.title(f"Confusion Matrix (Random State: {current_seed})", fontsize=16)
+    plt.ylabel("Actual Label", fontsize=12)
+    plt.xlabel("Predicted Label", fontsize=12)
+    plt.tight_layout()
 
-    print(f"All {len(random_seeds)} Top-1 acc: {[f'{acc:.4f}' for acc in top1_accuracies]}")
-    print(f"Avg Top-1 acc: {mean_accuracy:.4f}")
-    print(f"Variance of Top-1 acc: {variance_accuracy:.6f}")
-    print("=" * 72)
+    figure_path = opath / f"cm_rs_{current_seed}.png"
+    plt.savefig(figure_path)
+    plt.close()
 
-    print(f"\n All pipeline complete")
\ No newline at end of file
+    return current_top1_acc
@@ -4,13 +4,28 @@ import numpy as np
 from torch.utils.data import Dataset
 
 class CSIDataset(Dataset):
-    def __init__(self, data_list, labels):
-        data_list = np.abs(data_list)
-        self.data_list = torch.from_numpy(data_list).float()
-        self.labels = torch.from_numpy(labels).long()
+    def __init__(self, data_list, labels, indices=None):
+        """
+        param:
+            data_list: (N, T, F, A) array, turned into its magnitude. non-negative float32 input
+                       is its own magnitude and is wrapped without a copy
+            labels: (N,) labels
+            indices: optional rows of data_list making up this dataset, so several splits
+                     can share one array instead of each holding a copy
+        """
+        data_list = np.asarray(data_list)
+        if np.iscomplexobj(data_list) or np.any(data_list < 0):
+            data_list = np.abs(data_list)
+        self.data_list = torch.from_numpy(np.asarray(data_list, dtype=np.float32))
+        self.labels = torch.from_numpy(np.asarray(labels)).long()
+        self.indices = None if indices is None else torch.as_tensor(indices, dtype=torch.long)
 
     def __len__(self):
+        if self.indices is not None:
+            return len(self.indices)
         return len(self.labels)
 
     def __getitem__(self, idx):
-        return self.data_list[idx], self.labels[idx]
\ No newline at end of file
+        if self.indices is not None:
+            idx = self.indices[idx]
+        return self.data_list[idx], self.labels[idx]
@@ -0,0 +1,49 @@
+import torch
+import numpy as np
+
+from torch.utils.data import Dataset
+from wsdp.utils.store import store_paths
+
+
+class MemmapCSIDataset(Dataset):
+    """
+    CSIDataset reading samples lazily from the memory-mapped data.npy of a store
+    (see BaseProcessor.process_files(store_path=...)). the file is mapped on first access
+    in each process, so DataLoader workers share its pages through the OS cache and
+    only the samples of the current batches are resident.
+    """
+
+    def __init__(self, store_path, labels=None, indices=None):
+        """
+        param:
+            store_path: store folder holding data.npy and labels.npy
+            labels: (N,) labels of all samples of the store, labels.npy if None
+            indices: optional rows of the store making up this dataset
+        """
+        self.data_path = str(store_paths(store_path)['data'])
+        if labels is None:
+            labels = np.load(store_paths(store_path)['labels'])
+        self.labels = torch.from_numpy(np.asarray(labels)).long()
+        self.indices = None if indices is None else torch.as_tensor(indices, dtype=torch.long)
+        self._data = None
+
+    def __getstate__(self):
+        # workers map the file themselves instead of receiving the mapping
+        state = self.__dict__.copy()
+        state['_data'] = None
+        return state
+
+    def __len__(self):
+        if self.indices is not None:
+            return len(self.indices)
+        return len(self.labels)
+
+    def __getitem__(self, idx):
+        if self._data is None:
+            self._data = np.load(self.data_path, mmap_mode='r')
+        if self.indices is not None:
+            idx = int(self.indices[idx])
+        sample = np.asarray(self._data[idx])
+        if np.iscomplexobj(sample):
+            sample = np.abs(sample)
+        return torch.from_numpy(np.array(sample, dtype=np.float32)), self.labels[idx]
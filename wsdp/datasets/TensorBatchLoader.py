@@ -0,0 +1,74 @@
+import torch
+
+from torch.utils.data import DataLoader, BatchSampler, RandomSampler, SequentialSampler
+from .CSIDataset import CSIDataset
+
+
+class TensorBatchLoader:
+    """
+    loader for datasets held in memory as one tensor (CSIDataset): every batch is one
+    index_select on the tensor in the main process, instead of worker processes fetching
+    samples one index at a time, collating them with torch.stack and sending batches back.
+    batches and the consumption of the torch random state match a DataLoader with the
+    same batch_size / shuffle / generator / drop_last.
+    """
+
+    def __init__(self, dataset: CSIDataset, batch_size: int = 1, shuffle: bool = False,
+                 generator=None, drop_last: bool = False):
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.drop_last = drop_last
+        self.generator = generator
+        if shuffle:
+            self.sampler = RandomSampler(dataset, generator=generator)
+        else:
+            self.sampler = SequentialSampler(dataset)
+        self.batch_sampler = BatchSampler(self.sampler, batch_size, drop_last)
+
+    def __len__(self):
+        return len(self.batch_sampler)
+
+    def __iter__(self):
+        # a DataLoader draws the base seed of its workers before sampling, do the same
+        # so shuffling under a given seed yields the very same batches
+        torch.empty((), dtype=torch.int64).random_(generator=self.generator)
+        data = self.dataset.data_list
+        labels = self.dataset.labels
+        for batch in self.batch_sampler:
+            idx = torch.as_tensor(batch, dtype=torch.long)
+            if self.dataset.indices is not None:
+                idx = self.dataset.indices[idx]
+            yield data.index_select(0, idx), labels.index_select(0, idx)
+
+
+def make_loader(dataset, batch_size: int, shuffle: bool = False, num_workers: int = 0, **kwargs):
+    """
+    TensorBatchLoader for in-memory CSIDatasets, a DataLoader for anything else
+    (e.g. MemmapCSIDataset, whose samples are read lazily by the workers)
+    """
+    if isinstance(dataset, CSIDataset):
+        return TensorBatchLoader(dataset, batch_size=batch_size, shuffle=shuffle,
+                                 generator=kwargs.get('generator'), drop_last=kwargs.get('drop_last', False))
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, num_workers=num_workers, **kwargs)
+
+
+def as_tensor_loader(loader):
+    """
+    swap a plain DataLoader over an in-memory CSIDataset for the equivalent TensorBatchLoader,
+    any other loader is returned as is
+    """
+    if not isinstance(loader, DataLoader) or not isinstance(loader.dataset, CSIDataset):
+        return loader
+    # a custom sampler or collate_fn changes what a batch is, keep the DataLoader then
+    if loader.batch_sampler is None or type(loader.batch_sampler) is not BatchSampler:
+        return loader
+    if type(loader.sampler) not in (RandomSampler, SequentialSampler):
+        return loader
+    if isinstance(loader.sampler, RandomSampler) and \
+            (loader.sampler.replacement or loader.sampler._num_samples is not None):
+        return loader
+    if loader.collate_fn is not torch.utils.data.default_collate:
+        return loader
+    return TensorBatchLoader(loader.dataset, batch_size=loader.batch_size,
+                             shuffle=isinstance(loader.sampler, RandomSampler),
+                             generator=loader.generator, drop_last=loader.drop_last)
@@ -1 +1,3 @@
-from .CSIDataset import CSIDataset
\ No newline at end of file
+from .CSIDataset import CSIDataset
+from .MemmapCSIDataset import MemmapCSIDataset
+from .TensorBatchLoader import TensorBatchLoader, make_loader, as_tensor_loader
@@ -0,0 +1,233 @@
+import json
+import time
+import torch
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+from .processors.base_processor import BaseProcessor
+from .utils import load_params, load_checkpoint_model, build_fixed_length_batch, autocast_context, get_resources
+
+EXPORT_FORMATS = ('torchscript', 'onnx')
+# exported models are recognized by their suffix, anything else is a pipeline() checkpoint
+_FORMAT_SUFFIXES = {'.pt': 'torchscript', '.ts': 'torchscript', '.onnx': 'onnx'}
+
+
+class Predictor:
+    """
+    run a trained model on float32 (B, T, F, A) amplitude batches. the model is either a
+    checkpoint written by pipeline() or a TorchScript (.pt / .ts) or ONNX (.onnx) file written
+    by export_model() or quantize(), which keep the checkpoint metadata in a json file next to it.
+    """
+
+    def __init__(self, model_file, model_path=None, device=None, amp_dtype=None):
+        """
+        param:
+            model_file: checkpoint, TorchScript or ONNX file
+            model_path: custom model file of a checkpoint, see load_checkpoint_model()
+            device: torch device, cuda if available when None. ONNX always runs on the CPU provider
+            amp_dtype: autocast checkpoint / TorchScript inference to 'bfloat16' or 'float16'
+        """
+        self.model_file = str(model_file)
+        self.backend = _FORMAT_SUFFIXES.get(Path(model_file).suffix.lower(), 'checkpoint')
+        self.device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
+        self.amp_dtype = amp_dtype
+        self.model = None
+        self.session = None
+
+        if self.backend == 'checkpoint':
+            self.model, self.metadata = load_checkpoint_model(model_file, model_path, device=self.device)
+        else:
+            self.metadata = load_export_metadata(model_file)
+            if self.backend == 'torchscript':
+                if self.metadata.get('quantization'):
+                    # int8 kernels only exist for the cpu
+                    self.device = torch.device('cpu')
+                self.model = torch.jit.load(self.model_file, map_location=self.device).eval()
+            else:
+                ort = _import_onnxruntime()
+                options = ort.SessionOptions()
+                options.intra_op_num_threads = get_resources().torch_threads
+                self.device = torch.device('cpu')
+                self.session = ort.InferenceSession(self.model_file, options, providers=['CPUExecutionProvider'])
+                self._input_name = self.session.get_inputs()[0].name
+
+    @property
+    def labels(self) -> list:
+        """
+        label of every class index, the indices themselves for checkpoints without metadata
+        """
+        labels = self.metadata.get('labels')
+        if labels is None:
+            labels = list(range(self.metadata.get('num_classes', 0)))
+        return labels
+
+    def __call__(self, batch) -> np.ndarray:
+        """
+        param:
+            batch: float32 (B, T, F, A) amplitude
+        return:
+            float32 (B, num_classes) logits
+        """
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        if self.session is not None:
+            return self.session.run(None, {self._input_name: batch})[0]
+        x = torch.from_numpy(batch).to(self.device)
+        with torch.inference_mode(), autocast_context(self.device, self.amp_dtype):
+            logits = self.model(x)
+        return logits.float().cpu().numpy()
+
+    def predict_proba(self, batch) -> np.ndarray:
+        logits = self(batch)
+        e = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return e / e.sum(axis=1, keepdims=True)
+
+
+def predict(model_file, input_path: str, dataset: str, output_path=None, model_path=None, batch_size: int = 256,
+            amp_dtype=None) -> pd.DataFrame:
+    """
+    preprocess every raw file under input_path like pipeline() does and classify the samples
+
+    param:
+        model_file: checkpoint of pipeline() or a model exported by export_model()
+        dataset: dataset name, decides the reader. file names without a label are predicted too
+        output_path: write the predictions as .csv or .parquet (needs pyarrow)
+        batch_size: samples per forward pass, every pass gets the same (batch_size, T, F, A) shape
+    return:
+        DataFrame with one row per sample: file, sample (index within the file), label (parsed
+        from the file name, None if there is none), predicted, confidence and prob_<label> per class
+    """
+    predictor = Predictor(model_file, model_path, amp_dtype=amp_dtype)
+    metadata = predictor.metadata
+    if metadata.get('dataset') not in (None, dataset):
+        print(f"[Warning] the model was trained on {metadata['dataset']}, predicting on {dataset}")
+    padding_length = metadata.get('padding_length') or load_params(dataset)["padding_length"]
+    print(f"predict with {predictor.backend} model {model_file} on {predictor.device}")
+
+    processor = BaseProcessor()
+    data, labels, _ = processor.process_files(input_path, dataset=dataset, require_labels=False)
+    sources = processor.sources
+    if not data:
+        print(f"no samples found in {input_path}")
+        return pd.DataFrame()
+
+    batch = build_fixed_length_batch(data, target_length=padding_length)
+    del data
+    expected = metadata.get('input_shape')
+    if expected is not None and list(batch.shape[1:]) != list(expected):
+        raise ValueError(f"samples have shape {list(batch.shape[1:])}, the model expects {expected}")
+
+    num_samples = len(batch)
+    batch_size = min(batch_size, num_samples)
+    probs = []
+    # the last partial batch is zero-padded to the full shape, the padding rows are dropped
+    tail = np.zeros((batch_size,) + batch.shape[1:], dtype=np.float32)
+    start = time.perf_counter()
+    for i in range(0, num_samples, batch_size):
+        chunk = batch[i:i + batch_size]
+        n = len(chunk)
+        if n < batch_size:
+            tail[:n] = chunk
+            chunk = tail
+        probs.append(predictor.predict_proba(chunk)[:n])
+    elapsed = time.perf_counter() - start
+    probs = np.concatenate(probs)
+    print(f"classified {num_samples} samples in {elapsed:.3f}s ({num_samples / elapsed:.1f} samples/s)")
+
+    class_labels = predictor.labels or list(range(probs.shape[1]))
+    predicted = probs.argmax(axis=1)
+    sample_idx = pd.Series(sources).groupby(sources).cumcount().to_numpy()
+    df = pd.DataFrame({
+        'file': sources,
+        'sample': sample_idx,
+        # object column: unlabeled samples stay None instead of turning the labels into floats
+        'label': pd.Series(labels, dtype=object),
+        'predicted': [class_labels[i] for i in predicted],
+        'confidence': probs.max(axis=1),
+    })
+    for j, name in enumerate(class_labels):
+        df[f"prob_{name}"] = probs[:, j]
+
+    known = df['label'].notna()
+    if known.any():
+        accuracy = (df.loc[known, 'label'] == df.loc[known, 'predicted']).mean()
+        print(f"Top-1 acc on {int(known.sum())} labeled samples: {accuracy:.4f}")
+
+    if output_path is not None:
+        if Path(output_path).suffix.lower() == '.parquet':
+            df.to_parquet(output_path, index=False)
+        else:
+            df.to_csv(output_path, index=False)
+        print(f"predictions saved to {output_path}")
+    return df
+
+
+def export_model(model_file, output_path, format=None, model_path=None, input_shape=None, opset: int = 18,
+                 check: bool = True) -> dict:
+    """
+    export a checkpoint of pipeline() to TorchScript or ONNX. the checkpoint metadata
+    (labels, input shape, ...) is saved to <output_path>.json for Predictor
+
+    param:
+        format: 'torchscript' or 'onnx', taken from the suffix of output_path if None
+        input_shape: (T, F, A) of one sample, from the checkpoint metadata if None
+        opset: ONNX opset version
+        check: run the export on a random batch and compare it with the checkpoint model
+    return:
+        metadata saved with the export
+    """
+    format = format or _FORMAT_SUFFIXES.get(Path(output_path).suffix.lower())
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"unsupported export format: {format}, available: {list(EXPORT_FORMATS)}")
+    model, metadata = load_checkpoint_model(model_file, model_path, device='cpu')
+    input_shape = input_shape or metadata.get('input_shape')
+    if input_shape is None:
+        raise ValueError(f"{model_file} has no input shape recorded, pass input_shape=(T, F, A)")
+    example = torch.rand((2,) + tuple(input_shape))
+
+    with torch.no_grad():
+        if format == 'torchscript':
+            traced = torch.jit.trace(model, example)
+            traced.save(str(output_path))
+        else:
+            _import_onnxruntime()
+            torch.onnx.export(model, (example,), str(output_path), input_names=['csi'], output_names=['logits'],
+                              dynamic_shapes=({0: torch.export.Dim('batch')},), opset_version=opset,
+                              dynamo=True, external_data=False)
+
+    metadata = dict(metadata, input_shape=[int(d) for d in input_shape], format=format,
+                    checkpoint=str(Path(model_file).resolve()))
+    with open(_metadata_path(output_path), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+    print(f"exported {model_file} to {format}: {output_path}")
+
+    if check:
+        # the batch size differs from the traced one, so dynamic shapes are exercised too
+        x = torch.rand((3,) + tuple(input_shape))
+        with torch.no_grad():
+            expected = model(x).numpy()
+        actual = Predictor(output_path, device='cpu')(x.numpy())
+        print(f"max abs difference to the checkpoint model: {np.abs(actual - expected).max():.2e}")
+    return metadata
+
+
+def load_export_metadata(output_path) -> dict:
+    try:
+        with open(_metadata_path(output_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print(f"[Warning] no metadata next to {output_path}, classes are reported as indices")
+        return {}
+
+
+def _metadata_path(output_path) -> Path:
+    return Path(str(output_path) + ".json")
+
+
+def _import_onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError("ONNX export and inference need onnx, onnxscript and onnxruntime: "
+                          "pip install wsdp[onnx]") from e
+    return onnxruntime
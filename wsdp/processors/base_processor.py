@@ -4,47 +4,295 @@ import numpy as np
 
 from typing import List
 from functools import partial
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from wsdp.algorithms import phase_calibration, wavelet_denoise_csi
+from wsdp.readers import get_reader_class, list_data_files
 from wsdp.structure import CSIData
+from wsdp.utils import SharedArray, write_fixed_length, get_resources, limit_worker_threads
+from wsdp.utils.cache import processing_fingerprint, file_list_digest
+from wsdp.utils.store import create_store, finalize_store, open_store
+from wsdp.utils.profiler import stage, count, get_profiler, enable_profiling, disable_profiling
 
 
 class BaseProcessor():
+    def __init__(self):
+        # shared memory block behind the data of the last shared_memory run
+        self.shared_block = None
+        # raw file name of every sample returned by the last process_files run
+        self.sources = None
+
     def process(self, data_list: List[CSIData], **kwargs):
+        """
+        kwargs:
+            dataset: dataset name, decides how labels and groups are parsed
+            cache: optional PreprocessCache, data restored from it is passed through
+                   and freshly sanitized samples are stored per raw file
+        """
         dataset = kwargs.get('dataset', '')
+        cache = kwargs.get('cache')
+        results = [csi_data.processed for csi_data in data_list]
+        todo = [i for i, res in enumerate(results) if res is None]
+        worker_func = partial(_process_single_csi, dataset=dataset)
+        resources = get_resources()
+        with ProcessPoolExecutor(max_workers=resources.pool_size(len(todo)),
+                                 initializer=limit_worker_threads) as executor:
+            for i, res in zip(todo, executor.map(worker_func, [data_list[i] for i in todo])):
+                results[i] = res
+
+        if cache is not None:
+            _store_in_cache(cache, [data_list[i] for i in todo], [results[i] for i in todo], dataset)
+
         all_data = []
         all_labels = []
         all_groups = []
-        worker_func = partial(_process_single_csi, dataset=dataset)
-        with ProcessPoolExecutor(max_workers=32) as executor:
-            results = executor.map(worker_func, data_list)
-            for csi, label, group in results:
-                if csi is not None:
-                    all_data.append(csi)
-                    all_labels.append(label)
-                    all_groups.append(group)
+        for csi, label, group in results:
+            if csi is not None:
+                all_data.append(csi)
+                all_labels.append(label)
+                all_groups.append(group)
+        return all_data, all_labels, all_groups
+
+    def process_files(self, file_path: str, **kwargs):
+        """
+        fused mode: each worker reads one raw file, sorts, calibrates and denoises it,
+        and only the cleaned tensors travel back to the parent.
+
+        kwargs:
+            dataset: dataset name, decides the reader and how labels and groups are parsed
+            cache: optional PreprocessCache, checked before reading and filled by the workers
+            shared_memory: workers write every sample, truncated or zero-padded to padding_length,
+                           straight into one shared memory block instead of pickling it back
+            store_path: folder of an on-disk store. workers write the samples into its memory-mapped
+                        data.npy like with shared_memory, and labels / groups are saved next to it.
+                        a complete store built from the same input and settings is reused as is
+            padding_length: time length of the samples, required with shared_memory and store_path
+            max_files: only process this many raw files, spread evenly over the sorted file list
+            amplitude: with shared_memory or store_path, store the float32 amplitude of the samples instead of
+                       complex64 CSI, which halves the block and is what CSIDataset consumes
+            require_labels: skip files whose name carries no label (default). if False their samples
+                            are kept with label and group None, e.g. to predict on unlabeled recordings
+        return:
+            the same (all_data, all_labels, all_groups) as process(), in file order.
+            with shared_memory all_data is one (N, padding_length, F, A) complex64 (or float32)
+            array living in self.shared_block, see release(). with store_path it is a read-only
+            memmap of the store. self.sources holds the file name of every returned sample
+            (None when a store is reused)
+        """
+        dataset = kwargs.get('dataset', '')
+        cache = kwargs.get('cache')
+        shared_memory = kwargs.get('shared_memory', False)
+        padding_length = kwargs.get('padding_length')
+        amplitude = kwargs.get('amplitude', False)
+        store_path = kwargs.get('store_path')
+        require_labels = kwargs.get('require_labels', True)
+        self.sources = None
+        if (shared_memory or store_path is not None) and padding_length is None:
+            raise ValueError("shared_memory and store_path require padding_length")
+        max_files = kwargs.get('max_files')
+        if max_files is not None and max_files < 1:
+            raise ValueError(f"max_files must be at least 1, got {max_files}")
+        with stage('discover'):
+            files = list_data_files(file_path)
+        if max_files is not None and len(files) > max_files:
+            files = files[::max(1, len(files) // max_files)][:max_files]
+        count('discover', files=len(files))
+        if store_path is not None:
+            # the digest of the file list catches raw files added, removed or rewritten since the store was built
+            store_meta = {'dataset': dataset, 'padding_length': padding_length, 'amplitude': amplitude,
+                          'input_path': os.path.abspath(str(file_path)),
+                          'files': file_list_digest(files),
+                          'fingerprint': processing_fingerprint(dataset)}
+            stored = open_store(store_path, **store_meta)
+            if stored is not None:
+                print(f"store: reuse {len(stored[0])} samples from {store_path}\n")
+                return stored
+        reader = get_reader_class(dataset)()
+        # workers time their stages only if this process is being profiled
+        profile = get_profiler() is not None
+        slots = reader.samples_per_file
+
+        per_file = [None] * len(files)
+        keys = [None] * len(files)
+        if cache is not None:
+            with stage('cache_lookup', files=len(files)):
+                for i, f in enumerate(files):
+                    keys[i] = cache.key(f, dataset)
+                    per_file[i] = cache.get(keys[i])
+            print(f"cache: {cache.hits}/{len(files)} files restored from {cache.cache_dir}\n")
+        todo = [i for i, samples in enumerate(per_file) if samples is None]
+        out = None
+
+        resources = get_resources()
+        with stage('preprocess', files=len(todo)), \
+                ProcessPoolExecutor(max_workers=resources.pool_size(len(todo)),
+                                    initializer=limit_worker_threads) as executor:
+            if shared_memory or store_path is not None:
+                # the block is sized from the first sample, process files until one is known
+                while todo and not any(per_file):
+                    i = todo.pop(0)
+                    future = executor.submit(_read_and_process_file, reader, files[i], dataset, cache, keys[i],
+                                             profile=profile, require_labels=require_labels)
+                    _report(files, per_file, i, *future.result())
+                sample_shape = next((samples[0][0].shape[1:] for samples in per_file if samples), None)
+                if sample_shape is not None:
+                    dtype = np.float32 if amplitude else np.complex64
+                    shape = (len(files) * slots, padding_length) + sample_shape
+                    if store_path is not None:
+                        out = create_store(store_path, shape, dtype)
+                    else:
+                        out = SharedArray(shape, dtype)
+                    for i, samples in enumerate(per_file):
+                        if samples:
+                            per_file[i] = _write_slots(out, i * slots, slots, samples)
+
+            futures = {executor.submit(_read_and_process_file, reader, files[i], dataset, cache, keys[i],
+                                       out, i * slots, slots, profile, require_labels): i
+                       for i in todo}
+            for future in as_completed(futures):
+                _report(files, per_file, futures[future], *future.result())
+
+        if cache is not None:
+            cache.evict()
+        self.sources = [files[i].name for i, samples in enumerate(per_file) for _ in samples or []]
+
+        if out is not None and store_path is not None:
+            _, all_labels, all_groups = _compact(out, per_file)
+            out.close()
+            finalize_store(store_path, len(all_labels), all_labels, all_groups, **store_meta)
+            return open_store(store_path)
+
+        if out is not None:
+            self.release()
+            self.shared_block = out
+            return _compact(out, per_file)
+
+        all_data = []
+        all_labels = []
+        all_groups = []
+        for samples in per_file:
+            for csi, label, group in samples or []:
+                all_data.append(csi)
+                all_labels.append(label)
+                all_groups.append(group)
         return all_data, all_labels, all_groups
 
+    def release(self):
+        """
+        free the shared memory block of the last shared_memory run.
+        every view of the returned data must be dropped before.
+        """
+        if self.shared_block is not None:
+            self.shared_block.close()
+            self.shared_block.unlink()
+            self.shared_block = None
+
+
+def _report(files, per_file, i, samples, err, stats=None):
+    if stats is not None:
+        get_profiler().merge(stats)
+    if err is None:
+        per_file[i] = samples
+        print(f"√ processed: {files[i].name}\n")
+    else:
+        print(f"× unable to process {files[i].name}: {err}\n")
+
+
+def _read_and_process_file(reader, file_path, dataset, cache=None, cache_key=None,
+                           out=None, first_slot=None, slots=None, profile=False, require_labels=True):
+    """
+    read one raw file and sanitize every CSIData it contains, inside one worker.
+    if out is given, samples are written into its slots [first_slot, first_slot + slots)
+    and only (slot, label, group) is returned for each of them.
+    with profile, the stage timings of the task are returned as third element
+    """
+    profiler = enable_profiling() if profile else None
+    try:
+        with stage('read', files=1, bytes=os.path.getsize(file_path)):
+            data = reader.read_file(str(file_path))
+        if profiler is not None:
+            count('read', frames=sum(len(d) for d in (data if isinstance(data, list) else [data])))
+        samples = []
+        for csi_data in (data if isinstance(data, list) else [data]):
+            csi, label, group = _process_single_csi(csi_data, dataset, require_labels)
+            if csi is not None:
+                samples.append((csi, label, group))
+        if cache is not None:
+            with stage('cache_store'):
+                cache.put(cache_key, samples)
+        if out is not None:
+            with stage('write_slots'):
+                samples = _write_slots(out, first_slot, slots, samples)
+        result = samples, None
+    except Exception as e:
+        result = None, str(e)
+    finally:
+        if out is not None:
+            out.close()
+    if profiler is None:
+        return result
+    disable_profiling()
+    return result + (profiler.worker_stats(),)
+
+
+def _write_slots(out, first_slot, slots, samples):
+    if len(samples) > slots:
+        raise ValueError(f"{len(samples)} samples in one file, at most {slots} expected")
+    entries = []
+    for j, (csi, label, group) in enumerate(samples):
+        if csi.shape[1:] != out.shape[2:]:
+            raise ValueError(f"sample shape {csi.shape[1:]} differs from {out.shape[2:]} of the dataset")
+        write_fixed_length(csi, out.array[first_slot + j], amplitude=not np.iscomplexobj(out.array))
+        entries.append((first_slot + j, label, group))
+    return entries
+
+
+def _compact(out, per_file):
+    # move the used slots to the front, slots only ever move down so this works in place
+    data = out.array
+    all_labels = []
+    all_groups = []
+    for slot, label, group in (entry for samples in per_file for entry in samples or []):
+        if slot != len(all_labels):
+            data[len(all_labels)] = data[slot]
+        all_labels.append(label)
+        all_groups.append(group)
+    return data[:len(all_labels)], all_labels, all_groups
+
+
+def _store_in_cache(cache, data_list, results, dataset):
+    # one entry per raw file, holding every sample read from it
+    entries = {}
+    for csi_data, (csi, label, group) in zip(data_list, results):
+        if csi_data.source is None:
+            continue
+        samples = entries.setdefault(csi_data.source, [])
+        if csi is not None:
+            samples.append((csi, label, group))
+    for source, samples in entries.items():
+        cache.put(cache.key(source, dataset), samples)
+    cache.evict()
+
 
 # function for parallel processing
-def _process_single_csi(csi_data, dataset):
+def _process_single_csi(csi_data, dataset, require_labels=True):
     res = parse_file_info_from_filename(csi_data.file_name, dataset)
-    label, group = selector(res, dataset)
-    sorted_frames = sorted(csi_data.frames, key=lambda frame: frame.timestamp)
-    frame_tensors = []
-    for frame in sorted_frames:
-        data = frame.csi_array
-        frame_tensors.append(data)
-    if frame_tensors:
-        whole_csi = np.stack(frame_tensors, axis=0)
+    if res is None and not require_labels:
+        label, group = None, None
+    else:
+        label, group = selector(res, dataset)
+    with stage('sort'):
+        whole_csi = csi_data.sorted_csi()
+    if whole_csi is not None and len(whole_csi) > 0:
         whole_csi = whole_csi.squeeze()
         # discard data with too short time period(1 timestamp)
         if whole_csi.ndim < 3:
             print(f"only one timestamp: {csi_data.file_name} \n")
             return None, None, None
         else:
-            whole_csi = phase_calibration(whole_csi)
-            cleaned_csi = wavelet_denoise_csi(whole_csi)
+            with stage('calibrate', frames=len(whole_csi)):
+                whole_csi = phase_calibration(whole_csi)
+            with stage('denoise', frames=len(whole_csi)):
+                cleaned_csi = wavelet_denoise_csi(whole_csi)
             return cleaned_csi, label, group
     return None, None, None
 
@@ -86,7 +334,8 @@ def parse_file_info_from_filename(f_name, dataset):
         else:
             print(f"[Warning] Skipping file {f_name}: Invalid format for xrf55.")
 
-    elif dataset == 'elderAL':
+    elif dataset in ('elderAL', 'zte'):
+        # placeholder for zte: the elderAL naming is borrowed, no zte specific naming is defined yet
         m = re.search(r"user(\d+)_position(\d+)_activity(\d+)", f_name)
         if m:
             user_id = int(m.group(1))
@@ -113,7 +362,8 @@ def selector(res, dataset):
     elif dataset == 'xrf55':
         label = int(res[1])
         group = int(res[0])
-    elif dataset == 'elderAL':
+    elif dataset in ('elderAL', 'zte'):
+        # zte borrows the elderAL layout, see parse_file_info
         label = int(res[2])
         group = int(res[1])
 
@@ -0,0 +1,205 @@
+import io
+import copy
+import json
+import torch
+import numpy as np
+import torch.nn as nn
+
+from pathlib import Path
+from contextlib import contextmanager
+from .processors.base_processor import BaseProcessor
+from .utils import load_params, load_checkpoint_model, build_fixed_length_batch, PreprocessCache, \
+    split_indices, time_call
+
+QUANT_MODES = ('static', 'dynamic')
+_CONV_TYPES = (nn.Conv1d, nn.Conv2d, nn.Conv3d)
+
+
+def quantize_model(model, mode: str = 'static', calibration=None, batch_size: int = 32) -> nn.Module:
+    """
+    int8 copy of a float model for CPU inference. Linear layers (the temporal part of CSIModel)
+    are quantized dynamically, with static mode the children holding convolutions (the spatial
+    encoder) are also quantized statically, with activation ranges observed on calibration.
+
+    param:
+        mode: 'static' or 'dynamic'
+        calibration: float32 (N, T, F, A) samples, required by static mode
+    return:
+        quantized model in eval mode, run it with the mha fast path off, see mha_fastpath_disabled()
+    """
+    from torch.ao.quantization import quantize_dynamic, get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    if mode not in QUANT_MODES:
+        raise ValueError(f"unsupported quantization mode: {mode}, available: {list(QUANT_MODES)}")
+    qmodel = copy.deepcopy(model).cpu().eval()
+
+    with mha_fastpath_disabled(), torch.no_grad():
+        if mode == 'static':
+            if calibration is None or len(calibration) == 0:
+                raise ValueError("static quantization needs calibration samples")
+            targets = [name for name, child in qmodel.named_children()
+                       if any(isinstance(m, _CONV_TYPES) for m in child.modules())]
+            if not targets:
+                raise ValueError("the model has no convolution to quantize statically, use mode='dynamic'")
+            example_inputs = _capture_inputs(qmodel, targets, calibration[:1])
+            qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+            for name in targets:
+                try:
+                    setattr(qmodel, name, prepare_fx(getattr(qmodel, name), qconfig_mapping, example_inputs[name]))
+                except Exception as e:
+                    raise RuntimeError(f"cannot trace {name} for static quantization ({e}), "
+                                       f"use mode='dynamic'") from e
+            for i in range(0, len(calibration), batch_size):
+                qmodel(torch.from_numpy(np.ascontiguousarray(calibration[i:i + batch_size], dtype=np.float32)))
+            for name in targets:
+                setattr(qmodel, name, convert_fx(getattr(qmodel, name)))
+        qmodel = quantize_dynamic(qmodel, {nn.Linear}, dtype=torch.qint8)
+    return qmodel
+
+
+@contextmanager
+def mha_fastpath_disabled():
+    """
+    the fused fast path of nn.TransformerEncoderLayer reads the float weights of its Linear
+    layers, which dynamically quantized Linear layers no longer have
+    """
+    enabled = torch.backends.mha.get_fastpath_enabled()
+    torch.backends.mha.set_fastpath_enabled(False)
+    try:
+        yield
+    finally:
+        torch.backends.mha.set_fastpath_enabled(enabled)
+
+
+def quantize(model_file, input_path: str, dataset: str, output_path=None, mode: str = 'static',
+             calibration_samples: int = 64, batch_size: int = 32, model_path=None, cache_dir=None,
+             use_cache: bool = True, repeat: int = 20) -> dict:
+    """
+    quantize a checkpoint of pipeline() to int8, compare it with the fp32 model on the test split
+    of its seed and save it as TorchScript, loadable by Predictor / `wsdp predict`
+
+    param:
+        model_file: checkpoint written by pipeline()
+        input_path, dataset: the raw data the checkpoint was trained on
+        output_path: TorchScript file, <checkpoint>.int8.pt next to the checkpoint if None
+        calibration_samples: samples of the train split static mode observes activations on
+        batch_size: batch of the evaluation and of the throughput measurement
+        repeat: timed runs of the latency and throughput measurements
+    return:
+        report dict: accuracy of both models, size in bytes, latency (batch of 1) and throughput
+    """
+    model, metadata = load_checkpoint_model(model_file, model_path, device='cpu')
+    padding_length = metadata.get('padding_length') or load_params(dataset)["padding_length"]
+    output_path = Path(output_path or Path(model_file).with_suffix('.int8.pt'))
+
+    cache = PreprocessCache(cache_dir) if use_cache else None
+    processed_data, labels, groups = BaseProcessor().process_files(input_path, dataset=dataset, cache=cache,
+                                                                   padding_length=padding_length)
+    data = build_fixed_length_batch(processed_data, target_length=padding_length)
+    del processed_data
+
+    # the label and group indices of pipeline(), so the seed reproduces its test split
+    unique_labels = metadata.get('labels') or sorted(set(labels))
+    label_map = {label: i for i, label in enumerate(unique_labels)}
+    unknown = set(labels) - set(label_map)
+    if unknown:
+        raise ValueError(f"labels {sorted(unknown)} of {input_path} are not known to the model")
+    group_map = {group: i for i, group in enumerate(sorted(set(groups)))}
+    labels = np.array([label_map[label] for label in labels])
+    groups = np.array([group_map[group] for group in groups])
+
+    seed = metadata.get('seed')
+    if seed is None:
+        print("[Warning] the checkpoint does not record its seed, the test split is not the one of training")
+    train_idx, test_idx, _ = split_indices(labels, groups, seed or 0, metadata.get('test_split', 0.4),
+                                           metadata.get('val_split', 0.3))
+    rng = np.random.default_rng(seed or 0)
+    calibration_idx = np.sort(rng.choice(train_idx, min(calibration_samples, len(train_idx)), replace=False))
+    print(f"quantize ({mode}, {torch.backends.quantized.engine} engine) with {len(calibration_idx)} calibration "
+          f"samples, evaluate on {len(test_idx)} test samples")
+
+    qmodel = quantize_model(model, mode, data[calibration_idx], batch_size)
+    example = torch.from_numpy(data[:1])
+    with mha_fastpath_disabled(), torch.no_grad():
+        traced = torch.jit.trace(qmodel, example)
+        fp32_traced = torch.jit.trace(model, example)
+
+    report = {'mode': mode, 'engine': torch.backends.quantized.engine,
+              'calibration_samples': int(len(calibration_idx)), 'test_samples': int(len(test_idx))}
+    # accuracy of fp32 is checked on the eager model, speed and size of both on their traced modules
+    # so the speedup compares quantization only, not eager against TorchScript
+    for name, forward, scripted in (('fp32', model, fp32_traced), ('int8', traced, traced)):
+        report[name] = {
+            'accuracy': _accuracy(forward, data, labels, test_idx, batch_size),
+            'size_bytes': _serialized_size(scripted),
+            **_measure_speed(scripted, data, batch_size, repeat),
+        }
+    report['accuracy_delta'] = report['int8']['accuracy'] - report['fp32']['accuracy']
+    report['size_ratio'] = report['int8']['size_bytes'] / report['fp32']['size_bytes']
+    report['speedup'] = report['fp32']['latency_ms'] / report['int8']['latency_ms']
+
+    traced.save(str(output_path))
+    with open(str(output_path) + ".json", 'w', encoding='utf-8') as f:
+        json.dump(dict(metadata, format='torchscript', checkpoint=str(Path(model_file).resolve()),
+                       quantization=report), f, indent=2)
+    _print_report(report)
+    print(f"int8 model saved to {output_path}")
+    return report
+
+
+def _capture_inputs(model, names, sample) -> dict:
+    # one forward pass records the input of every named child, needed to trace it for fx
+    inputs = {}
+    hooks = [getattr(model, name).register_forward_pre_hook(
+        lambda module, args, name=name: inputs.setdefault(name, args)) for name in names]
+    try:
+        model(torch.from_numpy(np.ascontiguousarray(sample, dtype=np.float32)))
+    finally:
+        for hook in hooks:
+            hook.remove()
+    return inputs
+
+
+def _accuracy(forward, data, labels, idx, batch_size) -> float:
+    if len(idx) == 0:
+        return float('nan')
+    correct = 0
+    with mha_fastpath_disabled(), torch.inference_mode():
+        for i in range(0, len(idx), batch_size):
+            batch_idx = idx[i:i + batch_size]
+            logits = forward(torch.from_numpy(data[batch_idx]))
+            correct += int((logits.argmax(dim=1).numpy() == labels[batch_idx]).sum())
+    return correct / len(idx)
+
+
+def _measure_speed(forward, data, batch_size, repeat) -> dict:
+    single = torch.from_numpy(data[:1])
+    batch = torch.from_numpy(data[:batch_size])
+
+    def run(x):
+        with mha_fastpath_disabled(), torch.inference_mode():
+            forward(x)
+
+    latency = time_call(lambda: run(single), repeat=repeat)
+    throughput = time_call(lambda: run(batch), repeat=max(1, repeat // 4))
+    return {'latency_ms': latency['median'] * 1e3,
+            'throughput_per_s': len(batch) / throughput['median']}
+
+
+def _serialized_size(scripted) -> int:
+    buf = io.BytesIO()
+    torch.jit.save(scripted, buf)
+    return buf.getbuffer().nbytes
+
+
+def _print_report(report: dict):
+    print("=" * 72)
+    print(f"{'':<8}{'accuracy':>10}{'size MB':>10}{'latency ms':>12}{'samples/s':>12}")
+    for name in ('fp32', 'int8'):
+        entry = report[name]
+        print(f"{name:<8}{entry['accuracy']:>10.4f}{entry['size_bytes'] / 1024 ** 2:>10.2f}"
+              f"{entry['latency_ms']:>12.2f}{entry['throughput_per_s']:>12.1f}")
+    print(f"accuracy delta: {report['accuracy_delta']:+.4f} | size ratio: {report['size_ratio']:.2f} | "
+          f"latency speedup: {report['speedup']:.2f}x")
+    print("=" * 72)
@@ -5,7 +5,9 @@ from typing import List
 from .bfee_reader import BfeeReader
 from .xrf_reader import XrfReader
 from .elder_reader import ElderReader
+from .zte_reader import ZTEReader
 from wsdp.structure import CSIData
+from wsdp.utils.resources import get_resources, limit_worker_threads
 
 # import future reader here
 
@@ -14,7 +16,8 @@ _READER_REGISTRY = {
     'widar': BfeeReader,
     'gait': BfeeReader,
     'xrf55': XrfReader,
-    'elderAL': ElderReader
+    'elderAL': ElderReader,
+    'zte': ZTEReader
 }
 
 
@@ -30,30 +33,50 @@ def get_reader_class(dataset: str):
     return reader_cls
 
 
+def list_data_files(file_path: str) -> List[Path]:
+    """
+    return every raw data file under file_path, ground-truth files excluded
+    """
+    input_path = Path(file_path)
+    if not input_path.exists() or not input_path.is_dir():
+        raise ValueError(f"invalid file path: {input_path}")
+    files = sorted(f for f in input_path.rglob("*") if f.is_file() and "truth" not in f.name)
+    if not files:
+        raise IOError(f"no file in folder: {input_path}")
+    return files
+
+
 def _process_file(reader, file_path):
     """
     process function for concurrent reading
     """
     try:
         data = reader.read_file(str(file_path))
+        for csi_data in (data if isinstance(data, List) else [data]):
+            csi_data.source = str(file_path)
         return file_path.name, data, None
     except Exception as e:
         return file_path.name, None, str(e)
 
 
-def load_data(file_path: str, dataset: str) -> List[CSIData]:
-    input_path = Path(file_path)
-    if not input_path.exists() or not input_path.is_dir():
-        raise ValueError(f"invalid file path: {input_path}")
-    files = [f for f in input_path.rglob("*") if f.is_file() and "truth" not in f.name]
-    if not files:
-        raise IOError(f"no file in folder: {input_path}")
+def load_data(file_path: str, dataset: str, cache=None) -> List[CSIData]:
+    """
+    read every file under file_path with the reader of dataset.
+    if a PreprocessCache is given, files with a cache entry are not read at all:
+    their sanitized samples are returned as CSIData with 'processed' set.
+    """
+    files = list_data_files(file_path)
 
     reader_class = get_reader_class(dataset)
     reader = reader_class()
     csi_data_list = []
 
-    with ProcessPoolExecutor(max_workers=32) as executor:
+    if cache is not None:
+        csi_data_list, files = _restore_from_cache(cache, files, dataset)
+
+    resources = get_resources()
+    with ProcessPoolExecutor(max_workers=resources.pool_size(len(files)),
+                             initializer=limit_worker_threads) as executor:
         futures = {executor.submit(_process_file, reader, file_path): file_path for file_path in files}
         for future in as_completed(futures):
             file_name, data, err = future.result()
@@ -63,3 +86,20 @@ def load_data(file_path: str, dataset: str) -> List[CSIData]:
             else:
                 print(f"× unable to process {file_name}: {err}\n")
     return csi_data_list
+
+
+def _restore_from_cache(cache, files, dataset):
+    restored = []
+    missing = []
+    for f in files:
+        samples = cache.get(cache.key(f, dataset))
+        if samples is None:
+            missing.append(f)
+            continue
+        for csi, label, group in samples:
+            csi_data = CSIData(str(f))
+            csi_data.source = str(f)
+            csi_data.processed = (csi, label, group)
+            restored.append(csi_data)
+    print(f"cache: {len(files) - len(missing)}/{len(files)} files restored from {cache.cache_dir}\n")
+    return restored, missing
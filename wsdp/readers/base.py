@@ -7,6 +7,8 @@ class BaseReader(ABC):
     Base class for Readers
     One reader handles specified type of file
     """
+    # upper bound of CSIData returned by read_file for one file
+    samples_per_file = 1
 
     @abstractmethod
     def read_file(self, file_path: str) -> CSIData:
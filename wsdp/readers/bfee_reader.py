@@ -1,17 +1,69 @@
 import os
+import mmap
 import struct
 import numpy as np
 
+from functools import lru_cache
 from wsdp.readers.base import BaseReader
 from wsdp.structure import CSIData
 from wsdp.structure import BfeeFrame
 
 
 class BfeeReader(BaseReader):
-    def __init__(self):
+    def __init__(self, batched: bool = True):
+        """
+        param:
+            batched: decode the whole file at once over a memory map (default),
+                     otherwise read and parse one record at a time
+        """
         super().__init__()
+        self.batched = batched
 
     def read_file(self, file_path: str) -> CSIData:
+        if not self.batched:
+            return self._read_file_streaming(file_path)
+
+        file_name = os.path.basename(file_path)
+        ret_data = CSIData(file_name)
+
+        records = self.read_records(file_path)
+        if records['csi']:
+            # frames of one recording are stacked into one tensor, so keep a single layout
+            layout = max(records['csi'], key=lambda key: len(records['csi'][key][0]))
+            rows, csi = records['csi'][layout]
+            if len(rows) < len(records['timestamp']):
+                print(f"[Warning] {file_name}: dropped {len(records['timestamp']) - len(rows)} records "
+                      f"not in layout n_rx={layout[0]}, n_tx={layout[1]}")
+            ret_data.add_frames(csi, records['timestamp'][rows],
+                                **{key: value[rows] for key, value in records.items() if key not in ('csi', 'timestamp')})
+        print(f"[Info] {file_name}: B_FEE records={len(ret_data)}")
+        return ret_data
+
+    def read_records(self, file_path: str) -> dict:
+        """
+        decode every valid 0xBB record of a file in one vectorized pass.
+
+        return:
+            dict of per-record header columns in file order ('timestamp', 'bfee_count',
+            'n_rx', 'n_tx', 'rssi_a', 'rssi_b', 'rssi_c', 'noise', 'agc', 'antenna_sel',
+            'fake_rate'), plus 'csi': {(n_rx, n_tx): (rows, csi)} where rows index the
+            header columns and csi has shape (len(rows), 30, n_rx, n_tx)
+        """
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return _decode_records(np.empty(0, dtype=np.uint8), np.empty(0, dtype=np.int64),
+                                       np.empty(0, dtype=np.int64))
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                offsets, lengths = index_bfee_records(mm)
+                buf = np.frombuffer(mm, dtype=np.uint8)
+                try:
+                    records = _decode_records(buf, offsets, lengths)
+                finally:
+                    # release the export before the map is closed
+                    del buf
+        return records
+
+    def _read_file_streaming(self, file_path: str) -> CSIData:
         file_name = os.path.basename(file_path)
         ret_data = CSIData(file_name)
 
@@ -35,7 +87,7 @@ class BfeeReader(BaseReader):
                 else:
                     f.seek(field_len - 1, 1)
                     cur += (field_len - 1)
-        print(f"[Info] {file_name}: B_FEE records={len(ret_data.frames)}")
+        print(f"[Info] {file_name}: B_FEE records={len(ret_data)}")
         return ret_data
 
     def parse_bfee_record(self, payload: bytes):
@@ -63,34 +115,131 @@ class BfeeReader(BaseReader):
         if csi_len != calc_len: return None
         if len(payload) < (20 + csi_len): return None
 
-        csi_bytes = payload[20: 20 + csi_len]
-        csi_array = np.zeros((30, n_rx, n_tx), dtype=np.complex64)
-
-        bit_index = 0
-
-        def get_bit(pos):
-            byte_i = pos // 8
-            if byte_i >= len(csi_bytes):
-                return 0
-            shift = pos % 8
-            return (csi_bytes[byte_i] >> shift) & 0x1
-
-        def get_bits_u8(pos):
-            val = 0
-            for b in range(8):
-                val |= (get_bit(pos + b) << b)
-            return val
-
-        for sc_idx in range(30):
-            bit_index += 3  # skip pilot
-            for j in range(n_rx * n_tx):
-                real8 = get_bits_u8(bit_index)
-                imag8 = get_bits_u8(bit_index + 8)
-                bit_index += 16
-                if real8 & 0x80: real8 -= 256
-                if imag8 & 0x80: imag8 -= 256
-                rx_i = j % n_rx
-                tx_i = j // n_rx
-                csi_array[sc_idx, rx_i, tx_i] = np.complex64(real8 + 1j * imag8)
+        csi_bytes = np.frombuffer(payload, dtype=np.uint8, count=csi_len, offset=20)
+        csi_array = decode_csi(csi_bytes, n_rx, n_tx)
         return BfeeFrame(timestamp, csi_array, bfee_count, n_rx, n_tx, rssi_a, rssi_b, rssi_c,
                          noise, agc, antenna_sel, fake_rate)
+
+
+@lru_cache(maxsize=None)
+def _csi_layout(n_rx: int, n_tx: int):
+    """
+    precompute where every 8-bit real/imag sample of one layout starts.
+    each of the 30 subcarriers carries a 3-bit pilot followed by n_rx * n_tx
+    (real, imag) pairs, samples are little-endian and not byte aligned.
+
+    return:
+        byte_idx: (30, n_rx * n_tx, 2) index of the byte holding the lowest bit
+        shift: (30, n_rx * n_tx, 2) bit offset inside that byte
+    """
+    n = n_rx * n_tx
+    sc = np.arange(30)[:, None]
+    j = np.arange(n)[None, :]
+    real_pos = sc * (3 + 16 * n) + 3 + 16 * j
+    pos = np.stack([real_pos, real_pos + 8], axis=-1)
+    byte_idx = pos // 8
+    shift = (pos % 8).astype(np.uint16)
+    byte_idx.flags.writeable = False
+    shift.flags.writeable = False
+    return byte_idx, shift
+
+
+def decode_csi(csi_bytes: np.ndarray, n_rx: int, n_tx: int) -> np.ndarray:
+    """
+    decode the packed CSI field of Bfee records.
+
+    param:
+        csi_bytes: uint8 array of shape (csi_len,) or (N, csi_len)
+        n_rx, n_tx: antenna layout shared by all given records
+    return:
+        complex64 array of shape (30, n_rx, n_tx) or (N, 30, n_rx, n_tx)
+    """
+    byte_idx, shift = _csi_layout(n_rx, n_tx)
+    # one zero byte of padding: the last sample may straddle the end of the field
+    pad_width = [(0, 0)] * (csi_bytes.ndim - 1) + [(0, 1)]
+    padded = np.pad(csi_bytes, pad_width).astype(np.uint16)
+
+    word = padded[..., byte_idx] | (padded[..., byte_idx + 1] << 8)
+    samples = ((word >> shift) & 0xFF).astype(np.uint8).view(np.int8)
+
+    csi = np.empty(samples.shape[:-1], dtype=np.complex64)
+    csi.real = samples[..., 0]
+    csi.imag = samples[..., 1]
+
+    # samples are stored with rx varying fastest: j = tx * n_rx + rx
+    csi = csi.reshape(csi.shape[:-1] + (n_tx, n_rx))
+    return np.ascontiguousarray(np.swapaxes(csi, -1, -2))
+
+
+def index_bfee_records(buf) -> tuple:
+    """
+    walk the record framing of a Bfee stream once.
+    every record is a 2-byte big-endian field length, a 1-byte code and field_len - 1 payload bytes.
+
+    param:
+        buf: bytes-like object (bytes, mmap, ...)
+    return:
+        offsets, lengths: int64 arrays locating the payload of every complete 0xBB record
+    """
+    offsets = []
+    lengths = []
+    size = len(buf)
+    cur = 0
+    while (cur + 3) < size:
+        field_len = (buf[cur] << 8) | buf[cur + 1]
+        code = buf[cur + 2]
+        cur += 3
+        if field_len < 1:
+            break
+        if code == 0xBB:
+            if cur + field_len - 1 > size:
+                break
+            offsets.append(cur)
+            lengths.append(field_len - 1)
+        cur += field_len - 1
+    return np.asarray(offsets, dtype=np.int64), np.asarray(lengths, dtype=np.int64)
+
+
+def _decode_records(buf: np.ndarray, offsets: np.ndarray, lengths: np.ndarray) -> dict:
+    """
+    gather the fixed 20-byte headers of all records as columns, then decode the CSI field
+    of every group of records sharing one (n_rx, n_tx) layout in a single call
+    """
+    keep = lengths >= 20
+    offsets = offsets[keep]
+    lengths = lengths[keep]
+
+    hdr = buf[offsets[:, None] + np.arange(20)]
+    n_rx = hdr[:, 8].astype(np.int64)
+    n_tx = hdr[:, 9].astype(np.int64)
+    csi_len = hdr[:, 16].astype(np.int64) | (hdr[:, 17].astype(np.int64) << 8)
+    calc_len = (30 * (n_rx * n_tx * 8 * 2 + 3) + 7) // 8
+    valid = (csi_len == calc_len) & (lengths >= 20 + csi_len)
+
+    hdr = hdr[valid]
+    offsets = offsets[valid]
+    csi_len = csi_len[valid]
+
+    records = {
+        'timestamp': np.ascontiguousarray(hdr[:, 0:4]).view('<u4').ravel().astype(np.uint32),
+        'bfee_count': np.ascontiguousarray(hdr[:, 4:6]).view('<u2').ravel().astype(np.uint16),
+        'n_rx': hdr[:, 8].copy(),
+        'n_tx': hdr[:, 9].copy(),
+        'rssi_a': hdr[:, 10].copy(),
+        'rssi_b': hdr[:, 11].copy(),
+        'rssi_c': hdr[:, 12].copy(),
+        'noise': hdr[:, 13].view(np.int8).copy(),
+        'agc': hdr[:, 14].copy(),
+        'antenna_sel': hdr[:, 15].copy(),
+        'fake_rate': np.ascontiguousarray(hdr[:, 18:20]).view('<u2').ravel().astype(np.uint16),
+        'csi': {},
+    }
+
+    layouts = records['n_rx'].astype(np.int64) * 256 + records['n_tx']
+    for layout in np.unique(layouts):
+        rows = np.flatnonzero(layouts == layout)
+        rx, tx = int(layout) // 256, int(layout) % 256
+        length = int(csi_len[rows[0]])
+        raw = buf[offsets[rows, None] + 20 + np.arange(length)]
+        records['csi'][(rx, tx)] = (rows, decode_csi(raw, rx, tx))
+    return records
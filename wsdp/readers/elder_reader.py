@@ -4,7 +4,6 @@ import numpy as np
 
 from wsdp.readers.base import BaseReader
 from wsdp.structure import CSIData
-from wsdp.structure import BaseFrame
 
 
 class ElderReader(BaseReader):
@@ -15,67 +14,85 @@ class ElderReader(BaseReader):
         csi_data = CSIData(file_name=file_path)
         pattern = re.compile(r"amp_tx(\d+)_rx(\d+)_sub(\d+)")
         target_tx = 0
-        
+
         with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            
-            try:
-                headers = next(reader)
-            except StopIteration:
-                print("empty file")
-                return []
-
-            # key=CSV column, value=(sub_idx, rx_idx)
-            col_mapping = {} 
-            timestamp_idx = -1
-            
-            max_sub = -1
-            max_rx = -1
-            
-            for idx, col_name in enumerate(headers):
-                col_name = col_name.strip()
-                if col_name == 'timestamp':
-                    timestamp_idx = idx
-                    continue
-                
-                match = pattern.match(col_name)
-                if match:
-                    tx = int(match.group(1))
-                    rx = int(match.group(2))
-                    sub = int(match.group(3))
-                    
-                    if tx == target_tx:
-                        col_mapping[idx] = (sub, rx)
-                        if sub > max_sub: max_sub = sub
-                        if rx > max_rx: max_rx = rx
-            
-            if timestamp_idx == -1:
-                raise ValueError("cannot fime column 'timestamp'")
-                
-            num_sub = max_sub + 1
-            num_rx = max_rx + 1
-            
-            row_count = 0
-            for row in reader:
-                if not row: continue
-                
-                try:
-                    ts_str = row[timestamp_idx]
-                    timestamp = float(ts_str) if '.' in ts_str else int(ts_str)
-                    
-                    csi_array = np.zeros((num_sub, num_rx))
-                    
-                    for col_idx, (sub, rx) in col_mapping.items():
-                        val = float(row[col_idx])
-                        csi_array[sub, rx] = val
-                    
-                    frame = BaseFrame(timestamp=timestamp, csi_array=csi_array)
-                    csi_data.add_frame(frame)
-                    
-                    row_count += 1
-                    
-                except ValueError as e:
-                    print(f"parse error at row {row_count+2}: {e}")
-                    continue
-
-        return csi_data
\ No newline at end of file
+            lines = f.read().splitlines()
+
+        if not lines:
+            print("empty file")
+            return []
+        headers = next(csv.reader(lines[:1]))
+
+        # the column mapping is resolved once: CSV column -> (sub_idx, rx_idx)
+        columns = []
+        subs = []
+        rxs = []
+        timestamp_idx = -1
+
+        for idx, col_name in enumerate(headers):
+            col_name = col_name.strip()
+            if col_name == 'timestamp':
+                timestamp_idx = idx
+                continue
+
+            match = pattern.match(col_name)
+            if match:
+                tx = int(match.group(1))
+                rx = int(match.group(2))
+                sub = int(match.group(3))
+
+                if tx == target_tx:
+                    columns.append(idx)
+                    subs.append(sub)
+                    rxs.append(rx)
+
+        if timestamp_idx == -1:
+            raise ValueError("cannot fime column 'timestamp'")
+
+        num_sub = max(subs, default=-1) + 1
+        num_rx = max(rxs, default=-1) + 1
+
+        body = [line for line in lines[1:] if line]
+        if not body:
+            return csi_data
+
+        try:
+            values = np.loadtxt(body, delimiter=',', quotechar='"', usecols=columns,
+                                dtype=np.float32, ndmin=2)
+            ts_strings = [line.split(',', timestamp_idx + 1)[timestamp_idx].strip().strip('"') for line in body]
+            timestamps = _parse_timestamps(ts_strings)
+        except (ValueError, IndexError):
+            # at least one malformed row: parse row by row and mask the bad ones out
+            values, timestamps = _parse_rows_masked(body, columns, timestamp_idx)
+
+        csi_array = np.zeros((len(values), num_sub, num_rx), dtype=np.float32)
+        csi_array[:, subs, rxs] = values
+        csi_data.add_frames(csi_array, timestamps)
+
+        return csi_data
+
+
+def _parse_timestamps(ts_strings):
+    # integer timestamps stay exact, any fractional one turns the column into float
+    if any('.' in ts for ts in ts_strings):
+        return np.asarray(ts_strings, dtype=np.float64)
+    return np.asarray(ts_strings, dtype=np.int64)
+
+
+def _parse_rows_masked(body, columns, timestamp_idx):
+    values = np.zeros((len(body), len(columns)), dtype=np.float32)
+    ts_strings = []
+    valid = np.zeros(len(body), dtype=bool)
+
+    for i, row in enumerate(csv.reader(body)):
+        try:
+            ts_str = row[timestamp_idx]
+            float(ts_str) if '.' in ts_str else int(ts_str)
+            values[i] = [float(row[col_idx]) for col_idx in columns]
+        except (ValueError, IndexError) as e:
+            print(f"parse error at row {i + 2}: {e}")
+            continue
+        ts_strings.append(ts_str)
+        valid[i] = True
+
+    return values[valid], _parse_timestamps(ts_strings)
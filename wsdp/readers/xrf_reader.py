@@ -3,16 +3,19 @@ import numpy as np
 from typing import List
 from wsdp.readers.base import BaseReader
 from wsdp.structure import CSIData
-from wsdp.structure import BaseFrame
 
 
 class XrfReader(BaseReader):
+    # one CSIData per receiver
+    samples_per_file = 3
+
     def __init__(self):
         super().__init__()
 
     def read_file(self, file_path) -> List[CSIData]:
         try:
-            raw_data = np.load(file_path)
+            # pages are only read when the processing stage touches them
+            raw_data = np.load(file_path, mmap_mode='r')
         except FileNotFoundError:
             print(f"cannot find file: {file_path}")
             return []
@@ -26,18 +29,14 @@ class XrfReader(BaseReader):
         csi_data_list = []
         num_receivers = 3
         num_time_steps = 1000
+        timestamps = np.arange(num_time_steps)
 
         for rx_idx in range(num_receivers):
             csi_data = CSIData(file_path)
-            current_rx_data = reshaped_data[rx_idx]
-
-            for timestamp in range(num_time_steps):
-                csi_array = current_rx_data[:, :, timestamp]
-                csi_array = csi_array.copy()
-                frame = BaseFrame(timestamp=timestamp, csi_array=csi_array)
-                
-                csi_data.add_frame(frame)
-            
+            # (30, 3, 1000) -> (1000, 30, 3), a strided view of the mapped file
+            current_rx_data = reshaped_data[rx_idx].transpose(2, 0, 1)
+            csi_data.add_frames(current_rx_data, timestamps)
+
             csi_data_list.append(csi_data)
 
-        return csi_data_list
\ No newline at end of file
+        return csi_data_list
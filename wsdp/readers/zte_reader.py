@@ -1,55 +1,85 @@
 import numpy as np
-import pandas as pd
 
+from itertools import islice
+from wsdp.readers.base import BaseReader
 from wsdp.structure import CSIData
-from wsdp.structure import BaseFrame
 
+NUM_SUBCARRIERS = 512
+NUM_RX = 3
+# the 'zte' preset of model_params.json (padding_length 80 ...) and its file naming are
+# placeholders borrowed from elderAL, not values measured on zte captures
 
-class ZTEReader:
 
-    def __init__(self):
+class ZTEReader(BaseReader):
+
+    def __init__(self, chunksize: int = 4096):
+        """
+        param:
+            chunksize: CSV lines handled at once, bounds the memory spent on raw text
+        """
         super().__init__()
+        self.chunksize = chunksize
 
     def read_file(self, file_path: str) -> CSIData:
         ret = CSIData(file_path)
 
-        df = pd.read_csv(file_path)
-
-        df = df[df['rx_chain_num'].str.endswith('tx0')].copy()
-
-        if df.empty:
+        ts_parts = []
+        chain_parts = []
+        csi_parts = []
+        with open(file_path, 'r', encoding='utf-8') as f:
+            header = [col.strip() for col in f.readline().rstrip('\n').split(',')]
+            ts_col = header.index('timestamp')
+            chain_col = header.index('rx_chain_num')
+            i_cols = [header.index(f'csi_i_{k}') for k in range(NUM_SUBCARRIERS)]
+            q_cols = [header.index(f'csi_q_{k}') for k in range(NUM_SUBCARRIERS)]
+            last_col = max(ts_col, chain_col) + 1
+
+            while True:
+                lines = list(islice(f, self.chunksize))
+                if not lines:
+                    break
+                # only rows of tx0 are used: drop the others before any number is parsed
+                fields = [line.split(',', last_col) for line in lines]
+                keep = [i for i, row in enumerate(fields)
+                        if len(row) >= last_col and row[chain_col].strip().endswith('tx0')]
+                if not keep:
+                    continue
+
+                values = np.loadtxt([lines[i] for i in keep], delimiter=',', usecols=i_cols + q_cols,
+                                    dtype=np.float32, ndmin=2)
+                csi = np.empty((len(keep), NUM_SUBCARRIERS), dtype=np.complex64)
+                csi.real = values[:, :NUM_SUBCARRIERS]
+                csi.imag = values[:, NUM_SUBCARRIERS:]
+
+                ts_parts.extend(fields[i][ts_col].strip() for i in keep)
+                chain_parts.extend(fields[i][chain_col].strip() for i in keep)
+                csi_parts.append(csi)
+
+        if not csi_parts:
             print("warning: cannot found tx0 in file.")
             return ret
 
-        df['rx_idx'] = df['rx_chain_num'].apply(lambda x: int(x.split('-')[0].replace('rx', '')))
-
-        i_cols = [f'csi_i_{k}' for k in range(512)]
-        q_cols = [f'csi_q_{k}' for k in range(512)]
-
-        data_i = df[i_cols].values  # shape: (N_rows, 512)
-        data_q = df[q_cols].values  # shape: (N_rows, 512)
-
-        complex_data = data_i + 1j * data_q
-
-        df['complex_vector'] = list(complex_data)
-
-        grouped = df.groupby('timestamp')
-
-        frames_list = []
-
-        for ts, group in grouped:
-            frame_matrix = np.zeros((512, 3), dtype=np.complex64)
+        # 'rx{i}-tx0' -> i
+        chains = np.asarray(chain_parts)
+        rx_idx = np.char.replace(np.char.partition(chains, '-')[:, 0], 'rx', '').astype(np.int64)
+        timestamps, frame_idx = np.unique(_parse_timestamps(ts_parts), return_inverse=True)
+        csi = np.concatenate(csi_parts)
+        del csi_parts
 
-            for _, row in group.iterrows():
-                rx_id = row['rx_idx']
-                c_vector = row['complex_vector']
+        frame_matrix = np.zeros((len(timestamps), NUM_SUBCARRIERS, NUM_RX), dtype=np.complex64)
+        valid = (rx_idx >= 0) & (rx_idx < NUM_RX)
+        frame_matrix[frame_idx[valid], :, rx_idx[valid]] = csi[valid]
 
-                if 0 <= rx_id < 3:
-                    frame_matrix[:, rx_id] = c_vector
+        ret.add_frames(frame_matrix, timestamps)
 
-            frame = BaseFrame(timestamp=ts, csi_array=frame_matrix)
-            frames_list.append(frame)
+        return ret
 
-        ret.frames = frames_list
 
-        return ret
\ No newline at end of file
+def _parse_timestamps(ts_parts):
+    """numeric timestamps when they all parse, the raw strings (e.g. datetimes) otherwise"""
+    try:
+        if any(c in ts for ts in ts_parts for c in '.eE'):
+            return np.asarray(ts_parts, dtype=np.float64)
+        return np.asarray(ts_parts, dtype=np.int64)
+    except ValueError:
+        return np.asarray(ts_parts)
@@ -0,0 +1,3 @@
+from .batcher import MicroBatcher, ServerMetrics, QueueFull
+from .server import InferenceServer, serve
+from .loadgen import load_test
@@ -0,0 +1,159 @@
+import time
+import queue
+import threading
+import numpy as np
+
+from collections import Counter, deque
+from concurrent.futures import Future
+
+
+class QueueFull(Exception):
+    """
+    raised by MicroBatcher.submit when max_queue requests are already waiting
+    """
+
+
+class ServerMetrics:
+    """
+    thread-safe request counters, plus the latency of the last `window` requests
+    """
+
+    def __init__(self, window: int = 10000):
+        self._lock = threading.Lock()
+        self.counters = Counter()
+        self.batch_sizes = Counter()
+        self.latency = deque(maxlen=window)
+        self.queue_wait = deque(maxlen=window)
+        self.max_queue_depth = 0
+        self._start = time.perf_counter()
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    def record_request(self, latency_s: float):
+        with self._lock:
+            self.counters['responses'] += 1
+            self.latency.append(latency_s)
+
+    def record_batch(self, size: int, queue_waits, depth: int):
+        with self._lock:
+            self.counters['batches'] += 1
+            self.counters['samples'] += size
+            self.batch_sizes[size] += 1
+            self.queue_wait.extend(queue_waits)
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def snapshot(self, queue_depth: int = 0) -> dict:
+        with self._lock:
+            latency = np.array(self.latency) * 1e3
+            waits = np.array(self.queue_wait) * 1e3
+            counters = dict(self.counters)
+            batches = counters.get('batches', 0)
+            elapsed = time.perf_counter() - self._start
+            return {
+                'uptime_s': elapsed,
+                'counters': counters,
+                'queue_depth': queue_depth,
+                'max_queue_depth': self.max_queue_depth,
+                'mean_batch_size': counters.get('samples', 0) / batches if batches else None,
+                'batch_sizes': {str(k): v for k, v in sorted(self.batch_sizes.items())},
+                'latency_ms': _percentiles(latency),
+                'queue_wait_ms': _percentiles(waits),
+                'throughput_per_s': counters.get('responses', 0) / elapsed if elapsed > 0 else None,
+            }
+
+
+class MicroBatcher:
+    """
+    collect single samples submitted from many threads into batches of at most
+    max_batch_size, waiting at most max_wait_ms after the first sample of a batch,
+    run them through predict_fn in one call and hand every caller its own row
+    """
+
+    def __init__(self, predict_fn, sample_shape, max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 max_queue: int = 1024, metrics: ServerMetrics = None):
+        """
+        param:
+            predict_fn: float32 (B, *sample_shape) array -> (B, num_classes) array
+            sample_shape: shape of one sample, batches are built in one preallocated buffer
+            max_queue: samples waiting at most, submit() raises QueueFull beyond
+        """
+        self.predict_fn = predict_fn
+        self.sample_shape = tuple(sample_shape)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1e3
+        self.metrics = metrics or ServerMetrics()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._buffer = np.empty((max_batch_size,) + self.sample_shape, dtype=np.float32)
+        self._thread = threading.Thread(target=self._run, name="wsdp-batcher", daemon=True)
+        self._stopped = False
+        self._thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, sample) -> Future:
+        """
+        param:
+            sample: float32 array of sample_shape
+        return:
+            Future resolving to the prediction row of sample
+        """
+        if tuple(sample.shape) != self.sample_shape:
+            raise ValueError(f"sample shape {tuple(sample.shape)} differs from {self.sample_shape}")
+        future = Future()
+        try:
+            self._queue.put_nowait((sample, future, time.perf_counter()))
+        except queue.Full:
+            raise QueueFull(f"{self._queue.maxsize} requests are waiting already")
+        return future
+
+    def close(self):
+        self._stopped = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    # whatever is queued already joins without waiting
+                    item = self._queue.get_nowait() if remaining <= 0 else self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._stopped = True
+                    break
+                batch.append(item)
+            self._process(batch)
+
+    def _process(self, batch):
+        n = len(batch)
+        start = time.perf_counter()
+        for i, (sample, _, _) in enumerate(batch):
+            self._buffer[i] = sample
+        self.metrics.record_batch(n, [start - enqueued for _, _, enqueued in batch], self._queue.qsize() + n)
+        try:
+            out = self.predict_fn(self._buffer[:n])
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for i, (_, future, _) in enumerate(batch):
+            future.set_result((out[i], n))
+
+
+def _percentiles(values) -> dict:
+    if len(values) == 0:
+        return {'p50': None, 'p90': None, 'p99': None, 'max': None, 'count': 0}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {'p50': float(p50), 'p90': float(p90), 'p99': float(p99), 'max': float(values.max()),
+            'count': int(len(values))}
@@ -0,0 +1,192 @@
+import io
+import json
+import time
+import socket
+import threading
+import numpy as np
+
+from http.client import HTTPConnection
+from urllib.parse import urlparse
+from wsdp.stream import record_schedule
+
+
+class _UnixHTTPConnection(HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def connect(target: str, timeout: float = 30.0) -> HTTPConnection:
+    """
+    param:
+        target: 'http://host:port' or 'unix:///path/to/socket' of `wsdp serve`
+    """
+    url = urlparse(target)
+    if url.scheme == 'unix':
+        return _UnixHTTPConnection(url.path, timeout=timeout)
+    if url.scheme in ('http', ''):
+        return HTTPConnection(url.hostname or '127.0.0.1', url.port or 8000, timeout=timeout)
+    raise ValueError(f"unsupported target: {target}, use http://host:port or unix:///path")
+
+
+def request_json(conn: HTTPConnection, method: str, path: str, body=None, content_type=None) -> tuple:
+    headers = {'Content-Type': content_type} if content_type else {}
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def npy_payloads(input_shape, count: int = 8, complex_input: bool = False, seed: int = 0) -> list:
+    """
+    random windows of input_shape encoded as .npy request bodies, complex ones go through
+    the calibration and denoising of the server
+    """
+    rng = np.random.default_rng(seed)
+    payloads = []
+    for _ in range(count):
+        window = rng.random(input_shape, dtype=np.float32)
+        if complex_input:
+            window = (window * np.exp(1j * rng.random(input_shape) * 2 * np.pi)).astype(np.complex64)
+        buf = io.BytesIO()
+        np.save(buf, window, allow_pickle=False)
+        payloads.append(buf.getvalue())
+    return payloads
+
+
+def bfee_payloads(dat_file, window: int, count: int = 8) -> list:
+    """
+    consecutive slices of window Bfee records of a recorded .dat file, sent as raw records
+    """
+    with open(dat_file, 'rb') as f:
+        data = f.read()
+    ends, _ = record_schedule(data)
+    if len(ends) < window:
+        raise ValueError(f"{dat_file} has {len(ends)} records, fewer than a window of {window}")
+    payloads = []
+    start = 0
+    for i in range(window, len(ends) + 1, window):
+        payloads.append(data[start:ends[i - 1]])
+        start = ends[i - 1]
+        if len(payloads) == count:
+            break
+    return payloads
+
+
+def load_test(target: str, requests: int = 1000, concurrency: int = 16, dat_file=None, complex_input: bool = False,
+              rate=None, output_path=None) -> dict:
+    """
+    send requests windows to a running `wsdp serve` from concurrency keep-alive connections
+    and report client-side latency, throughput and the server metrics afterwards
+
+    param:
+        target: 'http://host:port' or 'unix:///path/to/socket'
+        dat_file: send slices of this Bfee recording instead of random amplitude windows
+        complex_input: random complex windows, preprocessed by the server
+        rate: total requests per second, as fast as the server answers if None
+        output_path: save the report as json
+    return:
+        report dict, latency in milliseconds
+    """
+    conn = connect(target)
+    status, health = request_json(conn, 'GET', '/health')
+    if status != 200:
+        raise RuntimeError(f"{target} is not healthy: {health}")
+    _, before = request_json(conn, 'GET', '/metrics')
+    input_shape = tuple(health['input_shape'])
+    if dat_file is not None:
+        payloads, content_type = bfee_payloads(dat_file, input_shape[0]), 'application/x-bfee'
+    else:
+        payloads, content_type = npy_payloads(input_shape, complex_input=complex_input), 'application/x-npy'
+    print(f"[Info] {requests} requests to {target} from {concurrency} connections | "
+          f"{content_type} windows of {list(input_shape)} | "
+          f"{'open loop at ' + str(rate) + ' req/s' if rate else 'closed loop'}")
+
+    latency = np.full(requests, np.nan)
+    statuses = np.zeros(requests, dtype=np.int32)
+    batch_sizes = np.zeros(requests, dtype=np.int32)
+    counter = iter(range(requests))
+    lock = threading.Lock()
+    interval = concurrency / rate if rate else None
+
+    def client(worker):
+        c = connect(target)
+        next_due = time.perf_counter() + (worker / rate if rate else 0.0)
+        try:
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                if interval is not None:
+                    delay = next_due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_due += interval
+                t0 = time.perf_counter()
+                try:
+                    status, result = request_json(c, 'POST', '/predict', payloads[i % len(payloads)], content_type)
+                except (OSError, ValueError):
+                    statuses[i] = -1
+                    c.close()
+                    c = connect(target)
+                    continue
+                latency[i] = (time.perf_counter() - t0) * 1e3
+                statuses[i] = status
+                if status == 200:
+                    batch_sizes[i] = result['batch_size']
+        finally:
+            c.close()
+
+    threads = [threading.Thread(target=client, args=(w,), daemon=True) for w in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    _, server = request_json(conn, 'GET', '/metrics')
+    conn.close()
+    ok = statuses == 200
+    report = {
+        'target': target,
+        'requests': requests,
+        'concurrency': concurrency,
+        'rate': rate,
+        'content_type': content_type,
+        'ok': int(ok.sum()),
+        'rejected': int((statuses == 503).sum()),
+        'failed': int((~ok & (statuses != 503)).sum()),
+        'elapsed_seconds': elapsed,
+        'throughput_per_s': int(ok.sum()) / elapsed,
+        'mean_batch_size': float(batch_sizes[ok].mean()) if ok.any() else None,
+        'server_batches': server['counters'].get('batches', 0) - before['counters'].get('batches', 0),
+        'server': server,
+    }
+    if ok.any():
+        p50, p90, p99 = np.percentile(latency[ok], [50, 90, 99])
+        report.update({'latency_p50_ms': float(p50), 'latency_p90_ms': float(p90), 'latency_p99_ms': float(p99),
+                       'latency_max_ms': float(latency[ok].max())})
+    _print_report(report)
+    if output_path is not None:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"report saved to {output_path}")
+    return report
+
+
+def _print_report(report: dict):
+    print("=" * 72)
+    print(f"ok: {report['ok']}/{report['requests']} | rejected: {report['rejected']} | failed: {report['failed']} | "
+          f"{report['elapsed_seconds']:.2f}s | {report['throughput_per_s']:.1f} req/s")
+    if report['ok']:
+        print(f"client latency p50 {report['latency_p50_ms']:.1f} ms | p90 {report['latency_p90_ms']:.1f} ms | "
+              f"p99 {report['latency_p99_ms']:.1f} ms | max {report['latency_max_ms']:.1f} ms")
+        print(f"mean batch size {report['mean_batch_size']:.1f} | server batches {report['server_batches']} | "
+              f"server queue depth {report['server']['queue_depth']} (max {report['server']['max_queue_depth']})")
+    print("=" * 72)
@@ -0,0 +1,284 @@
+import io
+import os
+import json
+import time
+import threading
+import numpy as np
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from wsdp.algorithms import phase_calibration, wavelet_denoise_csi
+from wsdp.predict import Predictor
+from wsdp.stream.parser import BfeeStreamParser
+from wsdp.utils import load_params, write_fixed_length
+from .batcher import MicroBatcher, ServerMetrics, QueueFull
+
+MAX_BODY_BYTES = 64 * 1024 ** 2
+# request bodies by Content-Type, anything else is read as .npy
+NPY_TYPES = ('application/x-npy', 'application/octet-stream')
+BFEE_TYPES = ('application/x-bfee',)
+JSON_TYPES = ('application/json',)
+
+
+class InferenceServer:
+    """
+    local http server in front of a MicroBatcher. every request carries one window:
+
+        POST /predict   body: .npy array (application/x-npy), raw Bfee records (application/x-bfee)
+                        or {"amplitude": [[...]]} (application/json)
+        GET  /metrics   latency percentiles, queue depth, batch sizes and counters
+        GET  /health    model, input shape and batching settings
+
+    complex windows and Bfee records get the phase calibration and wavelet denoising of
+    pipeline(), real windows are taken as preprocessed amplitude. windows are truncated or
+    zero-padded to the length the model was trained on. preprocessing runs in the request
+    threads, only the forward pass is batched.
+    """
+
+    def __init__(self, predictor: Predictor, host: str = '127.0.0.1', port: int = 8000, unix_socket=None,
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0, max_queue: int = 1024, input_shape=None,
+                 denoise: bool = True):
+        """
+        param:
+            predictor: Predictor of a checkpoint, an exported or a quantized model
+            unix_socket: listen on this socket path instead of host:port
+            input_shape: (T, F, A) of one window, from the model metadata if None
+        """
+        input_shape = input_shape or predictor.metadata.get('input_shape')
+        if input_shape is None:
+            raise ValueError(f"{predictor.model_file} has no input shape recorded, pass input_shape=(T, F, A)")
+        self.predictor = predictor
+        self.input_shape = tuple(int(d) for d in input_shape)
+        self.denoise = denoise
+        self.metrics = ServerMetrics()
+        self.batcher = MicroBatcher(predictor.predict_proba, self.input_shape, max_batch_size=max_batch_size,
+                                    max_wait_ms=max_wait_ms, max_queue=max_queue, metrics=self.metrics)
+
+        handler = _make_handler(self)
+        if unix_socket is not None:
+            if os.path.exists(unix_socket):
+                os.unlink(unix_socket)
+            self.httpd = _ThreadingUnixHTTPServer(str(unix_socket), handler)
+            self.address = f"unix://{unix_socket}"
+        else:
+            self.httpd = _ThreadingHTTPServer((host, port), handler)
+            self.address = f"http://{host}:{self.httpd.server_address[1]}"
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    def warm_up(self):
+        # the first forward passes pay for allocator and kernel setup, keep them out of the metrics
+        for n in sorted({1, self.batcher.max_batch_size}):
+            self.predictor.predict_proba(np.zeros((n,) + self.input_shape, dtype=np.float32))
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def start(self):
+        """
+        serve from a background thread, for tests and load generation within one process
+        """
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="wsdp-serve", daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self):
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread.join()
+        self.httpd.server_close()
+        self.batcher.close()
+        if self.address.startswith("unix://") and os.path.exists(self.httpd.server_address):
+            os.unlink(self.httpd.server_address)
+
+    def health(self) -> dict:
+        return {
+            'status': 'ok',
+            'model': self.predictor.model_file,
+            'backend': self.predictor.backend,
+            'device': str(self.predictor.device),
+            'input_shape': list(self.input_shape),
+            'labels': self.predictor.labels,
+            'max_batch_size': self.batcher.max_batch_size,
+            'max_wait_ms': self.batcher.max_wait * 1e3,
+        }
+
+    def snapshot(self) -> dict:
+        return self.metrics.snapshot(self.batcher.queue_depth)
+
+    def to_window(self, body: bytes, content_type: str) -> np.ndarray:
+        """
+        decode one request body into a float32 (T, F, A) amplitude window of input_shape
+        """
+        if content_type in BFEE_TYPES:
+            parser = BfeeStreamParser()
+            frames = [frame.csi_array.reshape(frame.csi_array.shape[0], -1) for frame, _ in parser.feed(body)]
+            if not frames:
+                raise ValueError("no Bfee record in the request body")
+            window = np.stack(frames)
+        elif content_type in JSON_TYPES:
+            window = np.asarray(json.loads(body)['amplitude'], dtype=np.float32)
+        else:
+            window = np.load(io.BytesIO(body), allow_pickle=False)
+
+        if window.ndim == 2:
+            window = window[:, :, None]
+        if window.ndim != 3 or window.shape[1:] != self.input_shape[1:]:
+            raise ValueError(f"window of shape {list(window.shape)} does not match the model input "
+                             f"{list(self.input_shape)}")
+        if np.iscomplexobj(window):
+            if len(window) < 2:
+                raise ValueError("a complex window needs at least 2 timestamps")
+            window = phase_calibration(window)
+            if self.denoise:
+                window = wavelet_denoise_csi(window)
+        out = np.empty(self.input_shape, dtype=np.float32)
+        write_fixed_length(window, out, amplitude=np.iscomplexobj(window))
+        return out
+
+    def handle_predict(self, body: bytes, content_type: str, start: float) -> dict:
+        window = self.to_window(body, content_type)
+        probs, batch_size = self.batcher.submit(window).result()
+        labels = self.predictor.labels
+        k = int(np.argmax(probs))
+        return {
+            'class': k,
+            'label': labels[k] if labels else k,
+            'confidence': float(probs[k]),
+            'probabilities': [float(p) for p in probs],
+            'batch_size': batch_size,
+            'latency_ms': (time.perf_counter() - start) * 1e3,
+        }
+
+
+class _ThreadingHTTPServer(ThreadingHTTPServer):
+    # the socketserver default of 5 refuses a burst of load generator connections
+    request_queue_size = 128
+
+
+class _ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    request_queue_size = 128
+
+
+def _make_handler(server: InferenceServer):
+    class Handler(BaseHTTPRequestHandler):
+        # keep-alive, so a client pays the connection setup once
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                self._reply(200, server.snapshot())
+            elif self.path == '/health':
+                self._reply(200, server.health())
+            else:
+                self._reply(404, {'error': f"unknown path {self.path}"})
+
+        def do_POST(self):
+            start = time.perf_counter()
+            # the body cannot be framed without a valid length, so the connection is dropped as well
+            if self.headers.get('Content-Length') is None:
+                self.close_connection = True
+                self._reply(411, {'error': "Content-Length is required"})
+                return
+            try:
+                length = int(self.headers['Content-Length'])
+            except ValueError:
+                length = -1
+            if length <= 0:
+                self.close_connection = True
+                self._reply(400, {'error': f"invalid Content-Length {self.headers['Content-Length']!r}"})
+                return
+            if length > MAX_BODY_BYTES:
+                self.close_connection = True
+                self._reply(413, {'error': f"body of {length} bytes exceeds {MAX_BODY_BYTES}"})
+                return
+            body = self.rfile.read(length)
+            if self.path != '/predict':
+                self._reply(404, {'error': f"unknown path {self.path}"})
+                return
+            server.metrics.count('requests')
+            content_type = (self.headers.get('Content-Type') or NPY_TYPES[0]).split(';')[0].strip()
+            try:
+                result = server.handle_predict(body, content_type, start)
+            except QueueFull as e:
+                server.metrics.count('rejected')
+                self._reply(503, {'error': str(e)})
+                return
+            except (ValueError, KeyError, EOFError) as e:
+                server.metrics.count('bad_requests')
+                self._reply(400, {'error': str(e)})
+                return
+            except Exception as e:
+                server.metrics.count('errors')
+                self._reply(500, {'error': f"{type(e).__name__}: {e}"})
+                return
+            server.metrics.record_request(time.perf_counter() - start)
+            self._reply(200, result)
+
+        def _reply(self, status: int, payload: dict):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            # one line per request would cost more than the request itself
+            pass
+
+    return Handler
+
+
+def serve(model_file, host: str = '127.0.0.1', port: int = 8000, unix_socket=None, dataset: str = 'widar',
+          model_path=None, max_batch_size: int = 32, max_wait_ms: float = 5.0, max_queue: int = 1024,
+          input_shape=None, denoise: bool = True) -> dict:
+    """
+    serve a trained model over http on localhost (or a unix socket) until interrupted, batching
+    concurrent requests into one forward pass, see InferenceServer for the endpoints
+
+    param:
+        model_file: checkpoint of pipeline(), a model exported by export_model() or quantized by quantize()
+        dataset: preset the model was trained with, gives the window length for models without metadata
+        max_batch_size: windows per forward pass at most
+        max_wait_ms: time the first window of a batch waits for others to join
+        max_queue: windows waiting at most, requests beyond are answered with 503
+        input_shape: (T, F, A) of one window, from the model metadata if None
+    return:
+        metrics snapshot at shutdown
+    """
+    predictor = Predictor(model_file, model_path)
+    if input_shape is None and predictor.metadata.get('input_shape') is None:
+        raise ValueError(f"{model_file} has no input shape recorded, pass input_shape=(T, F, A), "
+                         f"e.g. ({load_params(dataset)['padding_length']}, 30, 3)")
+    server = InferenceServer(predictor, host=host, port=port, unix_socket=unix_socket,
+                             max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, max_queue=max_queue,
+                             input_shape=input_shape, denoise=denoise)
+    server.warm_up()
+    print(f"[Info] serving {predictor.backend} model {model_file} on {server.address} | "
+          f"input {list(server.input_shape)} | batches of up to {max_batch_size} within {max_wait_ms} ms | "
+          f"{predictor.device}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[Info] server interrupted")
+    finally:
+        server.shutdown()
+    metrics = server.snapshot()
+    print_metrics(metrics)
+    return metrics
+
+
+def print_metrics(metrics: dict):
+    counters = metrics['counters']
+    latency = metrics['latency_ms']
+    print("=" * 72)
+    print(f"requests: {counters.get('requests', 0)} | responses: {counters.get('responses', 0)} | "
+          f"rejected: {counters.get('rejected', 0)} | bad: {counters.get('bad_requests', 0)} | "
+          f"errors: {counters.get('errors', 0)}")
+    if latency['count']:
+        print(f"server latency p50 {latency['p50']:.1f} ms | p99 {latency['p99']:.1f} ms | "
+              f"max {latency['max']:.1f} ms | queue wait p50 {metrics['queue_wait_ms']['p50']:.1f} ms")
+        print(f"batches: {counters.get('batches', 0)} | mean batch size {metrics['mean_batch_size']:.1f} | "
+              f"max queue depth {metrics['max_queue_depth']}")
+    print("=" * 72)
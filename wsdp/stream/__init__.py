@@ -0,0 +1,4 @@
+from .parser import BfeeStreamParser
+from .ring_buffer import FrameRingBuffer
+from .sources import open_source, replay_server, record_schedule
+from .inference import stream, StreamClassifier
@@ -0,0 +1,211 @@
+import json
+import time
+import numpy as np
+
+from wsdp.algorithms import StreamingWaveletDenoiser
+from wsdp.predict import Predictor
+from wsdp.utils import load_params
+from .parser import BfeeStreamParser
+from .ring_buffer import FrameRingBuffer
+from .sources import open_source
+
+
+class StreamClassifier:
+    """
+    classify windows of a CSI stream with the preprocessing used in training. frames are
+    preprocessed once, as they arrive: wavelet denoising runs incrementally over the stream
+    instead of over every overlapping window. phase calibration is left out, it only rotates
+    the phase of every packet and the model sees amplitude.
+    """
+
+    def __init__(self, predictor: Predictor, denoise: bool = True, length: int = 1500):
+        """
+        param:
+            predictor: Predictor of a checkpoint or an exported model
+            length: padding_length of the checkpoint, sets the denoising threshold. training
+                    thresholds every raw recording over its own length before resizing it to
+                    padding_length, which stands in for that length here, whatever the window
+        """
+        self.predictor = predictor
+        self.denoiser = StreamingWaveletDenoiser(length=length) if denoise else None
+
+    @property
+    def delay(self) -> int:
+        """
+        frames a frame waits for its denoising filter support
+        """
+        return self.denoiser.delay if self.denoiser is not None else 0
+
+    def preprocess(self, frames) -> np.ndarray:
+        """
+        param:
+            frames: next complex (T, F, A) frames of the stream
+        return:
+            float32 amplitude of the frames that became final, delay frames behind the input
+        """
+        if self.denoiser is not None:
+            frames = self.denoiser.update(frames)
+        return np.abs(frames).astype(np.float32, copy=False)
+
+    def classify(self, amplitude) -> np.ndarray:
+        """
+        return:
+            class probabilities of the window
+        """
+        return self.predictor.predict_proba(amplitude[None])[0]
+
+    def warm_up(self, window: int, frame_shape):
+        # the first call pays for allocator and kernel setup, keep it out of the measured windows
+        self.classify(np.zeros((window,) + tuple(frame_shape), dtype=np.float32))
+
+
+def stream(source: str, model_file, dataset: str = 'widar', window=None, hop: int = 100, model_path=None,
+           follow: bool = True, denoise: bool = True, max_windows=None, budget_ms: float = 100.0,
+           output_path=None, verbose: bool = True) -> dict:
+    """
+    classify a live Bfee stream on a sliding window of the latest frames
+
+    param:
+        source: '-' (stdin), 'tcp://host:port', a named pipe or a file being appended, see open_source()
+        model_file: best_checkpoint_<seed>.pth written by pipeline(), or a model exported by export_model()
+        dataset: preset the model was trained with, gives the default window length for models without metadata
+        window: frames per decision, padding_length of the model (or of the dataset) if None
+        hop: new frames between two decisions
+        follow: keep waiting for data appended to a regular file
+        max_windows: stop after this many decisions
+        budget_ms: latency target, decisions above it are counted in the report
+        output_path: save the report with the latency of every window as json
+    return:
+        report dict with latency percentiles in milliseconds
+    """
+    if hop < 1:
+        raise ValueError(f"hop must be at least 1, got {hop}")
+    predictor = Predictor(model_file, model_path)
+    padding_length = predictor.metadata.get('padding_length') or load_params(dataset)["padding_length"]
+    window = window or padding_length
+    labels = predictor.labels
+    # the threshold follows the sample length of training, not the decision window
+    classifier = StreamClassifier(predictor, denoise=denoise, length=padding_length)
+    print(f"[Info] streaming from {source} | window {window} frames | hop {hop} frames | "
+          f"denoising delay {classifier.delay} frames | {predictor.backend} model on {predictor.device}")
+
+    parser = BfeeStreamParser()
+    ring = None
+    scratch = None
+    # raw frames since the last decision, with their timestamps and arrival times;
+    # the denoiser holds back its last frames, so these run ahead of the ring
+    block = []
+    pending_timestamps = []
+    pending_arrivals = []
+    new_frames = 0
+    mismatched = 0
+    skipped_windows = 0
+    decisions = []
+    start = time.perf_counter()
+
+    try:
+        for chunk in open_source(source, follow=follow):
+            for frame, arrival in parser.feed(chunk):
+                csi = frame.csi_array.reshape(frame.csi_array.shape[0], -1)
+                if ring is None:
+                    ring = FrameRingBuffer(window, csi.shape, dtype=np.float32)
+                    scratch = np.empty_like(ring.frames)
+                    classifier.warm_up(window, csi.shape)
+                elif csi.shape != ring.frame_shape:
+                    mismatched += 1
+                    continue
+                block.append(csi)
+                pending_timestamps.append(frame.timestamp)
+                pending_arrivals.append(arrival)
+                new_frames += 1
+
+            if new_frames < hop:
+                continue
+            # new frames are preprocessed in one block per decision, not once per tiny chunk
+            t0 = time.perf_counter()
+            amplitude = classifier.preprocess(np.stack(block))
+            n = len(amplitude)
+            ring.extend(amplitude, np.asarray(pending_timestamps[:n]), np.asarray(pending_arrivals[:n]))
+            del pending_timestamps[:n], pending_arrivals[:n]
+            block = []
+            due, new_frames = new_frames // hop, 0
+            if not ring.full():
+                continue
+            # frames that arrived in one chunk only get a decision on their latest window
+            skipped_windows += due - 1
+
+            t1 = time.perf_counter()
+            probs = classifier.classify(ring.window(scratch))
+            t2 = time.perf_counter()
+
+            decision = {
+                'window': len(decisions),
+                'frames': ring.total,
+                'timestamp': ring.last_timestamp(),
+                'class': int(np.argmax(probs)),
+                'label': labels[int(np.argmax(probs))] if labels else int(np.argmax(probs)),
+                'confidence': float(np.max(probs)),
+                'preprocess_ms': (t1 - t0) * 1e3,
+                'model_ms': (t2 - t1) * 1e3,
+                # from the arrival of the newest frame of the window to the decision
+                'latency_ms': (t2 - ring.last_arrival()) * 1e3,
+            }
+            decisions.append(decision)
+            if verbose:
+                print(f"window {decision['window']:>5} | frames {decision['frames']:>8} | "
+                      f"label {decision['label']} ({decision['confidence']:.2f}) | "
+                      f"preprocess {decision['preprocess_ms']:6.1f} ms | model {decision['model_ms']:6.1f} ms | "
+                      f"latency {decision['latency_ms']:6.1f} ms")
+            if max_windows is not None and len(decisions) >= max_windows:
+                break
+    except KeyboardInterrupt:
+        print("[Info] stream interrupted")
+
+    report = _latency_report(decisions, budget_ms)
+    report.update({
+        'source': source,
+        'window': window,
+        'hop': hop,
+        'denoise_delay_frames': classifier.delay,
+        'frames': parser.frames,
+        'records': parser.records,
+        'skipped_bytes': parser.skipped_bytes,
+        'mismatched_frames': mismatched,
+        'skipped_windows': skipped_windows,
+        'elapsed_seconds': time.perf_counter() - start,
+    })
+    _print_report(report)
+    if output_path is not None:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(report, decisions=decisions), f, indent=2)
+        print(f"report saved to {output_path}")
+    return report
+
+
+def _latency_report(decisions: list, budget_ms: float) -> dict:
+    report = {'windows': len(decisions), 'budget_ms': budget_ms}
+    if not decisions:
+        return report
+    latency = np.array([d['latency_ms'] for d in decisions])
+    report.update({
+        'latency_p50_ms': float(np.percentile(latency, 50)),
+        'latency_p95_ms': float(np.percentile(latency, 95)),
+        'latency_p99_ms': float(np.percentile(latency, 99)),
+        'latency_max_ms': float(latency.max()),
+        'preprocess_mean_ms': float(np.mean([d['preprocess_ms'] for d in decisions])),
+        'model_mean_ms': float(np.mean([d['model_ms'] for d in decisions])),
+        'over_budget': int(np.sum(latency > budget_ms)),
+    })
+    return report
+
+
+def _print_report(report: dict):
+    print("=" * 72)
+    print(f"frames: {report['frames']} | windows: {report['windows']} | "
+          f"skipped windows: {report['skipped_windows']} | mismatched frames: {report['mismatched_frames']}")
+    if report['windows']:
+        print(f"latency p50 {report['latency_p50_ms']:.1f} ms | p95 {report['latency_p95_ms']:.1f} ms | "
+              f"p99 {report['latency_p99_ms']:.1f} ms | max {report['latency_max_ms']:.1f} ms")
+        print(f"mean preprocess {report['preprocess_mean_ms']:.1f} ms | mean model {report['model_mean_ms']:.1f} ms | "
+              f"over {report['budget_ms']:.0f} ms budget: {report['over_budget']}/{report['windows']}")
+    print("=" * 72)
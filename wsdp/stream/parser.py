@@ -0,0 +1,61 @@
+import time
+
+from wsdp.readers.bfee_reader import BfeeReader
+
+
+class BfeeStreamParser:
+    """
+    incremental parser of a Bfee byte stream. bytes are fed in arbitrary chunks,
+    complete records are decoded with BfeeReader.parse_bfee_record and a record
+    split across chunks is kept until the rest of it arrives.
+    """
+
+    def __init__(self):
+        self._reader = BfeeReader(batched=False)
+        self._buffer = bytearray()
+        self.records = 0
+        self.frames = 0
+        self.skipped_bytes = 0
+
+    def feed(self, data: bytes) -> list:
+        """
+        param:
+            data: next chunk of the stream
+        return:
+            list of (BfeeFrame, arrival time) of every 0xBB record completed by this chunk,
+            the arrival time is time.perf_counter() when the chunk was handed in
+        """
+        arrival = time.perf_counter()
+        buf = self._buffer
+        buf += data
+        frames = []
+        cur = 0
+        size = len(buf)
+        while cur + 3 <= size:
+            field_len = (buf[cur] << 8) | buf[cur + 1]
+            if field_len < 1:
+                # not a record boundary, step forward until the framing lines up again
+                cur += 1
+                self.skipped_bytes += 1
+                continue
+            end = cur + 2 + field_len
+            if end > size:
+                break
+            code = buf[cur + 2]
+            self.records += 1
+            if code == 0xBB:
+                frame = self._reader.parse_bfee_record(bytes(buf[cur + 3:end]))
+                if frame is not None:
+                    self.frames += 1
+                    frames.append((frame, arrival))
+            cur = end
+        # drop consumed bytes once per chunk instead of once per record
+        del buf[:cur]
+        return frames
+
+    @property
+    def pending(self) -> int:
+        """
+        bytes of an incomplete record waiting for the next chunk
+        """
+        return len(self._buffer)
@@ -0,0 +1,76 @@
+import numpy as np
+
+
+class FrameRingBuffer:
+    """
+    fixed-size ring of the last capacity CSI frames, written in place without reallocation
+    """
+
+    def __init__(self, capacity: int, frame_shape, dtype=np.complex64):
+        """
+        param:
+            capacity: number of frames kept, the window length of the model
+            frame_shape: shape of one frame, e.g. (30, 3)
+        """
+        self.capacity = int(capacity)
+        self.frames = np.zeros((self.capacity,) + tuple(frame_shape), dtype=dtype)
+        self.timestamps = np.zeros(self.capacity, dtype=np.int64)
+        self.arrivals = np.zeros(self.capacity, dtype=np.float64)
+        self._pos = 0
+        self.total = 0
+
+    @property
+    def frame_shape(self) -> tuple:
+        return self.frames.shape[1:]
+
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+
+    def full(self) -> bool:
+        return self.total >= self.capacity
+
+    def push(self, csi, timestamp: int = 0, arrival: float = 0.0):
+        pos = self._pos
+        self.frames[pos] = csi
+        self.timestamps[pos] = timestamp
+        self.arrivals[pos] = arrival
+        self._pos = (pos + 1) % self.capacity
+        self.total += 1
+
+    def extend(self, frames, timestamps, arrivals):
+        """
+        push a block of frames, only the last capacity of them are kept
+        """
+        total = len(frames)
+        frames = frames[-self.capacity:]
+        timestamps = timestamps[-self.capacity:]
+        arrivals = arrivals[-self.capacity:]
+        n = len(frames)
+        idx = (self._pos + np.arange(n)) % self.capacity
+        self.frames[idx] = frames
+        self.timestamps[idx] = timestamps
+        self.arrivals[idx] = arrivals
+        self._pos = (self._pos + n) % self.capacity
+        self.total += total
+
+    def window(self, out=None) -> np.ndarray:
+        """
+        param:
+            out: optional (capacity, *frame_shape) array to copy into
+        return:
+            the buffered frames oldest first, only the filled part while the ring is not full
+        """
+        n = len(self)
+        if out is None:
+            out = np.empty((n,) + self.frame_shape, dtype=self.frames.dtype)
+        start = (self._pos - n) % self.capacity
+        head = min(n, self.capacity - start)
+        out[:head] = self.frames[start:start + head]
+        out[head:n] = self.frames[:n - head]
+        return out[:n]
+
+    def last_arrival(self) -> float:
+        return float(self.arrivals[(self._pos - 1) % self.capacity])
+
+    def last_timestamp(self) -> int:
+        return int(self.timestamps[(self._pos - 1) % self.capacity])
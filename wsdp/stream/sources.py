@@ -0,0 +1,151 @@
+import os
+import sys
+import stat
+import time
+import socket
+import numpy as np
+
+CHUNK_SIZE = 65536
+
+
+def open_source(source: str, follow: bool = True, poll_interval: float = 0.005, chunk_size: int = CHUNK_SIZE):
+    """
+    byte chunks of a live Bfee stream
+
+    param:
+        source: '-' for stdin, 'tcp://host:port' for a socket, otherwise a file or named pipe
+        follow: keep waiting for data appended to a regular file, like tail -f
+        poll_interval: seconds between checks of a followed file
+    return:
+        generator of bytes, ends when the writer closes the pipe or socket
+    """
+    if source == '-':
+        return _read_fd(sys.stdin.fileno(), chunk_size)
+    if source.startswith('tcp://'):
+        host, port = _parse_address(source[len('tcp://'):])
+        return _read_socket(host, port, chunk_size)
+    if stat.S_ISFIFO(os.stat(source).st_mode):
+        return _read_pipe(source, chunk_size)
+    return _follow_file(source, follow, poll_interval, chunk_size)
+
+
+def _parse_address(address: str) -> tuple:
+    host, _, port = address.rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError(f"expect tcp://host:port, got: tcp://{address}")
+    return host, int(port)
+
+
+def _read_fd(fd, chunk_size):
+    while True:
+        data = os.read(fd, chunk_size)
+        if not data:
+            return
+        yield data
+
+
+def _read_pipe(path, chunk_size):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        yield from _read_fd(fd, chunk_size)
+    finally:
+        os.close(fd)
+
+
+def _read_socket(host, port, chunk_size):
+    with socket.create_connection((host, port)) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        print(f"[Info] connected to {host}:{port}")
+        while True:
+            data = sock.recv(chunk_size)
+            if not data:
+                return
+            yield data
+
+
+def _follow_file(path, follow, poll_interval, chunk_size):
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            data = f.read(chunk_size)
+            if data:
+                yield data
+            elif not follow:
+                return
+            else:
+                time.sleep(poll_interval)
+
+
+def replay_server(path, host: str = '127.0.0.1', port: int = 5555, speed: float = 1.0, loop: bool = False):
+    """
+    serve a recorded .dat over tcp at the rate it was captured, for testing `wsdp stream`.
+    records are paced by the 32-bit microsecond timestamp of their 0xBB header, records of
+    other codes go out with the next 0xBB record. clients are served one after another.
+
+    param:
+        speed: replay speed, 2.0 sends twice as fast as recorded
+        loop: start over at the end of the file instead of closing the connection
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    ends, due = record_schedule(data)
+    if len(ends) == 0:
+        raise ValueError(f"no 0xBB record in {path}")
+    due = due / speed
+    print(f"[Info] replaying {len(ends)} records of {path} ({due[-1]:.2f}s) on {host}:{port}")
+
+    with socket.create_server((host, port)) as server:
+        while True:
+            conn, addr = server.accept()
+            print(f"[Info] client {addr[0]}:{addr[1]} connected")
+            try:
+                with conn:
+                    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    while True:
+                        _send_paced(conn, data, ends, due)
+                        if not loop:
+                            break
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            print(f"[Info] client {addr[0]}:{addr[1]} done")
+
+
+def record_schedule(data: bytes) -> tuple:
+    """
+    return:
+        ends: byte offset just past every 0xBB record
+        due: seconds after the first 0xBB record at which it was captured
+    """
+    ends = []
+    timestamps = []
+    cur = 0
+    size = len(data)
+    while cur + 3 <= size:
+        field_len = (data[cur] << 8) | data[cur + 1]
+        end = cur + 2 + field_len
+        if field_len < 1 or end > size:
+            break
+        if data[cur + 2] == 0xBB and field_len >= 5:
+            ends.append(end)
+            timestamps.append(int.from_bytes(data[cur + 3:cur + 7], 'little'))
+        cur = end
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    # the counter wraps around every 2 ** 32 us
+    gaps = np.diff(timestamps, prepend=timestamps[:1]) % (1 << 32)
+    return np.asarray(ends, dtype=np.int64), np.cumsum(gaps) / 1e6
+
+
+def _send_paced(conn, data, ends, due):
+    start = time.perf_counter()
+    sent = 0
+    i = 0
+    n = len(ends)
+    while i < n:
+        elapsed = time.perf_counter() - start
+        # everything that is due goes out in one send
+        j = int(np.searchsorted(due, elapsed, side='right'))
+        if j > i:
+            conn.sendall(data[sent:ends[j - 1]])
+            sent = int(ends[j - 1])
+            i = j
+        else:
+            time.sleep(min(due[i] - elapsed, 0.05))
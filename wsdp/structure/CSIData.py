@@ -1,14 +1,146 @@
+import numpy as np
+
+from .CSIFrame import BaseFrame, BfeeFrame
+
+_BFEE_FIELDS = ('bfee_count', 'n_rx', 'n_tx', 'rssi_a', 'rssi_b', 'rssi_c',
+                'noise', 'agc', 'antenna_sel', 'fake_rate')
+
+
 class CSIData:
     def __init__(self, file_name: str):
         """
         Initializes the CSIData object with the provided data.
+        CSI is stored column-wise: one (T, ...) tensor, a (T,) timestamp vector
+        and optional (T,) per-frame metadata columns.
         """
         self.file_name = file_name
-        self.frames = []
+        # raw file this data was read from
+        self.source = None
+        # (csi, label, group) when restored already sanitized from the preprocessing cache
+        self.processed = None
+        self._csi = None
+        self._timestamps = None
+        self._metadata = {}
+        # frames added one by one, merged into the columns on first access
+        self._pending = []
+
+    def __len__(self):
+        n = 0 if self._timestamps is None else len(self._timestamps)
+        return n + len(self._pending)
+
+    def __getstate__(self):
+        self._consolidate()
+        state = self.__dict__.copy()
+        state['_pending'] = []
+        return state
+
+    @property
+    def csi(self) -> np.ndarray:
+        """
+        CSI tensor of shape (T, ...), one row per frame
+        """
+        self._consolidate()
+        return self._csi
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        self._consolidate()
+        return self._timestamps
+
+    @property
+    def metadata(self) -> dict:
+        self._consolidate()
+        return self._metadata
 
     def add_frame(self, frame):
         """
         A CSI frame to the CSIData object.
         Usually one frame contains info of one timestamp of received signal.
         """
-        self.frames.append(frame)
+        self._pending.append(frame)
+
+    def add_frames(self, csi_array: np.ndarray, timestamps, **metadata):
+        """
+        append a block of frames at once.
+
+        param:
+            csi_array: (N, ...) tensor, stored without copy if CSIData is empty
+            timestamps: (N,) timestamps
+            metadata: optional (N,) columns, e.g. rssi_a=...
+        """
+        self._consolidate()
+        csi_array = np.asarray(csi_array)
+        timestamps = np.asarray(timestamps)
+        if timestamps.ndim != 1 or len(timestamps) != len(csi_array):
+            raise ValueError(f"got {len(csi_array)} frames but timestamps of shape {timestamps.shape}")
+        metadata = {key: np.asarray(value) for key, value in metadata.items()}
+        for key, value in metadata.items():
+            if value.shape != timestamps.shape:
+                raise ValueError(f"metadata column '{key}' has shape {value.shape}, expect {timestamps.shape}")
+
+        if self._csi is None:
+            self._csi = csi_array
+            self._timestamps = timestamps
+            self._metadata = metadata
+            return
+
+        self._csi = np.concatenate([self._csi, csi_array], axis=0)
+        self._timestamps = np.concatenate([self._timestamps, timestamps])
+        # only columns known for every frame are kept
+        self._metadata = {key: np.concatenate([value, metadata[key]])
+                          for key, value in self._metadata.items() if key in metadata}
+
+    def sorted_csi(self) -> np.ndarray:
+        """
+        return the CSI tensor ordered by timestamp (stable), without copy if already ordered
+        """
+        csi, timestamps = self.csi, self.timestamps
+        if csi is None:
+            return None
+        if len(timestamps) < 2 or np.all(timestamps[1:] >= timestamps[:-1]):
+            return csi
+        return csi[np.argsort(timestamps, kind='stable')]
+
+    @property
+    def frames(self) -> tuple:
+        """
+        compatibility view: one frame object per row, csi arrays are views into the tensor.
+        the frames are rebuilt from the columns on every access, so the view is a tuple:
+        frames.append(...) fails instead of being lost. add frames with add_frame() /
+        add_frames(), or assign a new sequence to frames.
+        """
+        csi, timestamps, metadata = self.csi, self.timestamps, self.metadata
+        if csi is None:
+            return ()
+        columns = {key: value.tolist() for key, value in metadata.items()}
+        timestamps = timestamps.tolist()
+        is_bfee = all(key in columns for key in _BFEE_FIELDS)
+        frames = []
+        for i in range(len(timestamps)):
+            if is_bfee:
+                frame = BfeeFrame(timestamps[i], csi[i], **{key: columns[key][i] for key in _BFEE_FIELDS})
+            else:
+                frame = BaseFrame(timestamp=timestamps[i], csi_array=csi[i])
+                for key, value in columns.items():
+                    setattr(frame, key, value[i])
+            frames.append(frame)
+        return tuple(frames)
+
+    @frames.setter
+    def frames(self, frames):
+        self._csi = None
+        self._timestamps = None
+        self._metadata = {}
+        self._pending = list(frames)
+
+    def _consolidate(self):
+        if not self._pending:
+            return
+        pending = self._pending
+        self._pending = []
+        extra = set(vars(pending[0])) - {'timestamp', 'csi_array'}
+        for frame in pending[1:]:
+            extra &= set(vars(frame))
+        self.add_frames(np.stack([frame.csi_array for frame in pending], axis=0),
+                        [frame.timestamp for frame in pending],
+                        **{key: [getattr(frame, key) for frame in pending] for key in sorted(extra)})
@@ -1,5 +1,11 @@
-from .resize import resize_csi_to_fixed_length
-from .train_func import train_model
+from .resize import resize_csi_to_fixed_length, write_fixed_length, build_fixed_length_batch
+from .train_func import train_model, autocast_context, EarlyStopping
 from .load_preset import load_params, load_api, load_mapping
 from .ftp_process import download_ftp
-from .load_model import load_custom_model
+from .load_model import load_custom_model, load_checkpoint_model
+from .cache import PreprocessCache, default_cache_dir
+from .shared_array import SharedArray
+from .resources import ResourceConfig, configure_resources, get_resources, limit_worker_threads
+from .store import MemmapArray, open_store
+from .profiler import Profiler, enable_profiling, disable_profiling, get_profiler, stage, time_call
+from .splits import split_indices
@@ -0,0 +1,176 @@
+import os
+import sys
+import hashlib
+import inspect
+import tempfile
+import numpy as np
+
+from pathlib import Path
+from functools import lru_cache
+
+# bump to invalidate every cache entry when the entry layout changes
+_CACHE_FORMAT = 2
+
+
+def default_cache_dir() -> str:
+    """
+    cache location: $WSDP_CACHE_DIR, otherwise ~/.cache/wsdp/preprocess
+    """
+    env = os.environ.get("WSDP_CACHE_DIR")
+    if env:
+        return env
+    return str(Path.home() / ".cache" / "wsdp" / "preprocess")
+
+
+@lru_cache(maxsize=None)
+def processing_fingerprint(dataset: str) -> str:
+    """
+    hash of everything that decides the content of a cleaned tensor:
+    the reader of the dataset, the processor, the sanitization algorithms
+    and the versions of the numeric libraries they run on
+    """
+    import pywt
+    from wsdp import readers
+    from wsdp.algorithms import denoising, phase_calibration
+    from wsdp.processors import base_processor
+
+    modules = [sys.modules[readers.get_reader_class(dataset).__module__],
+               phase_calibration, denoising, base_processor]
+    h = hashlib.sha1()
+    h.update(f"{_CACHE_FORMAT}|{dataset}|{np.__version__}|{pywt.__version__}".encode())
+    for module in modules:
+        h.update(inspect.getsource(module).encode())
+    return h.hexdigest()
+
+
+def file_list_digest(files) -> str:
+    """
+    hash of the path, size and mtime of every file, in sorted order: changes when a file
+    is added, removed or rewritten
+    """
+    h = hashlib.sha1()
+    for path in sorted(os.path.abspath(str(f)) for f in files):
+        stat = os.stat(path)
+        h.update(f"{path}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+
+class PreprocessCache:
+    """
+    content-addressed on-disk cache of sanitized CSI tensors.
+    one entry holds every cleaned sample produced from one raw file together with
+    its labels and groups, keyed by the raw file, the dataset and the processing fingerprint.
+    entries are evicted least-recently-used first once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = 20 * 1024 ** 3, hash_contents: bool = False):
+        """
+        param:
+            cache_dir: cache folder, default_cache_dir() if None
+            max_bytes: size cap of the whole cache folder
+            hash_contents: identify raw files by a hash of their bytes instead of path + size + mtime
+        """
+        self.cache_dir = Path(cache_dir or default_cache_dir())
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hash_contents = hash_contents
+        self.hits = 0
+        self.misses = 0
+        self._keys = {}
+
+    def key(self, file_path, dataset: str) -> str:
+        file_path = os.path.abspath(str(file_path))
+        memo = (file_path, dataset)
+        if memo not in self._keys:
+            h = hashlib.sha1()
+            h.update(self._file_identity(file_path).encode())
+            h.update(dataset.encode())
+            h.update(processing_fingerprint(dataset).encode())
+            self._keys[memo] = h.hexdigest()
+        return self._keys[memo]
+
+    def get(self, key: str):
+        """
+        return:
+            list of (csi, label, group) stored under key, or None on miss
+        """
+        path = self._entry_path(key)
+        try:
+            with np.load(path) as entry:
+                labels = _decode_optional(entry, "labels")
+                groups = _decode_optional(entry, "groups")
+                samples = [(entry[f"data_{i}"], labels[i], groups[i]) for i in range(len(labels))]
+            # mark as recently used
+            os.utime(path)
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return samples
+
+    def put(self, key: str, samples):
+        """
+        param:
+            samples: list of (csi, label, group) produced from one raw file,
+                     label and group are None for files without them (require_labels=False)
+        """
+        arrays = {f"data_{i}": np.asarray(csi) for i, (csi, _, _) in enumerate(samples)}
+        arrays.update(_encode_optional("labels", [label for _, label, _ in samples]))
+        arrays.update(_encode_optional("groups", [group for _, _, group in samples]))
+
+        # write to a temporary file first so readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self._entry_path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def evict(self):
+        """
+        delete least recently used entries until the cache fits in max_bytes
+        """
+        entries = []
+        for path in self.cache_dir.glob("*.npz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npz"
+
+    def _file_identity(self, file_path: str) -> str:
+        if self.hash_contents:
+            h = hashlib.sha1()
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            return h.hexdigest()
+        stat = os.stat(file_path)
+        return f"{file_path}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def _encode_optional(name: str, values) -> dict:
+    # integer ids with a mask of the known ones, the entry stays loadable without pickle
+    known = np.asarray([v is not None for v in values], dtype=bool)
+    ids = np.asarray([0 if v is None else v for v in values], dtype=np.int64)
+    return {name: ids, f"{name}_known": known}
+
+
+def _decode_optional(entry, name: str) -> list:
+    known = entry[f"{name}_known"].tolist()
+    return [v if k else None for v, k in zip(entry[name].tolist(), known)]
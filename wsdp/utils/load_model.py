@@ -1,3 +1,4 @@
+import torch
 import torch.nn as nn
 import importlib.util
 
@@ -29,4 +30,37 @@ def load_custom_model(model_file_path, num_classes):
                 f"model.") from e
         raise TypeError(f"custom model type error: {str(e)}") from e
     except Exception as e:
-        raise RuntimeError(f"load custom model error: {str(e)}") from e
\ No newline at end of file
+        raise RuntimeError(f"load custom model error: {str(e)}") from e
+
+
+def load_checkpoint_model(checkpoint_path, model_path=None, num_classes=None, device='cpu'):
+    """
+    rebuild a trained model from a checkpoint written by pipeline()
+
+    param:
+        model_path: file of the custom model the checkpoint was trained with,
+                    the one recorded in the checkpoint or CSIModel if None
+        num_classes: read from the checkpoint if None
+    return:
+        (model in eval mode on device, metadata dict of the checkpoint, empty for older checkpoints)
+    """
+    from wsdp.models import CSIModel
+
+    checkpoint = torch.load(checkpoint_path, map_location=device)
+    state_dict = checkpoint.get('model_state_dict', checkpoint)
+    metadata = dict(checkpoint.get('metadata') or {})
+    if num_classes is None:
+        num_classes = metadata.get('num_classes')
+    if num_classes is None:
+        if 'output_layer.weight' not in state_dict:
+            raise ValueError(f"cannot infer the number of classes of {checkpoint_path}, pass num_classes")
+        num_classes = state_dict['output_layer.weight'].shape[0]
+    metadata['num_classes'] = int(num_classes)
+
+    model_path = model_path or metadata.get('model_path')
+    if model_path is None:
+        model = CSIModel(num_classes=num_classes)
+    else:
+        model = load_custom_model(model_path, num_classes)
+    model.load_state_dict(state_dict)
+    return model.to(device).eval(), metadata
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import tracemalloc
+import numpy as np
+
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# returned by stage() while profiling is off, so instrumented code costs one global lookup
+_NULL_STAGE = nullcontext()
+_active = None
+
+
+class Profiler:
+    """
+    per-stage wall time and counters (files, frames, bytes) of one run, plus the busy time
+    of every preprocessing worker. stages recorded inside workers are merged in with merge().
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        """
+        param:
+            trace_memory: also track the peak of python allocations with tracemalloc (slower)
+        """
+        self.stages = {}
+        self.workers = {}
+        self.trace_memory = trace_memory
+        self._start = time.perf_counter()
+        if trace_memory:
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str, **counters):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(name, time.perf_counter() - start, **counters)
+
+    def add(self, name: str, seconds: float, calls: int = 1, **counters):
+        entry = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+        entry['seconds'] += seconds
+        entry['calls'] += calls
+        for key, value in counters.items():
+            entry[key] = entry.get(key, 0) + value
+
+    def count(self, name: str, **counters):
+        """
+        add counters to a stage without timing anything
+        """
+        self.add(name, 0.0, calls=0, **counters)
+
+    def merge(self, stats: dict):
+        """
+        param:
+            stats: worker_stats() of a task run in a worker process
+        """
+        for name, entry in stats['stages'].items():
+            entry = dict(entry)
+            self.add(name, entry.pop('seconds'), entry.pop('calls'), **entry)
+        worker = self.workers.setdefault(stats['pid'], {'seconds': 0.0, 'tasks': 0})
+        worker['seconds'] += stats['seconds']
+        worker['tasks'] += 1
+
+    def worker_stats(self) -> dict:
+        return {'pid': os.getpid(), 'seconds': time.perf_counter() - self._start, 'stages': self.stages}
+
+    def report(self) -> dict:
+        stages = {}
+        for name, entry in self.stages.items():
+            entry = dict(entry)
+            seconds = entry['seconds']
+            if seconds > 0:
+                for counter, rate in (('files', 'files_per_s'), ('frames', 'frames_per_s')):
+                    if counter in entry:
+                        entry[rate] = entry[counter] / seconds
+                if 'bytes' in entry:
+                    entry['mb_per_s'] = entry['bytes'] / seconds / 1024 ** 2
+            stages[name] = entry
+
+        busy = [worker['seconds'] for worker in self.workers.values()]
+        workers = {
+            'count': len(busy),
+            'busy_seconds': {str(pid): worker['seconds'] for pid, worker in self.workers.items()},
+            'tasks': {str(pid): worker['tasks'] for pid, worker in self.workers.items()},
+            # slowest worker over the average one, 1.0 is a perfectly balanced pool
+            'imbalance': max(busy) / (sum(busy) / len(busy)) if busy and sum(busy) > 0 else None,
+        }
+
+        memory = {}
+        if resource is not None:
+            # ru_maxrss is in KiB on linux
+            memory['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            memory['peak_rss_children_mb'] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        if self.trace_memory and tracemalloc.is_tracing():
+            memory['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+
+        return {
+            'elapsed_seconds': time.perf_counter() - self._start,
+            'stages': stages,
+            'workers': workers,
+            'memory': memory,
+        }
+
+    def save(self, path) -> dict:
+        report = self.report()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    def print_summary(self, report: dict = None):
+        report = report or self.report()
+        print(f"{'stage':<16}{'seconds':>10}{'calls':>8}{'files/s':>10}{'frames/s':>12}{'MB/s':>9}")
+        for name, entry in report['stages'].items():
+            print(f"{name:<16}{entry['seconds']:>10.3f}{entry['calls']:>8}"
+                  f"{entry.get('files_per_s', float('nan')):>10.1f}"
+                  f"{entry.get('frames_per_s', float('nan')):>12.0f}"
+                  f"{entry.get('mb_per_s', float('nan')):>9.1f}")
+        workers = report['workers']
+        if workers['count']:
+            print(f"workers: {workers['count']} | load imbalance (max / mean busy time): {workers['imbalance']:.2f}")
+        for key, value in report['memory'].items():
+            print(f"{key}: {value:.1f}")
+        print(f"elapsed: {report['elapsed_seconds']:.3f}s")
+
+
+def enable_profiling(trace_memory: bool = False) -> Profiler:
+    """
+    start recording stages of this process
+    """
+    global _active
+    _active = Profiler(trace_memory=trace_memory)
+    return _active
+
+
+def disable_profiling() -> Profiler:
+    """
+    stop recording, return the profiler that was active (or None)
+    """
+    global _active
+    profiler, _active = _active, None
+    if profiler is not None and profiler.trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return profiler
+
+
+def get_profiler() -> Profiler:
+    return _active
+
+
+def stage(name: str, **counters):
+    """
+    context manager timing name on the active profiler, a shared no-op context if there is none
+    """
+    if _active is None:
+        return _NULL_STAGE
+    return _active.stage(name, **counters)
+
+
+def count(name: str, **counters):
+    if _active is not None:
+        _active.count(name, **counters)
+
+
+def time_call(func, repeat: int = 5) -> dict:
+    """
+    run func repeat times after one warm-up call
+    return:
+        best / median / mean seconds of one call
+    """
+    func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {'best': min(times), 'median': float(np.median(times)), 'mean': float(np.mean(times)),
+            'repeat': repeat}
@@ -24,4 +24,48 @@ List[np.ndarray]:
 
         resized_samples_list.append(resized_sample)
 
-    return resized_samples_list
\ No newline at end of file
+    return resized_samples_list
+
+def write_fixed_length(sample: np.ndarray, out: np.ndarray, pad_value: float = 0.0, amplitude: bool = False) -> int:
+    """
+    write sample into the preallocated out, truncated or padded along the time axis to len(out)
+
+    param:
+        amplitude: write np.abs(sample) instead of sample
+    return:
+        number of real (not padded) timestamps written
+    """
+    length = min(sample.shape[0], out.shape[0])
+    if amplitude:
+        np.abs(sample[:length], out=out[:length], casting='same_kind')
+    else:
+        out[:length] = sample[:length]
+    out[length:] = pad_value
+    return length
+
+
+def build_fixed_length_batch(csi_samples_list: List[np.ndarray], target_length: int = 1500, dtype=np.float32,
+                             amplitude: bool = True, pad_value: float = 0.0, return_lengths: bool = False):
+    """
+    allocate one (N, target_length, ...) array up front and write every sample straight into it,
+    truncated or zero-padded, instead of padding samples one by one and stacking them afterwards.
+
+    param:
+        csi_samples_list: samples of shape (T_i, F, A), F and A shared by all of them
+        dtype: dtype of the batch
+        amplitude: store np.abs of the samples, what CSIDataset feeds to models
+        return_lengths: also return the true (unpadded) length of every sample
+    return:
+        batch, or (batch, lengths)
+    """
+    first_shape = csi_samples_list[0].shape[1:] if len(csi_samples_list) else ()
+    batch = np.empty((len(csi_samples_list), target_length) + tuple(first_shape), dtype=dtype)
+    lengths = np.empty(len(csi_samples_list), dtype=np.int64)
+    for i, sample in enumerate(csi_samples_list):
+        if sample.shape[1:] != first_shape:
+            raise ValueError(f"sample {i} has shape {sample.shape[1:]}, expect {first_shape}")
+        lengths[i] = write_fixed_length(sample, batch[i], pad_value=pad_value, amplitude=amplitude)
+
+    if return_lengths:
+        return batch, lengths
+    return batch
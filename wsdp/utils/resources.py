@@ -0,0 +1,110 @@
+import os
+import sys
+
+from dataclasses import dataclass
+
+# environment variables overriding the derived layout
+_ENV = {
+    'cpus': 'WSDP_CPUS',
+    'preprocess_workers': 'WSDP_PREPROCESS_WORKERS',
+    'loader_workers': 'WSDP_LOADER_WORKERS',
+    'torch_threads': 'WSDP_TORCH_THREADS',
+}
+_THREAD_ENV = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+               'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+_config = None
+
+
+@dataclass
+class ResourceConfig:
+    """
+    CPU budget of one wsdp process
+    """
+    cpus: int
+    preprocess_workers: int
+    loader_workers: int
+    torch_threads: int
+
+    def report(self):
+        print(f"resources: {self.cpus} cpus | preprocess workers: {self.preprocess_workers} | "
+              f"dataloader workers: {self.loader_workers} | torch threads: {self.torch_threads}")
+
+    def pool_size(self, num_jobs: int) -> int:
+        """
+        number of preprocessing processes worth starting for num_jobs tasks
+        """
+        return max(1, min(self.preprocess_workers, num_jobs))
+
+
+def available_cpus() -> int:
+    """
+    cores this process may run on (respects taskset / cgroup cpusets)
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def configure_resources(cpus: int = None, preprocess_workers: int = None, loader_workers: int = None,
+                        torch_threads: int = None) -> ResourceConfig:
+    """
+    size process pools, DataLoader workers and torch intra-op threads.
+    explicit arguments win over WSDP_* environment variables, which win over
+    a layout derived from the cpu affinity of the process.
+
+    param:
+        cpus: total core budget
+        preprocess_workers: processes reading and sanitizing raw files
+        loader_workers: worker processes of each training DataLoader
+        torch_threads: intra-op threads of torch in the training process
+    """
+    global _config
+    cpus = _pick(cpus, 'cpus') or available_cpus()
+    preprocess_workers = _pick(preprocess_workers, 'preprocess_workers') or cpus
+    loader_workers = _pick(loader_workers, 'loader_workers')
+    if loader_workers is None:
+        # loaders only feed the training process, which keeps the larger share of the cores
+        loader_workers = min(8, cpus // 4)
+    torch_threads = _pick(torch_threads, 'torch_threads') or max(1, cpus - loader_workers)
+
+    _config = ResourceConfig(cpus=cpus, preprocess_workers=preprocess_workers,
+                             loader_workers=loader_workers, torch_threads=torch_threads)
+    if 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(torch_threads)
+    return _config
+
+
+def get_resources() -> ResourceConfig:
+    """
+    current layout, derived on first use if configure_resources() was never called
+    """
+    if _config is None:
+        return configure_resources()
+    return _config
+
+
+def limit_worker_threads():
+    """
+    initializer of preprocessing workers: every worker is one process on one core,
+    so BLAS / OpenMP / torch must not start thread pools of their own inside it.
+    numpy and its BLAS are loaded already when this runs, the environment variables only
+    reach libraries loaded later, threadpoolctl resizes the pools that exist
+    """
+    from threadpoolctl import threadpool_limits
+
+    for name in _THREAD_ENV:
+        os.environ[name] = '1'
+    threadpool_limits(1)
+    if 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(1)
+
+
+def _pick(value, key):
+    if value is not None:
+        return int(value)
+    env = os.environ.get(_ENV[key])
+    if env:
+        return int(env)
+    return None
@@ -0,0 +1,77 @@
+import numpy as np
+
+from multiprocessing import shared_memory, resource_tracker
+
+
+class SharedArray:
+    """
+    numpy array backed by a multiprocessing.shared_memory block.
+    pickling only sends the block name, so worker processes attach to the same memory
+    instead of receiving a copy of the data.
+    """
+
+    def __init__(self, shape, dtype, name: str = None):
+        """
+        param:
+            shape, dtype: layout of the array
+            name: attach to an existing block, a new block is created if None
+        """
+        self.shape = tuple(int(d) for d in shape)
+        self.dtype = np.dtype(dtype)
+        self._owner = name is None
+        if self._owner:
+            nbytes = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+            self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self._shm = _attach(name)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __reduce__(self):
+        return SharedArray, (self.shape, self.dtype.str, self.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        if self._owner:
+            self.unlink()
+
+    def close(self):
+        """
+        detach from the block, every view of self.array must be dropped before
+        """
+        self.array = None
+        try:
+            self._shm.close()
+        except BufferError:
+            print(f"[Warning] shared array {self.name} still has views, kept mapped")
+
+    def unlink(self):
+        """
+        free the block once every process has closed it, only called by the creator
+        """
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _attach(name: str):
+    try:
+        # python >= 3.13: attaching processes must not unlink the block on exit
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # older versions register attached blocks with the resource tracker too, which
+    # would unlink them when a worker exits, so skip the registration
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
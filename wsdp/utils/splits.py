@@ -0,0 +1,22 @@
+from sklearn.model_selection import GroupShuffleSplit
+
+
+def split_indices(labels, groups, seed: int, test_split: float = 0.4, val_split: float = 0.3) -> tuple:
+    """
+    the group-wise train / test / val split of one seed: test_split of the groups are held out,
+    val_split of those become the validation set
+
+    param:
+        labels, groups: zero-indexed numpy arrays, one entry per sample
+    return:
+        train_idx, test_idx, val_idx: index arrays into the samples, no sample is copied
+    """
+    splitter_1 = GroupShuffleSplit(n_splits=1, test_size=test_split, random_state=seed)
+    train_idx, temp_idx = next(splitter_1.split(labels, labels, groups=groups))
+
+    temp_labels = labels[temp_idx]
+    temp_groups = groups[temp_idx]
+
+    splitter_2 = GroupShuffleSplit(n_splits=1, test_size=val_split, random_state=seed)
+    test_idx, val_idx = next(splitter_2.split(temp_labels, temp_labels, groups=temp_groups))
+    return train_idx, temp_idx[test_idx], temp_idx[val_idx]
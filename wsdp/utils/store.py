@@ -0,0 +1,152 @@
+import os
+import json
+import numpy as np
+
+from pathlib import Path
+
+# bump when the layout of a store folder changes
+_STORE_FORMAT = 1
+
+DATA_FILE = "data.npy"
+LABELS_FILE = "labels.npy"
+GROUPS_FILE = "groups.npy"
+META_FILE = "meta.json"
+
+
+class MemmapArray:
+    """
+    .npy file mapped into memory, with the interface of SharedArray so preprocessing
+    workers can write samples straight into it. pickling only sends the path,
+    every process maps the same file and shares its pages through the OS cache.
+    """
+
+    def __init__(self, path, shape=None, dtype=None):
+        """
+        param:
+            path: .npy file
+            shape, dtype: create (or overwrite) the file with this layout, open the existing one if None
+        """
+        self.path = str(path)
+        if shape is None:
+            self.array = np.load(self.path, mmap_mode='r+')
+        else:
+            self.array = np.lib.format.open_memmap(self.path, mode='w+', dtype=dtype,
+                                                   shape=tuple(int(d) for d in shape))
+        self.shape = self.array.shape
+        self.dtype = self.array.dtype
+
+    @property
+    def name(self) -> str:
+        return self.path
+
+    def __reduce__(self):
+        return MemmapArray, (self.path,)
+
+    def close(self):
+        """
+        flush written pages to the file and unmap it
+        """
+        if self.array is not None:
+            self.array.flush()
+            self.array = None
+
+    def unlink(self):
+        """
+        the file is the result, it outlives every process
+        """
+
+
+def store_paths(store_path) -> dict:
+    store_path = Path(store_path)
+    return {
+        'data': store_path / DATA_FILE,
+        'labels': store_path / LABELS_FILE,
+        'groups': store_path / GROUPS_FILE,
+        'meta': store_path / META_FILE,
+    }
+
+
+def create_store(store_path, shape, dtype) -> MemmapArray:
+    """
+    start a store folder: any index of a previous run is removed first,
+    so a store interrupted while being written is never opened
+    """
+    paths = store_paths(store_path)
+    os.makedirs(store_path, exist_ok=True)
+    for key in ('meta', 'labels', 'groups'):
+        if paths[key].exists():
+            paths[key].unlink()
+    return MemmapArray(paths['data'], shape, dtype)
+
+
+def finalize_store(store_path, num_samples: int, labels, groups, **meta):
+    """
+    cut data.npy down to the first num_samples samples and write the label/group index
+    and meta.json, which marks the store as complete
+
+    param:
+        meta: json-serializable description of what the store was built from
+    """
+    paths = store_paths(store_path)
+    _shrink_npy(paths['data'], num_samples)
+    np.save(paths['labels'], np.asarray(labels))
+    np.save(paths['groups'], np.asarray(groups))
+    meta = dict(meta, format=_STORE_FORMAT, num_samples=int(num_samples))
+    with open(paths['meta'], 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+
+def open_store(store_path, **expected):
+    """
+    param:
+        expected: meta entries the store must match, e.g. dataset='widar', padding_length=1500
+    return:
+        (data, labels, groups) with data a read-only memmap, or None if the store is
+        missing, incomplete or was built with other settings
+    """
+    paths = store_paths(store_path)
+    try:
+        with open(paths['meta'], 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if meta.get('format') != _STORE_FORMAT:
+        return None
+    for key, value in expected.items():
+        if meta.get(key) != value:
+            print(f"store {store_path} was built with {key}={meta.get(key)}, expect {value}")
+            return None
+    try:
+        data = np.load(paths['data'], mmap_mode='r')
+        labels = np.load(paths['labels']).tolist()
+        groups = np.load(paths['groups']).tolist()
+    except (FileNotFoundError, OSError, ValueError):
+        return None
+    num_samples = meta['num_samples']
+    if len(data) < num_samples or len(labels) != num_samples or len(groups) != num_samples:
+        return None
+    return data[:num_samples], labels, groups
+
+
+def _shrink_npy(path, num_rows: int):
+    # rewrite the shape in the header in place and truncate the file, so unused
+    # trailing slots cost no disk space; the header keeps its length and data offset
+    with open(path, 'r+b') as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+        if num_rows == shape[0]:
+            return
+        new_shape = (int(num_rows),) + tuple(shape[1:])
+        header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': fortran_order,
+                       'shape': new_shape}).encode('latin1')
+        prefix = 8 + (2 if version == (1, 0) else 4)
+        free = offset - prefix - len(header) - 1
+        if free < 0:
+            return
+        f.seek(prefix)
+        f.write(header + b' ' * free + b'\n')
+        f.truncate(offset + int(np.prod(new_shape)) * dtype.itemsize)
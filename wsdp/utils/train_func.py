@@ -1,9 +1,68 @@
+import os
 import time
 import torch
 
+from contextlib import nullcontext
+from dataclasses import dataclass, asdict
+
+AMP_DTYPES = ('bfloat16', 'float16')
+COMPILE_MODES = ('default', 'reduce-overhead', 'max-autotune', 'max-autotune-no-cudagraphs')
+STOP_METRICS = ('val_loss', 'val_acc', 'train_loss', 'train_acc')
+# checkpoint metadata a resumed run has to share with the run that wrote the checkpoint
+RESUME_KEYS = ('dataset', 'labels', 'num_classes', 'input_shape', 'model_path', 'padding_length')
+
+
+@dataclass
+class EarlyStopping:
+    """
+    stop training once metric has not improved by more than min_delta for patience epochs.
+    losses have to decrease, accuracies to increase.
+    """
+    patience: int = 10
+    min_delta: float = 0.0
+    metric: str = 'val_loss'
+    best: float = None
+    bad_epochs: int = 0
+
+    def __post_init__(self):
+        if self.metric not in STOP_METRICS:
+            raise ValueError(f"unsupported early stopping metric: {self.metric}, available: {list(STOP_METRICS)}")
+
+    def step(self, value: float) -> bool:
+        """
+        record the metric of one epoch
+        return:
+            True if training should stop
+        """
+        sign = -1.0 if self.metric.endswith('loss') else 1.0
+        if self.best is None or sign * (value - self.best) > self.min_delta:
+            self.best = value
+            self.bad_epochs = 0
+        else:
+            self.bad_epochs += 1
+        return self.bad_epochs >= self.patience
+
+
+def autocast_context(device, amp_dtype=None):
+    """
+    param:
+        device: torch.device or device string the model runs on
+        amp_dtype: 'bfloat16' or 'float16' (or the torch dtype) to autocast to, None for plain fp32
+    return:
+        torch.autocast context for device, or a no-op context if amp_dtype is None
+    """
+    if amp_dtype is None:
+        return nullcontext()
+    if isinstance(amp_dtype, str):
+        if amp_dtype not in AMP_DTYPES:
+            raise ValueError(f"unsupported autocast dtype: {amp_dtype}, available: {list(AMP_DTYPES)}")
+        amp_dtype = getattr(torch, amp_dtype)
+    return torch.autocast(device_type=torch.device(device).type, dtype=amp_dtype)
+
 
 def train_model(model, criterion, optimizer, scheduler, train_loader, val_loader, 
-                num_epochs, device, checkpoint_path):
+                num_epochs, device, checkpoint_path, amp_dtype=None, compile_mode=None, channels_last=False,
+                early_stopping: EarlyStopping = None, last_checkpoint_path=None, resume=False, metadata=None):
     """
     param:
         model (nn.Module): model to training process.
@@ -15,21 +74,92 @@ def train_model(model, criterion, optimizer, scheduler, train_loader, val_loader
         num_epochs (int): total epoches of training process
         device (str): cuda or cpu
         checkpoint_path (str): path to save best model
+        amp_dtype (str): autocast forward passes to 'bfloat16' or 'float16', None for fp32
+        compile_mode (str): run the model through torch.compile with this mode
+                            ('default', 'reduce-overhead', 'max-autotune'), None for eager mode
+        channels_last (bool): keep the conv weights of the model in channels_last memory format
+        early_stopping (EarlyStopping): stop before num_epochs once its metric plateaus
+        last_checkpoint_path (str): path to save the training state after every epoch
+        resume (bool): continue from last_checkpoint_path: model, optimizer, scheduler, history and
+                       early stopping state are restored. the best checkpoint is never resumed from,
+                       it is not the latest training state. a last checkpoint whose metadata differs
+                       from metadata in RESUME_KEYS raises ValueError
+        metadata (dict): saved with every checkpoint so it can be used without the training run,
+                         e.g. dataset, label names and input shape
 
     return:
         history: dict contains training and evaluation record
     """
+    from wsdp.datasets import as_tensor_loader
+
+    # in-memory datasets are batched by indexing their tensor directly
+    train_loader = as_tensor_loader(train_loader)
+    val_loader = as_tensor_loader(val_loader)
     
     history = {
         'train_loss': [], 'train_acc': [],
         'val_loss': [], 'val_acc': [],
-        'epoch': [], 'lr': []
+        'epoch': [], 'lr': [],
+        'amp_dtype': [], 'compile_mode': [], 'channels_last': []
     }
 
-    best_val_acc = 0.0
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+    # checkpoints keep saving the state_dict of model, not of the compiled wrapper
+    forward_model = torch.compile(model, mode=compile_mode) if compile_mode else model
+    # float16 gradients underflow without loss scaling, bfloat16 has the range of fp32
+    scaler = torch.amp.GradScaler(torch.device(device).type, enabled=amp_dtype in ('float16', torch.float16))
+
+    # the first epoch always produces a best checkpoint, even at 0% accuracy
+    best_val_acc = -1.0
     start_epoch = 0
+    stopped = False
+
+    resume_path = last_checkpoint_path if resume and last_checkpoint_path is not None else None
+    if resume_path is not None and os.path.isfile(resume_path):
+        checkpoint = torch.load(resume_path, map_location=device)
+        _check_resume_metadata(checkpoint.get('metadata'), metadata, resume_path)
+        model.load_state_dict(checkpoint['model_state_dict'])
+        optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+        if scheduler and checkpoint.get('scheduler_state_dict') is not None:
+            scheduler.load_state_dict(checkpoint['scheduler_state_dict'])
+        if checkpoint.get('scaler_state_dict'):
+            scaler.load_state_dict(checkpoint['scaler_state_dict'])
+        stopping_state = checkpoint.get('early_stopping')
+        if early_stopping is not None and stopping_state and stopping_state['metric'] == early_stopping.metric:
+            early_stopping.best = stopping_state['best']
+            early_stopping.bad_epochs = stopping_state['bad_epochs']
+        history = checkpoint['history']
+        # columns added after the checkpoint was written, the epochs before them are unknown
+        for key in ('amp_dtype', 'compile_mode', 'channels_last'):
+            history.setdefault(key, [None] * len(history['train_loss']))
+        best_val_acc = checkpoint['best_val_acc']
+        start_epoch = checkpoint['epoch'] + 1
+        stopped = checkpoint.get('stopped', False)
+        if checkpoint.get('rng_state') is not None:
+            # the shuffling of the next epochs continues where the interrupted run left off
+            torch.set_rng_state(checkpoint['rng_state'])
+        print(f"resume from {resume_path} after epoch {start_epoch}"
+              f"{', training had stopped early' if stopped else ''}")
+
+    def training_state(epoch):
+        return {
+            'epoch': epoch,
+            'model_state_dict': model.state_dict(),
+            'optimizer_state_dict': optimizer.state_dict(),
+            'scheduler_state_dict': scheduler.state_dict() if scheduler else None,
+            'scaler_state_dict': scaler.state_dict(),
+            'early_stopping': asdict(early_stopping) if early_stopping is not None else None,
+            'best_val_acc': best_val_acc,
+            'history': history,
+            'stopped': stopped,
+            'rng_state': torch.get_rng_state(),
+            'metadata': metadata,
+        }
 
     for epoch in range(start_epoch, num_epochs):
+        if stopped:
+            break
         epoch_start_time = time.time()
         
         # --- training ---
@@ -43,12 +173,14 @@ def train_model(model, criterion, optimizer, scheduler, train_loader, val_loader
             csi_data = csi_data.to(device)
             labels = labels.to(device)
 
-            predictions = model(csi_data)
-            loss = criterion(predictions, labels)
+            with autocast_context(device, amp_dtype):
+                predictions = forward_model(csi_data)
+                loss = criterion(predictions, labels)
             
             optimizer.zero_grad()
-            loss.backward()
-            optimizer.step()
+            scaler.scale(loss).backward()
+            scaler.step(optimizer)
+            scaler.update()
             
             running_loss += loss.item() * csi_data.size(0)
 
@@ -68,9 +200,10 @@ def train_model(model, criterion, optimizer, scheduler, train_loader, val_loader
             for csi_data, labels in val_loader:
                 csi_data, labels = csi_data.to(device), labels.to(device)
                 
-                predictions = model(csi_data)
+                with autocast_context(device, amp_dtype):
+                    predictions = forward_model(csi_data)
                 
-                loss = criterion(predictions, labels)
+                    loss = criterion(predictions, labels)
                 running_vloss += loss.item() * csi_data.size(0)
                 _, predicted = torch.max(predictions.data, 1)
                 val_total += labels.size(0)
@@ -100,18 +233,42 @@ def train_model(model, criterion, optimizer, scheduler, train_loader, val_loader
         history['val_acc'].append(epoch_val_acc)
         history['epoch'].append(epoch_duration)
         history['lr'].append(current_lr)
+        history['amp_dtype'].append(str(amp_dtype).replace('torch.', '') if amp_dtype else 'float32')
+        history['compile_mode'].append(compile_mode or 'eager')
+        history['channels_last'].append(bool(channels_last))
         
+        if early_stopping is not None and early_stopping.step(history[early_stopping.metric][-1]):
+            stopped = True
+            print(f"  -> early stopping: no {early_stopping.metric} improvement above {early_stopping.min_delta} "
+                  f"for {early_stopping.patience} epochs")
+
         if epoch_val_acc > best_val_acc:
             best_val_acc = epoch_val_acc
             print(f"  -> new best acc: {best_val_acc:.2f}%. saved to {checkpoint_path}")
             
-            torch.save({
-                'epoch': epoch,
-                'model_state_dict': model.state_dict(),
-                'optimizer_state_dict': optimizer.state_dict(),
-                'scheduler_state_dict': scheduler.state_dict() if scheduler else None,
-                'best_val_acc': best_val_acc,
-                'history': history,
-            }, checkpoint_path)
+            _save_checkpoint(training_state(epoch), checkpoint_path)
+
+        if last_checkpoint_path is not None:
+            _save_checkpoint(training_state(epoch), last_checkpoint_path)
             
-    return history
\ No newline at end of file
+    return history
+
+
+def _check_resume_metadata(stored, current, path):
+    if not current:
+        return
+    if not stored:
+        print(f"[Warning] {path} records no metadata, cannot check it belongs to this run")
+        return
+    mismatched = [f"{key}: {stored.get(key)!r} in the checkpoint, {current.get(key)!r} in this run"
+                  for key in RESUME_KEYS if key in current and stored.get(key) != current.get(key)]
+    if mismatched:
+        raise ValueError(f"cannot resume from {path}, it was trained with other settings "
+                         f"(start over without resume, or use another output folder):\n  " + "\n  ".join(mismatched))
+
+
+def _save_checkpoint(state, path):
+    # write next to the target and rename, a job killed mid-save leaves the previous checkpoint intact
+    tmp_path = f"{path}.tmp"
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
\ No newline at end of file